@@ -1,22 +1,20 @@
+import time
+run_started = time.perf_counter()
+
 import streamlit as st
 import os
-import tempfile
 import base64
-from PIL import Image
-import pandas as pd
-import io
-# import cairosvg  # Remove this line
-from svglib.svglib import svg2rlg  # Add this line
-from reportlab.graphics import renderPM  # Add this line
-from docx import Document
-from docx.shared import Inches
-import PyPDF2
-from pdf2image import convert_from_path
-from pptx import Presentation
-from pptx.util import Inches as PptxInches
-import csv
-import zipfile
-import time
+import uuid
+
+from flexifile import check_format, detect_format, format_domains
+from flexifile.cache import cache_stats
+from flexifile.columnar import columnar_formats, compression_codecs
+from flexifile import config
+from flexifile.delivery import download_url, serve_file, should_stream, start_download_server
+from flexifile.formats import domains_for_input
+from flexifile.jobs import get_job_manager, submit_batch, submit_conversion
+from flexifile.metrics import json_lines, prometheus_text
+from flexifile.scratch import ScratchSpaceFull
 
 st.set_page_config(
     page_title="Flexifile",
@@ -24,10 +22,31 @@ st.set_page_config(
     layout="wide"
 )
 
+# Imports only cost anything on the first run of a process; later reruns hit sys.modules
+import_seconds = time.perf_counter() - run_started
+
+# Function to remember the first run's import time for the life of the server process
+@st.cache_resource
+def cold_start_seconds():
+    return import_seconds
+
+# Function to read the stylesheet once per process instead of on every rerun
+@st.cache_data
+def read_css():
+    with open("style.css", "r") as f:
+        return f.read()
+
+# Function to start the download server up front so Prometheus can scrape /metrics
+@st.cache_resource
+def start_metrics_endpoint():
+    start_download_server()
+
+if config.METRICS_ENDPOINT:
+    start_metrics_endpoint()
+
 # Custom CSS 
 def load_css():
-    with open("style.css", "r") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    st.markdown(f"<style>{read_css()}</style>", unsafe_allow_html=True)
 load_css()
 
 # App title and description
@@ -38,543 +57,238 @@ Convert between various file formats across different domains.
 </div>
 """, unsafe_allow_html=True)
 
-# Define the format domains and their conversions
-format_domains = {
-    "Document Formats": {
-        "Input Formats": [
-            "Microsoft Word (.docx, .doc)",
-            "OpenDocument (.odt)",
-            "Rich Text Format (.rtf)",
-            "Plain Text (.txt)",
-            "PDF (.pdf)",
-            "HTML (.html, .htm)"
-        ],
-        "Conversions": {
-            "Microsoft Word (.docx, .doc)": ["PDF (.pdf)", "Rich Text Format (.rtf)", "Plain Text (.txt)"],
-            "OpenDocument (.odt)": ["PDF (.pdf)", "Microsoft Word (.docx, .doc)"],
-            "Rich Text Format (.rtf)": ["Microsoft Word (.docx, .doc)", "PDF (.pdf)"],
-            "Plain Text (.txt)": ["Microsoft Word (.docx, .doc)", "PDF (.pdf)"],
-            "PDF (.pdf)": ["Microsoft Word (.docx, .doc)", "Plain Text (.txt)"],
-            "HTML (.html, .htm)": ["Microsoft Word (.docx, .doc)", "PDF (.pdf)"]
-        }
-    },
-    "Presentation Formats": {
-        "Input Formats": [
-            "Microsoft PowerPoint (.pptx, .ppt)",
-            "OpenDocument Presentation (.odp)",
-            "PDF (.pdf)"
-        ],
-        "Conversions": {
-            "Microsoft PowerPoint (.pptx, .ppt)": ["PDF (.pdf)", "PNG/JPEG Images (.png, .jpg)"],
-            "OpenDocument Presentation (.odp)": ["Microsoft PowerPoint (.pptx, .ppt)", "PDF (.pdf)"],
-            "PDF (.pdf)": ["Microsoft PowerPoint (.pptx, .ppt)", "PNG/JPEG Images (.png, .jpg)"]
-        }
-    },
-    "Spreadsheet Formats": {
-        "Input Formats": [
-            "Microsoft Excel (.xlsx, .xls)",
-            "OpenDocument Spreadsheet (.ods)",
-            "CSV (.csv)",
-            "TSV (.tsv)"
-        ],
-        "Conversions": {
-            "Microsoft Excel (.xlsx, .xls)": ["CSV (.csv)", "TSV (.tsv)", "PDF (.pdf)"],
-            "OpenDocument Spreadsheet (.ods)": ["Microsoft Excel (.xlsx, .xls)", "CSV (.csv)"],
-            "CSV (.csv)": ["Microsoft Excel (.xlsx, .xls)", "TSV (.tsv)"],
-            "TSV (.tsv)": ["Microsoft Excel (.xlsx, .xls)", "CSV (.csv)"]
-        }
-    },
-    "Image Formats": {
-        "Input Formats": [
-            "PNG (.png)",
-            "JPEG (.jpg, .jpeg)",
-            "BMP (.bmp)",
-            "TIFF (.tiff, .tif)",
-            "GIF (.gif)",
-            "WebP (.webp)"
-        ],
-        "Conversions": {
-            "PNG (.png)": ["JPEG (.jpg, .jpeg)", "BMP (.bmp)", "TIFF (.tiff, .tif)", "WebP (.webp)"],
-            "JPEG (.jpg, .jpeg)": ["PNG (.png)", "BMP (.bmp)", "TIFF (.tiff, .tif)", "WebP (.webp)"],
-            "BMP (.bmp)": ["PNG (.png)", "JPEG (.jpg, .jpeg)", "TIFF (.tiff, .tif)"],
-            "TIFF (.tiff, .tif)": ["PNG (.png)", "JPEG (.jpg, .jpeg)", "BMP (.bmp)"],
-            "GIF (.gif)": ["PNG (.png)", "JPEG (.jpg, .jpeg)"],
-            "WebP (.webp)": ["PNG (.png)", "JPEG (.jpg, .jpeg)"]
-        }
-    },
-    "Vector Graphics": {
-        "Input Formats": [
-            "SVG (.svg)",
-            "EPS (.eps)",
-            "PDF (.pdf)"
-        ],
-        "Conversions": {
-            "SVG (.svg)": ["PNG (.png)", "JPEG (.jpg, .jpeg)", "PDF (.pdf)"],
-            "EPS (.eps)": ["PDF (.pdf)", "PNG (.png)"],
-            "PDF (.pdf)": ["PNG (.png)", "JPEG (.jpg, .jpeg)"]
-        }
-    }
-}
-
-# File extension mappings
-extension_map = {
-    "Microsoft Word (.docx, .doc)": ".docx",
-    "OpenDocument (.odt)": ".odt",
-    "Rich Text Format (.rtf)": ".rtf",
-    "Plain Text (.txt)": ".txt",
-    "PDF (.pdf)": ".pdf",
-    "HTML (.html, .htm)": ".html",
-    "Microsoft PowerPoint (.pptx, .ppt)": ".pptx",
-    "OpenDocument Presentation (.odp)": ".odp",
-    "PNG/JPEG Images (.png, .jpg)": ".png",
-    "Microsoft Excel (.xlsx, .xls)": ".xlsx",
-    "OpenDocument Spreadsheet (.ods)": ".ods",
-    "CSV (.csv)": ".csv",
-    "TSV (.tsv)": ".tsv",
-    "PNG (.png)": ".png",
-    "JPEG (.jpg, .jpeg)": ".jpg",
-    "BMP (.bmp)": ".bmp",
-    "TIFF (.tiff, .tif)": ".tiff",
-    "GIF (.gif)": ".gif",
-    "WebP (.webp)": ".webp",
-    "SVG (.svg)": ".svg",
-    "EPS (.eps)": ".eps"
-}
-
-# Function to get file extension from filename
-def get_file_extension(filename):
-    return os.path.splitext(filename)[1].lower()
+# Function to build the HTML for a download link
+def download_anchor(href, filename):
+    return f'<a href="{href}" download="{filename}" class="download-btn">Download Converted File</a>'
+
+# Function to create a link served by the streaming download server
+def create_streamed_download_link(file_path, filename):
+    url = download_url(serve_file(file_path, filename), st.context.headers.get("Host"))
+    return download_anchor(url, filename)
 
 # Function to create a download link
 def create_download_link(file_path, filename):
+    # Large outputs are streamed from disk instead of being base64-encoded into the page
+    if should_stream(os.path.getsize(file_path)):
+        return create_streamed_download_link(file_path, filename)
     with open(file_path, "rb") as f:
         bytes_data = f.read()
     b64 = base64.b64encode(bytes_data).decode()
-    href = f'<a href="data:application/octet-stream;base64,{b64}" download="{filename}" class="download-btn">Download Converted File</a>'
-    return href
-
-# Function to create a download link for in-memory data
-def create_download_link_from_bytes(bytes_data, filename):
-    b64 = base64.b64encode(bytes_data).decode()
-    href = f'<a href="data:application/octet-stream;base64,{b64}" download="{filename}" class="download-btn">Download Converted File</a>'
-    return href
-
-# Function to create a download link for multiple files (ZIP)
-def create_zip_download_link(file_paths, zip_filename):
-    # Create a temporary file to store the ZIP
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_zip:
-        with zipfile.ZipFile(temp_zip.name, 'w') as zipf:
-            for file_path in file_paths:
-                zipf.write(file_path, os.path.basename(file_path))
-    
-    # Create download link for the ZIP file
-    return create_download_link(temp_zip.name, zip_filename)
-
-# Conversion functions
-def convert_document(input_file, input_format, output_format, input_filename):
-    # Create a temporary directory for file operations
-    temp_dir = tempfile.mkdtemp()
-    
-    # Save the uploaded file to the temporary directory
-    input_path = os.path.join(temp_dir, input_filename)
-    with open(input_path, "wb") as f:
-        f.write(input_file.getbuffer())
-    
-    # Get base filename without extension
-    base_filename = os.path.splitext(input_filename)[0]
-    
-    # Document conversions
-    if input_format == "Microsoft Word (.docx, .doc)" and output_format == "PDF (.pdf)":
-        # Word to PDF conversion
-        from docx2pdf import convert
-        output_path = os.path.join(temp_dir, f"{base_filename}.pdf")
-        convert(input_path, output_path)
-        return output_path, f"{base_filename}.pdf"
-    
-    elif input_format == "PDF (.pdf)" and output_format == "Microsoft Word (.docx, .doc)":
-        # PDF to Word conversion (simplified)
-        output_path = os.path.join(temp_dir, f"{base_filename}.docx")
-        doc = Document()
-        
-        # Extract text from PDF
-        pdf_file = open(input_path, 'rb')
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text = page.extract_text()
-            doc.add_paragraph(text)
-        
-        doc.save(output_path)
-        pdf_file.close()
-        return output_path, f"{base_filename}.docx"
-    
-    elif input_format == "Plain Text (.txt)" and output_format == "Microsoft Word (.docx, .doc)":
-        # TXT to Word conversion
-        output_path = os.path.join(temp_dir, f"{base_filename}.docx")
-        doc = Document()
-        
-        with open(input_path, 'r', encoding='utf-8') as txt_file:
-            text = txt_file.read()
-            doc.add_paragraph(text)
-        
-        doc.save(output_path)
-        return output_path, f"{base_filename}.docx"
-    
-    elif input_format == "Plain Text (.txt)" and output_format == "PDF (.pdf)":
-        # TXT to PDF conversion (via Word)
-        docx_path = os.path.join(temp_dir, f"{base_filename}.docx")
-        output_path = os.path.join(temp_dir, f"{base_filename}.pdf")
-        
-        # First convert to DOCX
-        doc = Document()
-        with open(input_path, 'r', encoding='utf-8') as txt_file:
-            text = txt_file.read()
-            doc.add_paragraph(text)
-        doc.save(docx_path)
-        
-        # Then convert DOCX to PDF
-        from docx2pdf import convert
-        convert(docx_path, output_path)
-        return output_path, f"{base_filename}.pdf"
-    
-    # Add more document conversions as needed
-    
-    # Default case - return error
-    return None, "Conversion not supported"
-
-def convert_presentation(input_file, input_format, output_format, input_filename):
-    # Create a temporary directory for file operations
-    temp_dir = tempfile.mkdtemp()
-    
-    # Save the uploaded file to the temporary directory
-    input_path = os.path.join(temp_dir, input_filename)
-    with open(input_path, "wb") as f:
-        f.write(input_file.getbuffer())
-    
-    # Get base filename without extension
-    base_filename = os.path.splitext(input_filename)[0]
-    
-    # Presentation conversions
-    if input_format == "Microsoft PowerPoint (.pptx, .ppt)" and output_format == "PDF (.pdf)":
-        # PowerPoint to PDF conversion
-        # Note: Direct conversion from PPTX to PDF in Python is limited
-        # This is a simplified approach that creates a basic PDF
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
-        from pptx import Presentation
-        
-        output_path = os.path.join(temp_dir, f"{base_filename}.pdf")
-        prs = Presentation(input_path)
-        
-        # Create a simple PDF with text content from slides
-        c = canvas.Canvas(output_path, pagesize=letter)
-        for i, slide in enumerate(prs.slides):
-            if i > 0:  # Add a new page for each slide after the first
-                c.showPage()
-            
-            # Add slide number
-            c.setFont("Helvetica", 10)
-            c.drawString(500, 750, f"Slide {i+1}")
-            
-            # Add slide title if available
-            c.setFont("Helvetica-Bold", 16)
-            title_shape = next((shape for shape in slide.shapes if shape.has_text_frame and shape.text_frame.text), None)
-            if title_shape:
-                c.drawString(72, 720, title_shape.text_frame.text[:50])
-            
-            # Add text from other shapes
-            c.setFont("Helvetica", 12)
-            y_position = 680
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    for paragraph in shape.text_frame.paragraphs:
-                        text = " ".join(run.text for run in paragraph.runs)
-                        if text and text != title_shape.text_frame.text if title_shape else True:
-                            c.drawString(72, y_position, text[:80])
-                            y_position -= 20
-                            if y_position < 72:  # Avoid writing off the page
-                                break
-        
-        c.save()
-        st.info("Note: This is a basic text-only conversion. For full fidelity PowerPoint to PDF conversion, consider using desktop software like Microsoft PowerPoint or LibreOffice.")
-        return output_path, f"{base_filename}.pdf"
-    
-    elif input_format == "Microsoft PowerPoint (.pptx, .ppt)" and output_format == "PNG/JPEG Images (.png, .jpg)":
-        # PowerPoint to Images conversion
-        from pptx import Presentation
-        from PIL import Image, ImageDraw, ImageFont
-        
-        prs = Presentation(input_path)
-        
-        # Create a directory for the images
-        images_dir = os.path.join(temp_dir, "slides")
-        os.makedirs(images_dir, exist_ok=True)
-        
-        # Create simple image representations of slides
-        image_paths = []
-        for i, slide in enumerate(prs.slides):
-            img_path = os.path.join(images_dir, f"slide_{i+1}.png")
-            
-            # Create a blank image
-            img = Image.new('RGB', (1280, 720), color=(255, 255, 255))
-            draw = ImageDraw.Draw(img)
-            
-            # Try to use a system font
-            try:
-                font = ImageFont.truetype("Arial", 24)
-                small_font = ImageFont.truetype("Arial", 16)
-            except IOError:
-                font = ImageFont.load_default()
-                small_font = ImageFont.load_default()
-            
-            # Add slide number
-            draw.text((1150, 30), f"Slide {i+1}", fill=(0, 0, 0), font=small_font)
-            
-            # Add slide title if available
-            title_shape = next((shape for shape in slide.shapes if shape.has_text_frame and shape.text_frame.text), None)
-            if title_shape:
-                draw.text((100, 100), title_shape.text_frame.text[:50], fill=(0, 0, 0), font=font)
-            
-            # Add text from other shapes
-            y_position = 200
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    for paragraph in shape.text_frame.paragraphs:
-                        text = " ".join(run.text for run in paragraph.runs)
-                        if text and text != title_shape.text_frame.text if title_shape else True:
-                            draw.text((100, y_position), text[:80], fill=(0, 0, 0), font=small_font)
-                            y_position += 30
-                            if y_position > 650:  # Avoid writing off the image
-                                break
-            
-            img.save(img_path)
-            image_paths.append(img_path)
-        
-        # Create a ZIP file with all images
-        zip_path = os.path.join(temp_dir, f"{base_filename}_slides.zip")
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for img_path in image_paths:
-                zipf.write(img_path, os.path.basename(img_path))
-        
-        st.info("Note: This is a basic text-only conversion. For full fidelity PowerPoint to image conversion, consider using desktop software.")
-        return zip_path, f"{base_filename}_slides.zip"
-    
-    # Add more presentation conversions as needed
-    
-    # Default case - return error
-    return None, "Conversion not supported"
-
-def convert_spreadsheet(input_file, input_format, output_format, input_filename):
-    # Create a temporary directory for file operations
-    temp_dir = tempfile.mkdtemp()
-    
-    # Save the uploaded file to the temporary directory
-    input_path = os.path.join(temp_dir, input_filename)
-    with open(input_path, "wb") as f:
-        f.write(input_file.getbuffer())
-    
-    # Get base filename without extension
-    base_filename = os.path.splitext(input_filename)[0]
-    
-    # Spreadsheet conversions
-    if input_format == "Microsoft Excel (.xlsx, .xls)" and output_format == "CSV (.csv)":
-        # Excel to CSV conversion
-        output_path = os.path.join(temp_dir, f"{base_filename}.csv")
-        df = pd.read_excel(input_path)
-        df.to_csv(output_path, index=False)
-        return output_path, f"{base_filename}.csv"
-    
-    elif input_format == "Microsoft Excel (.xlsx, .xls)" and output_format == "TSV (.tsv)":
-        # Excel to TSV conversion
-        output_path = os.path.join(temp_dir, f"{base_filename}.tsv")
-        df = pd.read_excel(input_path)
-        df.to_csv(output_path, sep='\t', index=False)
-        return output_path, f"{base_filename}.tsv"
-    
-    elif input_format == "CSV (.csv)" and output_format == "Microsoft Excel (.xlsx, .xls)":
-        # CSV to Excel conversion
-        output_path = os.path.join(temp_dir, f"{base_filename}.xlsx")
-        df = pd.read_csv(input_path)
-        df.to_excel(output_path, index=False)
-        return output_path, f"{base_filename}.xlsx"
-    
-    elif input_format == "TSV (.tsv)" and output_format == "Microsoft Excel (.xlsx, .xls)":
-        # TSV to Excel conversion
-        output_path = os.path.join(temp_dir, f"{base_filename}.xlsx")
-        df = pd.read_csv(input_path, sep='\t')
-        df.to_excel(output_path, index=False)
-        return output_path, f"{base_filename}.xlsx"
-    
-    elif input_format == "CSV (.csv)" and output_format == "TSV (.tsv)":
-        # CSV to TSV conversion
-        output_path = os.path.join(temp_dir, f"{base_filename}.tsv")
-        df = pd.read_csv(input_path)
-        df.to_csv(output_path, sep='\t', index=False)
-        return output_path, f"{base_filename}.tsv"
-    
-    elif input_format == "TSV (.tsv)" and output_format == "CSV (.csv)":
-        # TSV to CSV conversion
-        output_path = os.path.join(temp_dir, f"{base_filename}.csv")
-        df = pd.read_csv(input_path, sep='\t')
-        df.to_csv(output_path, index=False)
-        return output_path, f"{base_filename}.csv"
-    
-    # Add more spreadsheet conversions as needed
-    
-    # Default case - return error
-    return None, "Conversion not supported"
+    return download_anchor(f"data:application/octet-stream;base64,{b64}", filename)
 
-def convert_image(input_file, input_format, output_format, input_filename):
-    # Create a temporary directory for file operations
-    temp_dir = tempfile.mkdtemp()
-    
-    # Save the uploaded file to the temporary directory
-    input_path = os.path.join(temp_dir, input_filename)
-    with open(input_path, "wb") as f:
-        f.write(input_file.getbuffer())
-    
-    # Get base filename without extension
-    base_filename = os.path.splitext(input_filename)[0]
-    
-    # Image conversions
-    try:
-        img = Image.open(input_path)
-        
-        if output_format == "PNG (.png)":
-            output_path = os.path.join(temp_dir, f"{base_filename}.png")
-            img = img.convert("RGBA")
-            img.save(output_path, "PNG")
-            return output_path, f"{base_filename}.png"
-        
-        elif output_format == "JPEG (.jpg, .jpeg)":
-            output_path = os.path.join(temp_dir, f"{base_filename}.jpg")
-            img = img.convert("RGB")  # Remove alpha for JPG
-            img.save(output_path, "JPEG", quality=95)
-            return output_path, f"{base_filename}.jpg"
-        
-        elif output_format == "BMP (.bmp)":
-            output_path = os.path.join(temp_dir, f"{base_filename}.bmp")
-            img.save(output_path, "BMP")
-            return output_path, f"{base_filename}.bmp"
-        
-        elif output_format == "TIFF (.tiff, .tif)":
-            output_path = os.path.join(temp_dir, f"{base_filename}.tiff")
-            img.save(output_path, "TIFF")
-            return output_path, f"{base_filename}.tiff"
-        
-        elif output_format == "WebP (.webp)":
-            output_path = os.path.join(temp_dir, f"{base_filename}.webp")
-            img.save(output_path, "WebP", quality=95)
-            return output_path, f"{base_filename}.webp"
-        
-        # Add more image conversions as needed
-    
-    except Exception as e:
-        st.error(f"Error converting image: {str(e)}")
-        return None, f"Error: {str(e)}"
-    
-    # Default case - return error
-    return None, "Conversion not supported"
-
-def convert_vector(input_file, input_format, output_format, input_filename):
-    # Create a temporary directory for file operations
-    temp_dir = tempfile.mkdtemp()
-    
-    # Save the uploaded file to the temporary directory
-    input_path = os.path.join(temp_dir, input_filename)
-    with open(input_path, "wb") as f:
-        f.write(input_file.getbuffer())
-    
-    # Get base filename without extension
-    base_filename = os.path.splitext(input_filename)[0]
-    
-    # Vector graphics conversions
-    if input_format == "SVG (.svg)" and output_format == "PNG (.png)":
-        # SVG to PNG conversion using svglib
-        output_path = os.path.join(temp_dir, f"{base_filename}.png")
-        drawing = svg2rlg(input_path)
-        renderPM.drawToFile(drawing, output_path, fmt="PNG")
-        return output_path, f"{base_filename}.png"
-    
-    elif input_format == "SVG (.svg)" and output_format == "JPEG (.jpg, .jpeg)":
-        # SVG to JPEG conversion using svglib
-        output_path = os.path.join(temp_dir, f"{base_filename}.jpg")
-        drawing = svg2rlg(input_path)
-        renderPM.drawToFile(drawing, output_path, fmt="JPEG")
-        return output_path, f"{base_filename}.jpg"
-    
-    elif input_format == "SVG (.svg)" and output_format == "PDF (.pdf)":
-        # SVG to PDF conversion
-        # For PDF conversion, you can use reportlab
-        from reportlab.graphics import renderPDF
-        output_path = os.path.join(temp_dir, f"{base_filename}.pdf")
-        drawing = svg2rlg(input_path)
-        renderPDF.drawToFile(drawing, output_path)
-        return output_path, f"{base_filename}.pdf"
-    
-    # Add more vector graphics conversions as needed
-    
-    # Default case - return error
-    return None, "Conversion not supported"
+# Function to pick the domain and input format from the contents of the upload(s) under key,
+# when they all agree; runs before the rerun, so the selectboxes show the detected format
+def route_upload(key):
+    uploads = st.session_state.get(key)
+    if not uploads:
+        return
+    if not isinstance(uploads, list):
+        uploads = [uploads]
+    detected = {detect_format(upload, upload.name) for upload in uploads}
+    st.session_state["detected_format"] = detected.pop() if len(detected) == 1 else None
+    domains = domains_for_input(st.session_state["detected_format"])
+    if not domains:
+        return
+    # Formats in several domains (PDF) keep the domain already chosen
+    if st.session_state.get("domain") not in domains:
+        st.session_state["domain"] = domains[0]
+    st.session_state[f"input_format_{st.session_state['domain']}"] = st.session_state["detected_format"]
 
 # Main app layout
 
 st.markdown("<div class='sub-header'>Step 1: Select File Domain</div>", unsafe_allow_html=True)
-domain = st.selectbox("Select File Domain", list(format_domains.keys()))
+domain = st.selectbox("Select File Domain", list(format_domains.keys()), key="domain")
 
 col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("<div class='sub-header'>Step 2: Select Input Format</div>", unsafe_allow_html=True)
-    input_format = st.selectbox("Select Input Format", format_domains[domain]["Input Formats"])
+    input_format = st.selectbox("Select Input Format", format_domains[domain]["Input Formats"], key=f"input_format_{domain}")
 
 with col2:
     st.markdown("<div class='sub-header'>Step 3: Select Output Format</div>", unsafe_allow_html=True)
     output_format = st.selectbox("Select Output Format", format_domains[domain]["Conversions"].get(input_format, ["No compatible formats"]))
 
+# Optional converter settings for the selected domain
+conversion_options = {}
+if domain == "Image Formats":
+    with st.expander("Image options"):
+        conversion_options["preset"] = st.selectbox("Encoder preset", ["balanced", "fast", "small"],
+                                                    help="fast: quickest encode, small: smallest file (progressive JPEG, max PNG/WebP compression)")
+        max_dimension = st.number_input("Downscale to at most this many pixels per side (0 keeps the original size)", min_value=0, value=0, step=256)
+        if max_dimension:
+            conversion_options["max_dimension"] = int(max_dimension)
+
+if input_format in ("Microsoft Excel (.xlsx, .xls)", "OpenDocument Spreadsheet (.ods)") and output_format in ("CSV (.csv)", "TSV (.tsv)", "Microsoft Excel (.xlsx, .xls)", *columnar_formats):
+    with st.expander("Sheet options"):
+        sheets = st.text_input("Sheets to convert (names or numbers separated by commas, * for all)",
+                               help="Blank converts the first sheet to CSV/TSV/Parquet/Feather and every sheet to Excel. Several sheets to a single-table format give a ZIP with one file per sheet.")
+        if sheets.strip():
+            conversion_options["sheets"] = sheets.strip()
+        usecols = st.text_input("Columns to keep (Excel letters like A:C, or header names separated by commas)")
+        if usecols.strip():
+            conversion_options["usecols"] = usecols.strip()
+        conversion_options["as_text"] = st.checkbox("Read every cell as text (faster, keeps leading zeros)")
+
+if output_format in columnar_formats:
+    with st.expander("Columnar options"):
+        conversion_options["compression"] = st.selectbox("Compression codec", compression_codecs[columnar_formats[output_format]],
+                                                         help="snappy and lz4 are fastest, zstd gives smaller files at a similar speed, gzip and brotli are smallest and slowest")
+        if input_format in ("CSV (.csv)", "TSV (.tsv)"):
+            conversion_options["as_text"] = st.checkbox("Read every cell as text (keeps leading zeros, avoids type changes between row groups)")
+
+if input_format == "Plain Text (.txt)":
+    conversion_options["paragraphs"] = st.radio("Paragraphs", ["line", "block"], horizontal=True,
+                                                format_func=lambda mode: "One per line" if mode == "line" else "One per blank-line-separated block")
+
+if input_format == "Microsoft PowerPoint (.pptx, .ppt)" and output_format == "PNG/JPEG Images (.png, .jpg)":
+    with st.expander("Slide image options"):
+        conversion_options["slide_width"] = int(st.number_input("Image width (pixels)", min_value=320, max_value=3840, value=config.SLIDE_IMAGE_WIDTH, step=160))
+        conversion_options["image_format"] = st.radio("Image format", ["png", "jpeg"], horizontal=True, key="slide_image_format")
+
+if input_format in ("SVG (.svg)", "EPS (.eps)") and output_format in ("PNG (.png)", "JPEG (.jpg, .jpeg)", "PDF (.pdf)"):
+    with st.expander("Render options"):
+        sizes = st.text_input("Sizes (e.g. 1x, 2x, 300dpi, 64w, 128h; blank for the drawing's own size)")
+        if sizes.strip():
+            conversion_options["sizes"] = sizes.strip()
+        extra_formats = st.multiselect("Also render as", [fmt for fmt in format_domains[domain]["Conversions"][input_format] if fmt != output_format])
+        if extra_formats:
+            conversion_options["extra_formats"] = extra_formats
+
+if input_format == "PDF (.pdf)":
+    page_range = st.text_input("Pages to convert (e.g. 1-5, 8, 10-; leave blank for all pages)")
+    if page_range.strip():
+        conversion_options["page_range"] = page_range.strip()
+    if output_format in ("PNG (.png)", "JPEG (.jpg, .jpeg)", "PNG/JPEG Images (.png, .jpg)"):
+        conversion_options["dpi"] = int(st.number_input("Resolution (DPI)", min_value=36, max_value=600, value=min(max(config.RASTER_DPI, 36), 600), step=25))
+    if output_format == "PNG/JPEG Images (.png, .jpg)":
+        conversion_options["image_format"] = st.radio("Image format", ["png", "jpeg"], horizontal=True)
+
 st.markdown("<div class='sub-header'>Step 4: Upload File</div>", unsafe_allow_html=True)
-uploaded_file = st.file_uploader("Upload your file", type=None)
+batch_mode = st.toggle("Batch mode (convert many files into one ZIP)")
+if batch_mode:
+    uploaded_files = st.file_uploader("Upload your files", type=None, accept_multiple_files=True,
+                                      key="upload_batch", on_change=route_upload, args=("upload_batch",))
+    uploaded_file = None
+else:
+    uploaded_files = []
+    uploaded_file = st.file_uploader("Upload your file", type=None, key="upload", on_change=route_upload, args=("upload",))
+if (uploaded_file or uploaded_files) and st.session_state.get("detected_format"):
+    st.caption(f"Detected {st.session_state['detected_format']} from the file's contents")
+
+# Each browser session is one user for the job queue's per-user limits
+owner = st.session_state.setdefault("owner", uuid.uuid4().hex)
+job_manager = get_job_manager()
+
+# Batch conversion process
+if uploaded_files:
+    st.markdown("<div class='sub-header'>Step 5: Convert Files</div>", unsafe_allow_html=True)
+    
+    if st.button("Convert Files"):
+        # Files that are not in the input format are turned away before anything is staged
+        matching = []
+        for f in uploaded_files:
+            problem = check_format(f, input_format)
+            if problem:
+                st.warning(f"Skipped {f.name}: {problem}")
+            else:
+                matching.append((f, f.name))
+        if matching:
+            job = submit_batch(owner, matching, input_format, output_format, options=conversion_options)
+            st.toast(f"Queued {len(matching)} files as job {job.id}")
 
 # Conversion process
 if uploaded_file is not None:
     st.markdown("<div class='sub-header'>Step 5: Convert File</div>", unsafe_allow_html=True)
     
     if st.button("Convert File"):
-        with st.spinner("Converting file..."):
-            # Determine which conversion function to use based on the domain
-            if domain == "Document Formats":
-                output_path, output_filename = convert_document(uploaded_file, input_format, output_format, uploaded_file.name)
-            elif domain == "Presentation Formats":
-                output_path, output_filename = convert_presentation(uploaded_file, input_format, output_format, uploaded_file.name)
-            elif domain == "Spreadsheet Formats":
-                output_path, output_filename = convert_spreadsheet(uploaded_file, input_format, output_format, uploaded_file.name)
-            elif domain == "Image Formats":
-                output_path, output_filename = convert_image(uploaded_file, input_format, output_format, uploaded_file.name)
-            elif domain == "Vector Graphics":
-                output_path, output_filename = convert_vector(uploaded_file, input_format, output_format, uploaded_file.name)
-            
-            # Add a small delay to simulate processing
-            time.sleep(1)
+        # A file that is not in the input format is turned away before it is staged
+        problem = check_format(uploaded_file, input_format)
+        if problem:
+            st.error(f"Conversion failed: {problem}")
+        else:
+            try:
+                job = submit_conversion(owner, uploaded_file, input_format, output_format, uploaded_file.name, options=conversion_options)
+                st.toast(f"Queued {uploaded_file.name} as job {job.id}")
+            except ScratchSpaceFull as e:
+                st.error(f"Conversion failed: {str(e)}")
+
+# Function to create a job's download link once and reuse it on later reruns
+def job_download_link(job):
+    links = st.session_state.setdefault("job_links", {})
+    if job.id not in links:
+        start = time.perf_counter()
+        links[job.id] = create_download_link(job.output_path, job.output_filename)
+        if job.metrics:
+            job.metrics["stages"]["delivery"] = round(time.perf_counter() - start, 6)
+    return links[job.id]
+
+# Function to link a batch ZIP that is still being built, so its download starts before the
+# last file is converted; the link is made once and reused on later reruns
+def job_streaming_link(job):
+    links = st.session_state.setdefault("job_stream_links", {})
+    if job.id not in links:
+        url = download_url(serve_file(job.archive.path, os.path.basename(job.archive.path), job.archive), st.context.headers.get("Host"))
+        links[job.id] = f'<a href="{url}" download class="download-btn">Download while converting</a>'
+    return links[job.id]
+
+# Function to show one job with its status, progress and result
+def show_job(job):
+    with st.container(border=True):
+        st.markdown(f"**{job.label}** · job `{job.id}`")
+        for notice in job.notices:
+            st.info(notice)
+        
+        if job.status == "queued":
+            st.caption(f"Waiting for a worker (position {job_manager.queue_position(job)} in your queue)")
+            if st.button("Cancel", key=f"cancel-{job.id}"):
+                job_manager.cancel(job.id)
+                st.rerun()
+        
+        elif job.status == "running":
+            st.progress(job.progress, text=f"Converting... {job.elapsed:.0f}s")
+            if job.archive is not None and not job.archive.finished.is_set():
+                st.markdown(job_streaming_link(job), unsafe_allow_html=True)
+        
+        elif job.status == "done":
+            st.markdown(f"""
+            <div class='success-message'>
+                <h3>Conversion Complete!</h3>
+                <p>Finished in {job.elapsed:.1f}s.</p>
+            </div>
+            """, unsafe_allow_html=True)
+            st.markdown(job_download_link(job), unsafe_allow_html=True)
             
-            # Check if conversion was successful
-            if output_path:
-                st.markdown(f"""
-                <div class='success-message'>
-                    <h3>Conversion Complete!</h3>
-                    <p>Your file has been successfully converted from {input_format} to {output_format}.</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Create download link
-                st.markdown(create_download_link(output_path, output_filename), unsafe_allow_html=True)
-                
-                # Preview if possible
-                if domain == "Image Formats" or (domain == "Vector Graphics" and "PNG" in output_format or "JPEG" in output_format):
-                    st.image(output_path, caption="Preview of converted image", use_column_width=True)
-            else:
-                st.error(f"Conversion failed: {output_filename}")
-                st.info("This conversion may not be fully implemented in this demo or requires additional libraries.")
+            # Preview if possible
+            if os.path.splitext(job.output_filename)[1].lower() in (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp"):
+                st.image(job.output_path, caption="Preview of converted image", use_column_width=True)
+        
+        else:
+            st.error(f"Conversion failed: {job.message}")
+            st.info("This conversion may not be fully implemented in this demo or requires additional libraries.")
+        
+        if not job.active and st.button("Dismiss", key=f"dismiss-{job.id}"):
+            job_manager.discard(job.id)
+            st.session_state.get("job_links", {}).pop(job.id, None)
+            st.session_state.get("job_stream_links", {}).pop(job.id, None)
+            st.rerun()
+
+# Function to list this session's jobs; it reruns on its own while any are queued or running
+def show_jobs():
+    jobs = job_manager.jobs_for(owner)
+    if not jobs:
+        return
+    st.markdown("<div class='sub-header'>Conversions</div>", unsafe_allow_html=True)
+    for job in reversed(jobs):
+        show_job(job)
+    # Stop polling once the last job finishes
+    if st.session_state.get("jobs_polling") and not any(job.active for job in jobs):
+        st.session_state["jobs_polling"] = False
+        st.rerun()
+
+jobs_active = any(job.active for job in job_manager.jobs_for(owner))
+st.session_state["jobs_polling"] = jobs_active
+st.fragment(show_jobs, run_every=1.0 if jobs_active else None)()
 
 # Footer with information
 st.markdown("---")
@@ -605,8 +319,24 @@ with st.sidebar:
     1. Select the file domain
     2. Choose input format
     3. Select output format
-    4. Upload your file
+    4. Upload your file (or several, in batch mode)
     5. Click Convert
     6. Download the converted file
     """)
 
+    
+    st.markdown("### Result Cache")
+    st.caption(f"Hits: {cache_stats['hits']} · Misses: {cache_stats['misses']} · Evictions: {cache_stats['evictions']}")
+    
+    st.markdown("### Debug")
+    if st.toggle("Show conversion metrics"):
+        measured = [job for job in job_manager.jobs_for(owner) if job.metrics]
+        if measured:
+            st.json(measured[-1].metrics)
+        else:
+            st.caption("Convert a file to see its stage timings.")
+        st.download_button("Prometheus metrics", prometheus_text(), file_name="flexifile_metrics.prom", mime="text/plain")
+        st.download_button("Recent conversions (JSON lines)", json_lines(), file_name="flexifile_metrics.jsonl", mime="application/x-ndjson")
+    
+    st.markdown("### Startup")
+    st.caption(f"Cold start imports: {cold_start_seconds() * 1000:.0f} ms · This run: {(time.perf_counter() - run_started) * 1000:.0f} ms")
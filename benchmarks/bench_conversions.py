@@ -0,0 +1,382 @@
+# Benchmark every registered conversion pair on synthetic fixtures
+#
+#   python benchmarks/bench_conversions.py [--repeat 5] [--rows 100000] [--pages 50] ...
+#                                          [--pairs PDF] [--output results.json]
+#   python benchmarks/bench_conversions.py --compare baseline.json current.json [--threshold 0.1]
+#
+# Fixtures are generated once per run at the requested sizes. Each pair then runs
+# in a fresh process: one untimed warm-up (imports, pools), then --repeat timed
+# conversions with the result cache off. The JSON written to --output holds
+# latency percentiles, throughput (MB/s and rows/pages/slides/frames per second)
+# and the RSS each pair's timed runs add on top of the warmed-up process. --compare reads two such files and exits with status 1
+# when a pair got slower or hungrier than --threshold allows, or stopped working.
+import argparse
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Function to build a grayscale gradient; it compresses like a photo, unlike noise
+def gradient_image(megapixels, mode="RGB"):
+    from PIL import Image
+
+    side = max(16, int((megapixels * 1_000_000) ** 0.5))
+    img = Image.linear_gradient("L").resize((side, side))
+    if mode != "L":
+        img = Image.merge("RGB", (img, img.rotate(90), img.rotate(180))).convert(mode)
+    return img
+
+def make_delimited(path, args, sep):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(sep.join(["id", "name", "amount", "note"]) + "\n")
+        for row in range(args.rows):
+            f.write(sep.join([str(row), f"item {row}", f"{row * 1.5:.2f}", "lorem ipsum dolor"]) + "\n")
+    return args.rows, "rows"
+
+def make_csv(directory, args):
+    path = os.path.join(directory, "fixture.csv")
+    return (path, *make_delimited(path, args, ","))
+
+def make_tsv(directory, args):
+    path = os.path.join(directory, "fixture.tsv")
+    return (path, *make_delimited(path, args, "\t"))
+
+def make_xlsx(directory, args):
+    from openpyxl import Workbook
+
+    path = os.path.join(directory, "fixture.xlsx")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["id", "name", "amount", "note"])
+    for row in range(args.rows):
+        ws.append([row, f"item {row}", row * 1.5, "lorem ipsum dolor"])
+    wb.save(path)
+    return path, args.rows, "rows"
+
+def make_columnar(kind, ext):
+    def make(directory, args):
+        import pandas as pd
+        from flexifile.columnar import write_frame
+
+        path = os.path.join(directory, f"fixture.{ext}")
+        df = pd.DataFrame({"id": range(args.rows), "name": [f"item {row}" for row in range(args.rows)],
+                           "amount": [row * 1.5 for row in range(args.rows)], "note": "lorem ipsum dolor"})
+        write_frame(df, path, kind, "snappy" if kind == "parquet" else "lz4")
+        return path, args.rows, "rows"
+    return make
+
+def make_txt(directory, args):
+    path = os.path.join(directory, "fixture.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        for line in range(args.paragraphs):
+            f.write(f"Paragraph {line}: the quick brown fox jumps over the lazy dog.\n")
+    return path, args.paragraphs, "paragraphs"
+
+def make_docx(directory, args):
+    from docx import Document
+
+    path = os.path.join(directory, "fixture.docx")
+    doc = Document()
+    for line in range(args.paragraphs):
+        doc.add_paragraph(f"Paragraph {line}: the quick brown fox jumps over the lazy dog.")
+    doc.save(path)
+    return path, args.paragraphs, "paragraphs"
+
+def make_rtf(directory, args):
+    path = os.path.join(directory, "fixture.rtf")
+    with open(path, "w", encoding="ascii") as f:
+        f.write("{\\rtf1\\ansi\\deff0{\\fonttbl{\\f0 Helvetica;}}\n")
+        for line in range(args.paragraphs):
+            f.write(f"Paragraph {line}: the quick brown fox jumps over the lazy dog.\\par\n")
+        f.write("}\n")
+    return path, args.paragraphs, "paragraphs"
+
+def make_html(directory, args):
+    path = os.path.join(directory, "fixture.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><body>\n")
+        for line in range(args.paragraphs):
+            f.write(f"<p>Paragraph {line}: the quick brown fox jumps over the lazy dog.</p>\n")
+        f.write("</body></html>\n")
+    return path, args.paragraphs, "paragraphs"
+
+def make_pdf(directory, args):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    path = os.path.join(directory, "fixture.pdf")
+    c = canvas.Canvas(path, pagesize=letter)
+    for page in range(args.pages):
+        y = 720
+        for line in range(40):
+            c.drawString(72, y, f"Page {page + 1}, line {line + 1}: the quick brown fox jumps over the lazy dog.")
+            y -= 16
+        c.showPage()
+    c.save()
+    return path, args.pages, "pages"
+
+def make_pptx(directory, args):
+    from pptx import Presentation
+
+    path = os.path.join(directory, "fixture.pptx")
+    prs = Presentation()
+    for slide_number in range(args.slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {slide_number + 1}"
+        slide.placeholders[1].text = "\n".join(f"Bullet {i + 1}: the quick brown fox" for i in range(5))
+    prs.save(path)
+    return path, args.slides, "slides"
+
+def make_still_image(fmt, ext, mode="RGB"):
+    def make(directory, args):
+        path = os.path.join(directory, f"fixture.{ext}")
+        gradient_image(args.megapixels, mode).save(path, fmt)
+        return path, args.megapixels, "megapixels"
+    return make
+
+def make_animation(fmt, ext):
+    def make(directory, args):
+        path = os.path.join(directory, f"fixture.{ext}")
+        base = gradient_image(args.megapixels / args.frames)
+        frames = [base.rotate(i * 360 / args.frames) for i in range(args.frames)]
+        frames[0].save(path, fmt, save_all=True, append_images=frames[1:], duration=80, loop=0)
+        return path, args.frames, "frames"
+    return make
+
+def make_png_sequence(directory, args):
+    path = os.path.join(directory, "fixture.zip")
+    base = gradient_image(args.megapixels / args.frames)
+    with zipfile.ZipFile(path, "w") as zipf:
+        for i in range(args.frames):
+            buffer = io.BytesIO()
+            base.rotate(i * 360 / args.frames).save(buffer, "PNG")
+            zipf.writestr(f"frame_{i + 1:04d}.png", buffer.getvalue())
+    return path, args.frames, "frames"
+
+def make_svg(directory, args):
+    path = os.path.join(directory, "fixture.svg")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" width="800" height="600">\n')
+        for i in range(args.shapes):
+            x, y = (i * 37) % 780, (i * 53) % 580
+            f.write(f'<circle cx="{x}" cy="{y}" r="{5 + i % 15}" fill="#{(i * 2654435761) % 0xFFFFFF:06x}"/>\n')
+            f.write(f'<path d="M{x} {y} l20 10 l-10 20 z" stroke="black" fill="none"/>\n')
+        f.write("</svg>\n")
+    return path, args.shapes, "shapes"
+
+# Input format -> fixture builder; formats without one (ODT, ODP, ODS) are reported as skipped
+fixture_builders = {
+    "CSV (.csv)": make_csv,
+    "TSV (.tsv)": make_tsv,
+    "Microsoft Excel (.xlsx, .xls)": make_xlsx,
+    "Apache Parquet (.parquet)": make_columnar("parquet", "parquet"),
+    "Apache Arrow/Feather (.feather, .arrow)": make_columnar("feather", "feather"),
+    "Plain Text (.txt)": make_txt,
+    "Microsoft Word (.docx, .doc)": make_docx,
+    "Rich Text Format (.rtf)": make_rtf,
+    "HTML (.html, .htm)": make_html,
+    "PDF (.pdf)": make_pdf,
+    "Microsoft PowerPoint (.pptx, .ppt)": make_pptx,
+    "PNG (.png)": make_still_image("PNG", "png"),
+    "JPEG (.jpg, .jpeg)": make_still_image("JPEG", "jpg"),
+    "BMP (.bmp)": make_still_image("BMP", "bmp"),
+    "TIFF (.tiff, .tif)": make_still_image("TIFF", "tiff"),
+    "GIF (.gif)": make_animation("GIF", "gif"),
+    "WebP (.webp)": make_animation("WEBP", "webp"),
+    "PNG Image Sequence (.zip)": make_png_sequence,
+    "SVG (.svg)": make_svg
+}
+
+# Function to pick the nearest-rank percentile of a list of samples
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+# Function to read this process's current resident set size in MB (Linux), or None
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+# Function to reset the kernel's peak RSS mark, so the next reading covers only what follows (Linux)
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+# Function to read the peak RSS in MB: VmHWM, which reset_peak_rss clears (Linux), else
+# ru_maxrss, which never resets and in a spawned child also counts the parent's RSS before exec
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak_kb / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+# Function to time one conversion pair (runs in a child process)
+def run_case(queue, input_path, input_format, output_format, repeat):
+    from flexifile import config, convert
+    from flexifile.scratch import release_workspace
+
+    config.CACHE_ENABLED = False
+    input_filename = os.path.basename(input_path)
+    try:
+        # Warm-up: lazy backend imports and worker pools are not part of the steady state
+        output_path, message = convert(input_path, input_format, output_format, input_filename)
+        if not output_path:
+            queue.put({"status": "failed", "message": message})
+            return
+        release_workspace(output_path)
+
+        # Memory is measured from the warmed-up process, so the interpreter, the imported
+        # backends and anything the harness left behind do not count against the pair
+        baseline_mb = current_rss_mb() or peak_rss_mb()
+        reset_peak_rss()
+        samples = []
+        output_bytes = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output_path, message = convert(input_path, input_format, output_format, input_filename)
+            samples.append(time.perf_counter() - start)
+            output_bytes = os.path.getsize(output_path)
+            release_workspace(output_path)
+    except Exception as e:
+        queue.put({"status": "error", "message": f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"})
+        return
+
+    queue.put({"status": "ok", "samples": samples, "output_bytes": output_bytes,
+               "rss_growth_mb": max(0.0, peak_rss_mb() - baseline_mb)})
+
+# Function to run every selected pair and return the result records
+def run_benchmarks(args):
+    from flexifile import supported_conversions
+
+    directory = tempfile.mkdtemp(prefix="flexifile-bench-")
+    fixtures = {}
+    results = []
+    context = multiprocessing.get_context("spawn")
+
+    for input_format, output_format in supported_conversions():
+        name = f"{input_format} -> {output_format}"
+        if args.pairs and not any(term.lower() in name.lower() for term in args.pairs):
+            continue
+        record = {"input_format": input_format, "output_format": output_format}
+        builder = fixture_builders.get(input_format)
+        if builder is None:
+            results.append({**record, "status": "skipped", "message": "no fixture generator for this input format"})
+            print(f"{name:<70} skipped (no fixture)")
+            continue
+        if input_format not in fixtures:
+            fixtures[input_format] = builder(directory, args)
+        input_path, units, unit = fixtures[input_format]
+
+        queue = context.Queue()
+        process = context.Process(target=run_case, args=(queue, input_path, input_format, output_format, args.repeat))
+        process.start()
+        outcome = queue.get()
+        process.join()
+
+        record.update(outcome, input_bytes=os.path.getsize(input_path), units=units, unit=unit)
+        if outcome["status"] == "ok":
+            samples = outcome["samples"]
+            p50 = percentile(samples, 50)
+            record.update(p50=p50, p90=percentile(samples, 90), p99=percentile(samples, 99),
+                          mean=sum(samples) / len(samples),
+                          mb_per_s=record["input_bytes"] / 1e6 / p50,
+                          units_per_s=units / p50)
+            print(f"{name:<70} p50 {p50 * 1000:>9.1f} ms  p90 {record['p90'] * 1000:>9.1f} ms  "
+                  f"{record['mb_per_s']:>8.2f} MB/s  {record['units_per_s']:>10.1f} {unit}/s  "
+                  f"RSS +{outcome['rss_growth_mb']:>7.1f} MB")
+        else:
+            print(f"{name:<70} {outcome['status']}: {outcome['message']}")
+        results.append(record)
+    return results
+
+# Function to compare two result files and return the list of regressions
+def compare(baseline_path, current_path, threshold):
+    with open(baseline_path) as f:
+        baseline_run = json.load(f)
+    with open(current_path) as f:
+        current_run = json.load(f)
+    baseline = {(r["input_format"], r["output_format"]): r for r in baseline_run["results"]}
+    current = {(r["input_format"], r["output_format"]): r for r in current_run["results"]}
+
+    # Latencies are only comparable between runs over the same fixtures
+    for key in ("rows", "paragraphs", "pages", "slides", "megapixels", "frames", "shapes"):
+        if baseline_run["meta"].get(key) != current_run["meta"].get(key):
+            print(f"warning: --{key} differs between runs ({baseline_run['meta'].get(key)} vs {current_run['meta'].get(key)})")
+
+    regressions = []
+    print(f"{'pair':<70} {'p50 before':>11} {'p50 after':>11} {'change':>8} {'RSS change':>11}")
+    for pair, before in baseline.items():
+        after = current.get(pair)
+        name = f"{pair[0]} -> {pair[1]}"
+        if before["status"] != "ok" or after is None:
+            continue
+        if after["status"] != "ok":
+            regressions.append(f"{name}: {after['status']} ({after.get('message', '')})")
+            print(f"{name:<70} {'':>11} {after['status']:>11}")
+            continue
+        change = after["p50"] / before["p50"] - 1
+        # Growth can be close to zero, so anything under 1 MB counts as 1 MB
+        rss_change = max(after["rss_growth_mb"], 1.0) / max(before.get("rss_growth_mb", after["rss_growth_mb"]), 1.0) - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(f"{name}: p50 {change:+.0%}")
+            flag = "  SLOWER"
+        if rss_change > threshold:
+            regressions.append(f"{name}: RSS growth {rss_change:+.0%}")
+            flag += "  MORE MEMORY"
+        print(f"{name:<70} {before['p50'] * 1000:>9.1f}ms {after['p50'] * 1000:>9.1f}ms {change:>+8.0%} {rss_change:>+11.0%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=50_000, help="rows in CSV/TSV/Excel/Parquet/Feather fixtures")
+    parser.add_argument("--paragraphs", type=int, default=2_000, help="paragraphs in TXT/DOCX/RTF/HTML fixtures")
+    parser.add_argument("--pages", type=int, default=20, help="pages in the PDF fixture")
+    parser.add_argument("--slides", type=int, default=20, help="slides in the PPTX fixture")
+    parser.add_argument("--megapixels", type=float, default=4, help="size of image fixtures (shared across frames for animations)")
+    parser.add_argument("--frames", type=int, default=10, help="frames in GIF/WebP/PNG-sequence fixtures")
+    parser.add_argument("--shapes", type=int, default=500, help="shapes in the SVG fixture")
+    parser.add_argument("--pairs", nargs="*", help="only run pairs whose name contains one of these terms")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown or RSS growth that counts as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+
+    results = run_benchmarks(args)
+    if args.output:
+        meta = {key: value for key, value in vars(args).items() if key not in ("compare", "output", "threshold")}
+        meta.update(python=platform.python_version(), machine=platform.machine(), cpus=os.cpu_count(), timestamp=time.time())
+        with open(args.output, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
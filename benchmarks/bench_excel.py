@@ -0,0 +1,87 @@
+# Parse-time and memory benchmark for Excel ingestion (flexifile.workbook)
+#
+#   python benchmarks/bench_excel.py [--rows 200000] [--sheets 3] [--repeat 3]
+#
+# "legacy" is the original pd.read_excel(path) call, which only reads the first
+# sheet. The other rows open the workbook once through flexifile.workbook and
+# parse the first or every sheet with the given engine and hints. Each case runs
+# in a fresh process so peak RSS is measured per case.
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Function to write a workbook with the given number of sheets and rows per sheet
+def make_fixture(directory, rows, sheets):
+    from openpyxl import Workbook
+
+    path = os.path.join(directory, "fixture.xlsx")
+    wb = Workbook(write_only=True)
+    for sheet in range(sheets):
+        ws = wb.create_sheet(f"Sheet {sheet + 1}")
+        ws.append(["id", "sku", "name", "amount", "quantity", "note"])
+        for row in range(rows):
+            ws.append([row, f"{row:08d}", f"item {row}", row * 1.25, row % 97, "lorem ipsum dolor sit amet"])
+    wb.save(path)
+    return path
+
+# Function timing one case (runs in a child process)
+def run_case(queue, path, engine, sheets, as_text, repeat):
+    from flexifile import config
+
+    config.EXCEL_ENGINE = engine or ""
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if engine is None:
+            import pandas as pd
+            frames = [pd.read_excel(path)]
+        else:
+            from flexifile.workbook import open_workbook, parse_options, select_sheets
+            read_options = parse_options({"as_text": as_text})
+            with open_workbook(path, os.path.basename(path)) as workbook:
+                frames = [workbook.parse(name, **read_options) for name in select_sheets(sheets, workbook.sheet_names)]
+        timings.append(time.perf_counter() - start)
+        rows = sum(len(frame) for frame in frames)
+        del frames
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((min(timings), rows, peak_kb))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000, help="rows per sheet")
+    parser.add_argument("--sheets", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = make_fixture(tempfile.mkdtemp(), args.rows, args.sheets)
+    print(f"fixture: {args.sheets} sheets x {args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+
+    # (name, engine or None for the legacy call, sheet selection, read every cell as text)
+    cases = [
+        ("legacy read_excel", None, "", False),
+        ("openpyxl, first sheet", "openpyxl", "", False),
+        ("openpyxl, all sheets", "openpyxl", "*", False),
+        ("calamine, first sheet", "calamine", "", False),
+        ("calamine, all sheets", "calamine", "*", False),
+        ("calamine, all, as text", "calamine", "*", True),
+    ]
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'case':<26} {'seconds':>8} {'rows':>9} {'rows/s':>10} {'peak RSS MB':>12}")
+    for name, engine, sheets, as_text in cases:
+        queue = context.Queue()
+        process = context.Process(target=run_case, args=(queue, path, engine, sheets, as_text, args.repeat))
+        process.start()
+        seconds, rows, peak_kb = queue.get()
+        process.join()
+        print(f"{name:<26} {seconds:>8.3f} {rows:>9} {rows / seconds:>10.0f} {peak_kb / 1024:>12.1f}")
+
+if __name__ == "__main__":
+    main()
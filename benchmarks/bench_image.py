@@ -0,0 +1,105 @@
+# Before/after benchmark for the image pipeline in flexifile.image
+#
+#   python benchmarks/bench_image.py [--megapixels 24] [--repeat 3]
+#
+# "legacy" replays the original convert_image behaviour (always RGBA for PNG,
+# default encoder settings); the other rows go through convert_image. Each case
+# runs in a fresh process so peak RSS is measured per case.
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Function to write a synthetic source image and return its path
+def make_fixture(directory, megapixels, mode, fmt):
+    from PIL import Image
+
+    side = int((megapixels * 1_000_000) ** 0.5)
+    # A gradient compresses like a real photo far better than random noise does
+    img = Image.linear_gradient("L").resize((side, side))
+    if mode != "L":
+        img = Image.merge("RGB", (img, img.rotate(90), img.rotate(180))).convert(mode)
+    path = os.path.join(directory, f"source_{mode}.{fmt.lower()}")
+    img.save(path, fmt)
+    return path
+
+# Function replaying the original convert_image for comparison
+def legacy_convert(input_path, save_format, output_path):
+    from PIL import Image
+
+    img = Image.open(input_path)
+    if save_format == "PNG":
+        img = img.convert("RGBA")
+        img.save(output_path, "PNG")
+    elif save_format == "JPEG":
+        img.convert("RGB").save(output_path, "JPEG", quality=95)
+    else:
+        img.save(output_path, save_format, quality=95)
+
+# Function timing one case (runs in a child process)
+def run_case(queue, variant, input_path, input_format, output_format, save_format, options, repeat):
+    from flexifile import config
+    from flexifile.image import convert_image
+    from flexifile.scratch import release_workspace
+
+    config.CACHE_ENABLED = False
+    timings = []
+    output_size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if variant == "legacy":
+            output_path = os.path.join(tempfile.mkdtemp(), "out")
+            legacy_convert(input_path, save_format, output_path)
+        else:
+            output_path, _ = convert_image(input_path, input_format, output_format, os.path.basename(input_path), options=options)
+        timings.append(time.perf_counter() - start)
+        output_size = os.path.getsize(output_path)
+        release_workspace(output_path)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((min(timings), output_size, peak_kb))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megapixels", type=float, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    gray_png = make_fixture(directory, args.megapixels, "L", "PNG")
+    rgb_jpeg = make_fixture(directory, args.megapixels, "RGB", "JPEG")
+    rgb_tiff = make_fixture(directory, args.megapixels, "RGB", "TIFF")
+
+    cases = [
+        ("grayscale PNG -> PNG", gray_png, "PNG (.png)", "PNG (.png)", "PNG"),
+        ("JPEG -> PNG", rgb_jpeg, "JPEG (.jpg, .jpeg)", "PNG (.png)", "PNG"),
+        ("JPEG -> WebP", rgb_jpeg, "JPEG (.jpg, .jpeg)", "WebP (.webp)", "WEBP"),
+        ("TIFF -> JPEG", rgb_tiff, "TIFF (.tiff, .tif)", "JPEG (.jpg, .jpeg)", "JPEG"),
+    ]
+    variants = [
+        ("legacy", None),
+        ("balanced", {"preset": "balanced"}),
+        ("fast", {"preset": "fast"}),
+        ("small", {"preset": "small"}),
+        ("fast 1024px", {"preset": "fast", "max_dimension": 1024}),
+    ]
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'case':<22} {'variant':<12} {'seconds':>8} {'output MB':>10} {'peak RSS MB':>12}")
+    for name, input_path, input_format, output_format, save_format in cases:
+        for variant, options in variants:
+            queue = context.Queue()
+            process = context.Process(target=run_case, args=(queue, variant, input_path, input_format,
+                                                             output_format, save_format, options, args.repeat))
+            process.start()
+            seconds, output_size, peak_kb = queue.get()
+            process.join()
+            print(f"{name:<22} {variant:<12} {seconds:>8.3f} {output_size / 1e6:>10.2f} {peak_kb / 1024:>12.1f}")
+
+if __name__ == "__main__":
+    main()
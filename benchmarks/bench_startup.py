@@ -0,0 +1,46 @@
+# Cold-start benchmark: how long a fresh process takes to import flexifile
+#
+#   python benchmarks/bench_startup.py [--repeat 10]
+#
+# Each sample runs in a new interpreter, the way a freshly started pod does.
+# The heavy backends (pandas, python-docx, PyPDF2, pdf2image, python-pptx,
+# svglib, reportlab) should only be imported by the first conversion that
+# needs them, so the script also lists any of them that the import pulled in.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+heavy_modules = ["pandas", "docx", "PyPDF2", "pdf2image", "pptx", "svglib", "reportlab", "openpyxl", "pyvips"]
+
+probe = f"""
+import json, sys, time
+start = time.perf_counter()
+import flexifile
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy_modules!r} if m in sys.modules]}}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    samples = []
+    loaded = []
+    for _ in range(args.repeat):
+        result = subprocess.run([sys.executable, "-c", probe], cwd=root, capture_output=True, text=True, check=True)
+        sample = json.loads(result.stdout)
+        samples.append(sample["seconds"])
+        loaded = sample["loaded"]
+
+    print(f"import flexifile: median {statistics.median(samples) * 1000:.1f} ms, "
+          f"min {min(samples) * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms over {args.repeat} runs")
+    print(f"heavy backends loaded at import: {', '.join(loaded) or 'none'}")
+
+if __name__ == "__main__":
+    main()
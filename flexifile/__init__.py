@@ -0,0 +1,11 @@
+# Flexifile conversion core, usable without the Streamlit UI
+from flexifile.formats import format_domains, extension_map, get_file_extension, input_format_for_filename
+from flexifile.registry import convert, get_converter, register_converter, supported_conversions
+from flexifile.sniff import check_format, detect_format
+
+# Importing the domain modules registers their converters
+from flexifile.document import convert_document
+from flexifile.presentation import convert_presentation
+from flexifile.spreadsheet import convert_spreadsheet
+from flexifile.image import convert_image
+from flexifile.vector import convert_vector
@@ -0,0 +1,3 @@
+from flexifile.cli import main
+
+raise SystemExit(main())
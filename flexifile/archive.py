@@ -0,0 +1,241 @@
+# Streaming ZIP writer: members are added as converters produce them, compressed by a
+# per-member policy (optionally on several threads), and written strictly front to back
+# so the download server can send the archive while it is still being built
+import collections
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from flexifile import config
+
+# Extensions whose data is already compressed; deflating them again costs time for nothing
+stored_extensions = {
+    ".png", ".jpg", ".jpeg", ".webp", ".gif", ".zip", ".gz",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp",
+    ".parquet", ".feather", ".arrow"
+}
+
+# ZIP compression methods
+STORED = 0
+DEFLATED = 8
+
+# Values above these do not fit the classic ZIP fields and need ZIP64 records
+zip32_limit = 0xFFFFFFFF
+zip16_limit = 0xFFFF
+
+# General-purpose flags: sizes in a data descriptor after the data, UTF-8 member names
+flag_data_descriptor = 0x08
+flag_utf8 = 0x800
+
+# Function to choose a member's compression method from its name
+def member_compression(name):
+    return STORED if os.path.splitext(name)[1].lower() in stored_extensions else DEFLATED
+
+# Function to pick a ZIP member name that does not clash with earlier members
+def unique_member_name(name, used_names):
+    base, ext = os.path.splitext(name)
+    candidate, counter = name, 1
+    while candidate in used_names:
+        counter += 1
+        candidate = f"{base}_{counter}{ext}"
+    used_names.add(candidate)
+    return candidate
+
+# Function to get the current time as the MS-DOS (time, date) pair ZIP headers use
+def dos_timestamp():
+    t = time.localtime()
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+# Function to compress a whole member in memory, returning (method, crc, packed data, size);
+# zlib releases the GIL, so several of these run in parallel on threads
+def pack_bytes(data, method):
+    crc = zlib.crc32(data)
+    if method == DEFLATED:
+        compressor = zlib.compressobj(config.ARCHIVE_DEFLATE_LEVEL, zlib.DEFLATED, -15)
+        packed = compressor.compress(data) + compressor.flush()
+        # Data that does not shrink is stored instead
+        if len(packed) < len(data):
+            return DEFLATED, crc, packed, len(data)
+    return STORED, crc, bytes(data), len(data)
+
+# Function to read and compress a file member in memory (runs on a compression thread)
+def pack_file(path, method):
+    with open(path, "rb") as f:
+        return pack_bytes(f.read(), method)
+
+class ZipStreamWriter:
+    # workers > 1 compresses members on that many threads while earlier ones are written
+    def __init__(self, path, workers=1):
+        self.path = path
+        self.file = open(path, "wb")
+        self.offset = 0
+        self.entries = []
+        self.used_names = set()
+        # Even one compression thread overlaps compression with producing the next member
+        self.workers = config.worker_count(workers) if workers != 1 else 1
+        self.pool = ThreadPoolExecutor(max_workers=self.workers) if workers != 1 else None
+        # (name, future, (done, path) to call once written), in the order members were added
+        self.pending = collections.deque()
+        # Set once the archive is complete (or abandoned), for readers following the file
+        self.finished = threading.Event()
+        self.failed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    # Function to write raw bytes at the end of the archive
+    def write(self, data):
+        self.file.write(data)
+        self.offset += len(data)
+
+    # Function to write a local file header; sizes of streamed members follow the data
+    def write_local_header(self, name, method, crc=0, packed_size=0, size=0, streamed=False):
+        encoded = name.encode("utf-8")
+        clock, date = dos_timestamp()
+        flags = flag_utf8 | (flag_data_descriptor if streamed else 0)
+        extra = b""
+        if streamed or size >= zip32_limit or packed_size >= zip32_limit:
+            # The ZIP64 extra field gives streamed members room for 8-byte sizes in their descriptor
+            extra = struct.pack("<HHQQ", 1, 16, size, packed_size)
+            packed_size = size = zip32_limit
+        entry = {"name": encoded, "method": method, "flags": flags, "time": clock, "date": date,
+                 "offset": self.offset, "zip64": bool(extra)}
+        self.write(struct.pack("<IHHHHHIIIHH", 0x04034B50, 45 if extra else 20, flags, method, clock, date,
+                               crc, packed_size, size, len(encoded), len(extra)) + encoded + extra)
+        return entry
+
+    # Function to record a finished member for the central directory
+    def finish_entry(self, entry, crc, packed_size, size):
+        entry.update(crc=crc, packed_size=packed_size, size=size)
+        self.entries.append(entry)
+        # Readers following the file see each member as soon as it is complete
+        self.file.flush()
+
+    # Function to write a member that is already compressed in memory
+    def write_packed(self, name, method, crc, packed, size):
+        entry = self.write_local_header(name, method, crc, len(packed), size)
+        self.write(packed)
+        self.finish_entry(entry, crc, len(packed), size)
+
+    # Function to write the oldest member compressed on a thread
+    def write_oldest(self):
+        name, future, callback = self.pending.popleft()
+        self.write_packed(name, *future.result())
+        if callback:
+            callback[0](callback[1])
+
+    # Function to write every member still being compressed
+    def drain(self):
+        while self.pending:
+            self.write_oldest()
+
+    # Function to queue a compression job, writing older members so at most two per thread wait
+    def submit(self, name, method, func, arg, callback=None):
+        self.pending.append((name, self.pool.submit(func, arg, method), callback))
+        # Members already compressed are written now, so readers following the file get them early
+        while self.pending and (len(self.pending) > 2 * self.workers or self.pending[0][1].done()):
+            self.write_oldest()
+
+    # Function to add a member from bytes; returns the member name used
+    def add_bytes(self, name, data, method=None):
+        name = unique_member_name(name, self.used_names)
+        method = member_compression(name) if method is None else method
+        if self.pool is not None:
+            self.submit(name, method, pack_bytes, data)
+        else:
+            self.write_packed(name, *pack_bytes(data, method))
+        return name
+
+    # Function to add a member from a file; done(path) is called once the file has been read
+    # (os.remove, release_workspace), which may be after this returns. Returns the member name
+    def add_file(self, path, name=None, method=None, done=None):
+        name = unique_member_name(name or os.path.basename(path), self.used_names)
+        method = member_compression(name) if method is None else method
+        if os.path.getsize(path) <= config.ARCHIVE_BUFFER_MAX_BYTES:
+            if self.pool is not None:
+                self.submit(name, method, pack_file, path, (done, path) if done else None)
+                return name
+            self.write_packed(name, *pack_file(path, method))
+        else:
+            # Large files are compressed in chunks as they are read, in constant memory
+            self.drain()
+            self.write_streamed(name, method, path)
+        if done:
+            done(path)
+        return name
+
+    # Function to copy a file into the archive chunk by chunk, with a data descriptor after it
+    def write_streamed(self, name, method, path):
+        entry = self.write_local_header(name, method, streamed=True)
+        compressor = zlib.compressobj(config.ARCHIVE_DEFLATE_LEVEL, zlib.DEFLATED, -15) if method == DEFLATED else None
+        crc = size = packed_size = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(config.ARCHIVE_CHUNK_BYTES), b""):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                if compressor is not None:
+                    chunk = compressor.compress(chunk)
+                packed_size += len(chunk)
+                self.write(chunk)
+        if compressor is not None:
+            tail = compressor.flush()
+            packed_size += len(tail)
+            self.write(tail)
+        self.write(struct.pack("<IIQQ", 0x08074B50, crc, packed_size, size))
+        self.finish_entry(entry, crc, packed_size, size)
+
+    # Function to write the central directory and end records
+    def write_directory(self):
+        directory_offset = self.offset
+        for entry in self.entries:
+            sizes = [entry["size"], entry["packed_size"], entry["offset"]]
+            # Fields that overflow move into the ZIP64 extra field, in this order
+            wide = [value for value in sizes if value >= zip32_limit]
+            extra = struct.pack(f"<HH{len(wide)}Q", 1, 8 * len(wide), *wide) if wide else b""
+            size, packed_size, offset = (min(value, zip32_limit) for value in sizes)
+            version = 45 if wide or entry["zip64"] else 20
+            self.write(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | version, version, entry["flags"],
+                                   entry["method"], entry["time"], entry["date"], entry["crc"], packed_size, size,
+                                   len(entry["name"]), len(extra), 0, 0, 0, 0o100644 << 16, offset)
+                       + entry["name"] + extra)
+        directory_size = self.offset - directory_offset
+
+        count = len(self.entries)
+        if count >= zip16_limit or directory_offset >= zip32_limit or directory_size >= zip32_limit:
+            record_offset = self.offset
+            self.write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, (3 << 8) | 45, 45, 0, 0,
+                                   count, count, directory_size, directory_offset))
+            self.write(struct.pack("<IIQI", 0x07064B50, 0, record_offset, 1))
+        self.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, min(count, zip16_limit), min(count, zip16_limit),
+                               min(directory_size, zip32_limit), min(directory_offset, zip32_limit), 0))
+
+    # Function to finish the archive
+    def close(self):
+        try:
+            self.drain()
+            self.write_directory()
+        except BaseException:
+            self.abort()
+            raise
+        self.shutdown()
+
+    # Function to give up on the archive, so readers following it stop waiting
+    def abort(self):
+        self.failed = True
+        self.shutdown()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+        self.file.close()
+        self.finished.set()
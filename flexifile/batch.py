@@ -0,0 +1,115 @@
+# Batch conversions fanned out across a process pool
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from flexifile import config
+from flexifile.cache import cache_stats, count
+from flexifile.governor import ResourceLimitExceeded, governor_enabled, process_count, run_governed
+from flexifile.metrics import record_remote, recent_metrics
+from flexifile.registry import convert, send_notice
+from flexifile.scratch import adopt_owner, new_workspace, release_workspace
+from flexifile.utils import save_input
+
+# Function to run func over a list of argument tuples, yielding results as they
+# complete (or in submission order when ordered is set)
+def run_in_pool(func, jobs, workers=None, ordered=False):
+    workers = min(process_count(workers), len(jobs))
+    if workers <= 1:
+        # Convert inline so single jobs and profiling runs skip the pool start-up
+        for args in jobs:
+            yield func(*args)
+        return
+
+    # Spawned workers do not inherit the threads and locks of a running Streamlit server
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=adopt_owner, initargs=(os.getpid(),)) as pool:
+        futures = [pool.submit(func, *args) for args in jobs]
+        for future in (futures if ordered else as_completed(futures)):
+            yield future.result()
+
+# Function to run func(*args, notify=...) and return (pid, result, metrics, cache counter
+# changes, notices), so a conversion run in a worker process can be counted and its notices
+# shown by the process that started it
+def run_measured(func, *args):
+    previous = recent_metrics[-1] if recent_metrics else None
+    before = dict(cache_stats)
+    notices = []
+    result = func(*args, notify=notices.append)
+    metrics = recent_metrics[-1].as_dict() if recent_metrics and recent_metrics[-1] is not previous else None
+    return os.getpid(), result, metrics, {name: cache_stats[name] - before[name] for name in cache_stats}, notices
+
+# Function to add what run_measured saw in a worker to this process's metrics and cache counters
+def adopt_measurements(pid, metrics, cache_delta):
+    if pid == os.getpid():
+        # Run inline, so it was counted here already
+        return
+    if metrics:
+        record_remote(metrics)
+    for name, amount in cache_delta.items():
+        if amount:
+            count(name, amount)
+
+# Function to run func over staged jobs in worker processes, counting them here, and yield
+# (result, notices)
+def run_counted(func, jobs, workers=None):
+    for pid, result, metrics, cache_delta, notices in run_in_pool(run_measured, [(func, *args) for args in jobs], workers):
+        adopt_measurements(pid, metrics, cache_delta)
+        yield result, notices
+
+# Function to convert a single staged file (runs inside a worker process)
+def convert_staged(input_path, input_format, output_format, input_filename, options=None, notify=None):
+    try:
+        output_path, message = convert(input_path, input_format, output_format, input_filename, options=options, notify=notify)
+    except MemoryError:
+        output_path, message = None, "Error: the conversion ran out of memory"
+    except Exception as e:
+        output_path, message = None, f"Error: {str(e)}"
+    return input_filename, output_path, message
+
+# Function to convert a staged file in a governed child process, reporting a limit as a
+# failure; returns (result, notices) like run_counted
+def convert_governed(input_path, input_format, output_format, input_filename, options=None):
+    try:
+        pid, result, metrics, cache_delta, notices = run_governed(run_measured, convert_staged, input_path, input_format,
+                                                                  output_format, input_filename, options)
+    except ResourceLimitExceeded as e:
+        return (input_filename, None, f"Error: {str(e)}"), []
+    adopt_measurements(pid, metrics, cache_delta)
+    return result, notices
+
+# Function to pass each (result, notices) pair's notices on to notify and yield the result
+def replay_notices(results, notify):
+    for result, notices in results:
+        for notice in notices:
+            send_notice(notify, f"{result[0]}: {notice}")
+        yield result
+
+# Function to convert many uploads of the same format pair in parallel; each file's notices
+# go to notify with its name in front
+def convert_batch(input_files, input_format, output_format, options=None, workers=None, notify=None):
+    # Stage each upload in its own directory so duplicate filenames cannot collide
+    staging_dir = new_workspace()
+    jobs = []
+    for index, (input_file, input_filename) in enumerate(input_files):
+        job_dir = os.path.join(staging_dir, str(index))
+        os.makedirs(job_dir)
+        input_path = save_input(input_file, job_dir, input_filename)
+        jobs.append((input_path, input_format, output_format, input_filename, options))
+
+    # Yields (input filename, output path or None, output filename or error message);
+    # each output workspace belongs to the caller until it calls release_workspace
+    try:
+        if governor_enabled():
+            # Every file gets its own limited child process, so one bomb only fails that file; the
+            # governor runs at most JOB_MAX_RUNNING of them at once across all jobs, so the
+            # per-child memory limit adds up to the host's memory
+            with ThreadPoolExecutor(max_workers=min(config.worker_count(workers), max(1, config.JOB_MAX_RUNNING))) as pool:
+                futures = [pool.submit(convert_governed, *args) for args in jobs]
+                results = (future.result() for future in as_completed(futures))
+                yield from replay_notices(results, notify)
+        else:
+            yield from replay_notices(run_counted(convert_staged, jobs, workers), notify)
+    finally:
+        release_workspace(staging_dir)
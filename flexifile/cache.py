@@ -0,0 +1,161 @@
+# Content-addressed, disk-backed cache of conversion results
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from flexifile import config
+from flexifile.metrics import stage
+from flexifile.registry import logger, send_notice
+from flexifile.scratch import new_workspace, release_workspace
+
+# Hit/miss counters for this process
+cache_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+
+# Function to bump a cache counter
+def count(name, amount=1):
+    with _stats_lock:
+        cache_stats[name] += amount
+
+# Function to hash an upload buffer or a file on disk without copying it
+def hash_input(input_file, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    if isinstance(input_file, (str, os.PathLike)):
+        with open(input_file, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    else:
+        digest.update(input_file.getbuffer())
+    return digest.hexdigest()
+
+# Function to build the cache key for a conversion
+def cache_key(input_hash, input_format, output_format, options=None):
+    spec = json.dumps([input_hash, input_format, output_format, options or {}], sort_keys=True, default=str)
+    return hashlib.sha256(spec.encode()).hexdigest()
+
+# Function to copy a file cheaply (hard link when possible)
+def link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+# Function to fetch a cached result into a fresh workspace, as (path, filename, notices)
+def lookup(key, input_filename):
+    entry_dir = os.path.join(config.CACHE_DIR, key)
+    try:
+        with open(os.path.join(entry_dir, "entry.json")) as f:
+            entry = json.load(f)
+        if time.time() - os.path.getmtime(entry_dir) > config.CACHE_TTL:
+            return None
+
+        # Outputs are named after the input, so rename for the current upload
+        output_filename = entry["output_filename"]
+        old_base, new_base = entry["base_filename"], os.path.splitext(input_filename)[0]
+        if output_filename.startswith(old_base):
+            output_filename = new_base + output_filename[len(old_base):]
+
+        workspace = new_workspace()
+        output_path = os.path.join(workspace, output_filename)
+        try:
+            link_or_copy(os.path.join(entry_dir, "output"), output_path)
+        except OSError:
+            release_workspace(workspace)
+            raise
+        # Touching the entry keeps recently used results at the back of the eviction queue
+        os.utime(entry_dir)
+        # Entries written before notices were stored have none
+        return output_path, output_filename, entry.get("notices", [])
+    except (OSError, ValueError, KeyError):
+        # Missing, half-written or concurrently evicted entries count as misses
+        return None
+
+# Function to add a conversion result and the notices sent while making it to the cache
+def store(key, output_path, output_filename, input_filename, notices=()):
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    entry_dir = os.path.join(config.CACHE_DIR, key)
+    if os.path.isdir(entry_dir):
+        return
+
+    # Build the entry beside its final location and rename it into place atomically
+    staging_dir = tempfile.mkdtemp(dir=config.CACHE_DIR, prefix=".staging-")
+    try:
+        link_or_copy(output_path, os.path.join(staging_dir, "output"))
+        with open(os.path.join(staging_dir, "entry.json"), "w") as f:
+            json.dump({"output_filename": output_filename,
+                       "base_filename": os.path.splitext(input_filename)[0],
+                       "notices": list(notices)}, f)
+        os.rename(staging_dir, entry_dir)
+        count("stores")
+    except OSError:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return
+    evict()
+
+# Function to list cache entries as (last used, size, path)
+def cache_entries():
+    entries = []
+    try:
+        names = os.listdir(config.CACHE_DIR)
+    except FileNotFoundError:
+        return entries
+    for name in names:
+        if name.startswith("."):
+            continue
+        entry_dir = os.path.join(config.CACHE_DIR, name)
+        try:
+            size = os.path.getsize(os.path.join(entry_dir, "output"))
+            entries.append((os.path.getmtime(entry_dir), size, entry_dir))
+        except OSError:
+            continue
+    return entries
+
+# Function to drop expired entries, then least recently used ones until under the size limit
+def evict():
+    now = time.time()
+    entries = sorted(cache_entries())
+    total = sum(size for _, size, _ in entries)
+    for last_used, size, entry_dir in entries:
+        if now - last_used <= config.CACHE_TTL and total <= config.CACHE_MAX_BYTES:
+            continue
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total -= size
+        count("evictions")
+
+# Decorator that serves convert_* results from the cache
+def cached_conversion(converter):
+    @functools.wraps(converter)
+    def wrapper(input_file, input_format, output_format, input_filename, options=None, notify=None):
+        if not config.CACHE_ENABLED:
+            return converter(input_file, input_format, output_format, input_filename, options=options, notify=notify)
+
+        with stage("cache"):
+            key = cache_key(hash_input(input_file), input_format, output_format, options)
+            cached = lookup(key, input_filename)
+        if cached:
+            count("hits")
+            logger.debug("cache hit for %s (%s -> %s)", input_filename, input_format, output_format)
+            output_path, output_filename, notices = cached
+            # A hit tells the user what the original run told them
+            for message in notices:
+                send_notice(notify, message)
+            return output_path, output_filename
+
+        count("misses")
+        notices = []
+
+        def collect(message):
+            notices.append(message)
+            send_notice(notify, message)
+
+        output_path, output_filename = converter(input_file, input_format, output_format, input_filename, options=options, notify=collect)
+        if output_path:
+            with stage("cache"):
+                store(key, output_path, output_filename, input_filename, notices)
+        return output_path, output_filename
+    return wrapper
@@ -0,0 +1,107 @@
+# Command line entry point: python -m flexifile convert INPUTS... --to FORMAT
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+
+from flexifile import config
+from flexifile.batch import run_in_pool
+from flexifile.formats import extension_aliases, extension_map
+from flexifile.registry import convert, supported_conversions
+from flexifile.scratch import release_workspace
+from flexifile.sniff import detect_format
+
+# Function to expand globs and directories into a list of input files
+def collect_inputs(patterns, recursive=False):
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*") if recursive else os.path.join(pattern, "*")
+        for path in sorted(glob.glob(pattern, recursive=recursive)):
+            if os.path.isfile(path) and path not in files:
+                files.append(path)
+    return files
+
+# Function to resolve --to (a format name or an extension like "pdf") for an input format
+def resolve_output_format(input_format, target):
+    candidates = [output_format for _, output_format in supported_conversions(input_format)]
+    if target in candidates:
+        return target
+
+    ext = target.lower() if target.startswith(".") else f".{target.lower()}"
+    for output_format in candidates:
+        if extension_map.get(output_format) == ext or extension_aliases.get(ext) == output_format:
+            return output_format
+    return None
+
+# Function to convert a single file (runs inside a worker process)
+def convert_one(input_path, target, input_format, output_dir):
+    try:
+        input_format = input_format or detect_format(input_path, input_path)
+        if input_format is None:
+            return input_path, None, "Unknown input format"
+
+        output_format = resolve_output_format(input_format, target)
+        if output_format is None:
+            return input_path, None, f"Conversion from {input_format} to {target} not supported"
+
+        output_path, output_filename = convert(input_path, input_format, output_format, os.path.basename(input_path))
+        if not output_path:
+            return input_path, None, output_filename
+
+        destination = os.path.join(output_dir, output_filename)
+        shutil.move(output_path, destination)
+        release_workspace(output_path)
+        return input_path, destination, None
+    except Exception as e:
+        return input_path, None, f"Error: {str(e)}"
+
+# Function to run the convert command
+def run_convert(args):
+    files = collect_inputs(args.inputs, recursive=args.recursive)
+    if not files:
+        print("No input files found", file=sys.stderr)
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    workers = min(config.worker_count(args.jobs), len(files))
+
+    start = time.perf_counter()
+    results = []
+    jobs = [(path, args.to, args.input_format, args.output_dir) for path in files]
+    for result in run_in_pool(convert_one, jobs, workers):
+        results.append(result)
+        report(result)
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for _, _, error in results if error)
+    print(f"Converted {len(files) - failed} of {len(files)} files in {elapsed:.2f}s "
+          f"({len(files) / elapsed:.2f} files/s, {workers} workers)")
+    return 1 if failed else 0
+
+# Function to print the outcome of one conversion
+def report(result):
+    input_path, output_path, error = result
+    if error:
+        print(f"failed: {input_path}: {error}", file=sys.stderr)
+    else:
+        print(f"ok: {input_path} -> {output_path}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="flexifile", description="Universal File Converter")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser("convert", help="Convert files, globs or directories")
+    convert_parser.add_argument("inputs", nargs="+", help="Files, glob patterns or directories")
+    convert_parser.add_argument("--to", required=True, help='Output format name or extension, e.g. "pdf"')
+    convert_parser.add_argument("--from", dest="input_format", help="Input format name (default: detected from the file's contents)")
+    convert_parser.add_argument("-o", "--output-dir", default=".", help="Directory for converted files")
+    convert_parser.add_argument("-j", "--jobs", type=int, help="Worker processes (default: one per core)")
+    convert_parser.add_argument("-r", "--recursive", action="store_true", help="Descend into subdirectories")
+
+    args = parser.parse_args(argv)
+    if args.command == "convert":
+        return run_convert(args)
+    return 2
@@ -0,0 +1,131 @@
+# Parquet and Arrow/Feather: batch readers and row-group writers for the spreadsheet converters
+from flexifile import config
+from flexifile.utils import input_source
+
+# Columnar format labels and the kind of file each one holds
+columnar_formats = {
+    "Apache Parquet (.parquet)": "parquet",
+    "Apache Arrow/Feather (.feather, .arrow)": "feather"
+}
+
+# Compression codecs offered for each kind; the first one is the default
+compression_codecs = {
+    "parquet": ["snappy", "zstd", "gzip", "brotli", "lz4", "none"],
+    "feather": ["lz4", "zstd", "none"]
+}
+
+# Function to resolve the compression codec from the conversion options (None for uncompressed)
+def compression_codec(kind, options):
+    codec = str(options.get("compression") or compression_codecs[kind][0]).lower()
+    if codec not in compression_codecs[kind]:
+        raise ValueError(f"Unknown compression {codec!r} (choose from: {', '.join(compression_codecs[kind])})")
+    return None if codec == "none" else codec
+
+# Function to turn a DataFrame into an Arrow table
+def frame_to_table(df):
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Workbook columns can mix numbers and text in one column; those are written as text
+        df = df.copy()
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].astype("string")
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+# Writes Parquet row groups or Arrow record batches as tables arrive, so only one
+# chunk of the input is in memory at a time
+class ColumnarWriter:
+    def __init__(self, output_path, kind, codec=None, row_group_rows=None):
+        self.output_path = output_path
+        self.kind = kind
+        self.codec = codec
+        self.row_group_rows = row_group_rows or config.COLUMNAR_ROW_GROUP_ROWS
+        self.schema = None
+        self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self, schema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.schema = schema
+        if self.kind == "parquet":
+            self.writer = pq.ParquetWriter(self.output_path, schema, compression=self.codec or "none")
+        else:
+            # Feather v2 is the Arrow IPC file format
+            self.writer = pa.ipc.new_file(self.output_path, schema, options=pa.ipc.IpcWriteOptions(compression=self.codec))
+
+    def write_table(self, table):
+        import pyarrow as pa
+
+        if self.writer is None:
+            self.open(table.schema)
+        elif not table.schema.equals(self.schema, check_metadata=False):
+            # Later chunks can infer different types (an int column that gains a blank turns
+            # float); they are cast back to the schema the file was started with
+            try:
+                table = table.cast(self.schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError):
+                raise ValueError("Column types change partway through the input; convert with "
+                                 "'Read every cell as text' to keep every column as text")
+        if self.kind == "parquet":
+            self.writer.write_table(table, row_group_size=self.row_group_rows)
+        else:
+            self.writer.write_table(table, max_chunksize=self.row_group_rows)
+
+    def write_frame(self, df):
+        self.write_table(frame_to_table(df))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+# Function to write one DataFrame to a Parquet or Feather file
+def write_frame(df, output_path, kind, codec=None):
+    with ColumnarWriter(output_path, kind, codec) as writer:
+        writer.write_frame(df)
+
+# Function to yield the record batches of a Parquet or Feather input without loading the whole file
+def iter_batches(input_file, kind, batch_rows=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    batch_rows = batch_rows or config.COLUMNAR_ROW_GROUP_ROWS
+    source = input_source(input_file)
+    if kind == "parquet":
+        # Row groups are read one at a time
+        yield from pq.ParquetFile(source).iter_batches(batch_size=batch_rows)
+        return
+
+    # Files on disk are memory-mapped, so uncompressed batches are never copied
+    if isinstance(source, str):
+        source = pa.memory_map(source)
+    try:
+        reader = pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        # Feather v1 files predate the IPC format and can only be read whole
+        import pyarrow.feather as feather
+
+        yield from feather.read_table(input_source(input_file)).to_batches(max_chunksize=batch_rows)
+        return
+    for index in range(reader.num_record_batches):
+        yield from pa.Table.from_batches([reader.get_batch(index)]).to_batches(max_chunksize=batch_rows)
+
+# Function to copy a Parquet or Feather input into the other columnar kind batch by batch
+def copy_columnar(input_file, input_kind, output_path, output_kind, codec=None):
+    import pyarrow as pa
+
+    with ColumnarWriter(output_path, output_kind, codec) as writer:
+        for batch in iter_batches(input_file, input_kind):
+            writer.write_table(pa.Table.from_batches([batch]))
+        if writer.writer is None:
+            raise ValueError("The input file holds no record batches")
+
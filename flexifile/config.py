@@ -0,0 +1,145 @@
+# Runtime configuration knobs, read from the environment
+import os
+import tempfile
+
+# Rows per chunk for the streaming spreadsheet path
+SPREADSHEET_CHUNK_ROWS = int(os.environ.get("FLEXIFILE_CHUNK_ROWS", "50000"))
+
+# Rows per Parquet row group / Arrow record batch; columnar inputs are also read this many rows at a time
+COLUMNAR_ROW_GROUP_ROWS = int(os.environ.get("FLEXIFILE_ROW_GROUP_ROWS", "100000"))
+
+# Bytes of a text file sampled to detect its encoding
+TEXT_SNIFF_BYTES = int(os.environ.get("FLEXIFILE_TEXT_SNIFF_BYTES", str(64 * 1024)))
+
+# Longest line read from a text file in one piece; longer lines are split
+TEXT_MAX_LINE_CHARS = int(os.environ.get("FLEXIFILE_TEXT_MAX_LINE_CHARS", str(64 * 1024)))
+
+# Monospaced TrueType font for TXT -> PDF (when unset, the first of DejaVu Sans Mono and
+# similar system fonts found, else Courier, which only covers Latin-1), and its size in points
+TEXT_PDF_FONT = os.environ.get("FLEXIFILE_TEXT_PDF_FONT", "")
+TEXT_PDF_FONT_SIZE = float(os.environ.get("FLEXIFILE_TEXT_PDF_FONT_SIZE", "9"))
+
+# Worker processes for batch conversions (0 means one per available core)
+MAX_WORKERS = int(os.environ.get("FLEXIFILE_WORKERS", "0"))
+
+# Function to count the cores this process is allowed to run on
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+# Function to resolve the worker count for a batch
+def worker_count(requested=None):
+    return requested or MAX_WORKERS or available_cores()
+
+# Outputs larger than this many bytes are streamed from the download server
+# instead of being embedded in the page as a base64 data URI
+STREAM_THRESHOLD = int(os.environ.get("FLEXIFILE_STREAM_THRESHOLD", str(10 * 1024 * 1024)))
+
+# Address of the download server, and the public URL it is reachable at when
+# it sits behind a proxy (left empty to use the host the page was loaded from)
+DOWNLOAD_HOST = os.environ.get("FLEXIFILE_DOWNLOAD_HOST", "0.0.0.0")
+DOWNLOAD_PORT = int(os.environ.get("FLEXIFILE_DOWNLOAD_PORT", "8502"))
+DOWNLOAD_BASE_URL = os.environ.get("FLEXIFILE_DOWNLOAD_BASE_URL", "")
+
+# Seconds a served download link stays valid
+DOWNLOAD_TTL = int(os.environ.get("FLEXIFILE_DOWNLOAD_TTL", "3600"))
+
+# Conversion result cache: location, total size limit in bytes and entry lifetime in seconds
+CACHE_ENABLED = os.environ.get("FLEXIFILE_CACHE", "1") != "0"
+CACHE_DIR = os.environ.get("FLEXIFILE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "flexifile-cache"))
+CACHE_MAX_BYTES = int(os.environ.get("FLEXIFILE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+CACHE_TTL = int(os.environ.get("FLEXIFILE_CACHE_TTL", str(24 * 3600)))
+
+# Scratch space for per-job workspaces: location, disk quota in bytes, seconds to
+# wait for space before giving up, and age after which abandoned workspaces are swept
+SCRATCH_DIR = os.environ.get("FLEXIFILE_SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "flexifile-scratch"))
+SCRATCH_QUOTA = int(os.environ.get("FLEXIFILE_SCRATCH_QUOTA", str(5 * 1024 * 1024 * 1024)))
+SCRATCH_WAIT = float(os.environ.get("FLEXIFILE_SCRATCH_WAIT", "30"))
+SCRATCH_MAX_AGE = int(os.environ.get("FLEXIFILE_SCRATCH_MAX_AGE", str(6 * 3600)))
+
+# Images above this many pixels take the streaming pyvips path when pyvips is installed
+IMAGE_LARGE_PIXELS = int(os.environ.get("FLEXIFILE_IMAGE_LARGE_PIXELS", str(40_000_000)))
+
+# Pages per worker task when extracting PDF text in parallel
+PDF_TEXT_CHUNK_PAGES = int(os.environ.get("FLEXIFILE_PDF_TEXT_CHUNK_PAGES", "16"))
+
+# Default resolution and pages per pdftoppm batch when rasterizing PDF pages
+RASTER_DPI = int(os.environ.get("FLEXIFILE_RASTER_DPI", "150"))
+RASTER_CHUNK_PAGES = int(os.environ.get("FLEXIFILE_RASTER_CHUNK_PAGES", "32"))
+
+# PPTX rendering: image width in pixels, slides per worker task, layout models kept
+# in memory, and the TrueType fonts to draw with (searched for in the system font
+# folders when unset)
+SLIDE_IMAGE_WIDTH = int(os.environ.get("FLEXIFILE_SLIDE_WIDTH", "1280"))
+SLIDE_RENDER_CHUNK = int(os.environ.get("FLEXIFILE_SLIDE_RENDER_CHUNK", "8"))
+SLIDE_LAYOUT_CACHE = int(os.environ.get("FLEXIFILE_SLIDE_LAYOUT_CACHE", "8"))
+SLIDE_FONT = os.environ.get("FLEXIFILE_SLIDE_FONT", "")
+SLIDE_FONT_BOLD = os.environ.get("FLEXIFILE_SLIDE_FONT_BOLD", "")
+
+# Vector rendering: parsed SVG drawings kept in memory, the SVG rasterizer ("auto" uses
+# poppler when pdftoppm is installed, else renderPM), the largest bitmap a render may
+# allocate, and the Ghostscript binary and time limit for EPS
+VECTOR_DRAWING_CACHE = int(os.environ.get("FLEXIFILE_VECTOR_DRAWING_CACHE", "16"))
+VECTOR_RASTERIZER = os.environ.get("FLEXIFILE_VECTOR_RASTERIZER", "auto")
+VECTOR_MAX_PIXELS = int(os.environ.get("FLEXIFILE_VECTOR_MAX_PIXELS", str(100_000_000)))
+GHOSTSCRIPT_BINARY = os.environ.get("FLEXIFILE_GHOSTSCRIPT", "gs")
+GHOSTSCRIPT_TIMEOUT = float(os.environ.get("FLEXIFILE_GHOSTSCRIPT_TIMEOUT", "120"))
+
+# LibreOffice backend: soffice binary, number of warm soffice processes, and
+# seconds a single conversion (or a cold start) may take before it is killed
+SOFFICE_BINARY = os.environ.get("FLEXIFILE_SOFFICE", "soffice")
+OFFICE_POOL_SIZE = int(os.environ.get("FLEXIFILE_OFFICE_POOL_SIZE", "2"))
+OFFICE_TIMEOUT = float(os.environ.get("FLEXIFILE_OFFICE_TIMEOUT", "120"))
+OFFICE_START_TIMEOUT = float(os.environ.get("FLEXIFILE_OFFICE_START_TIMEOUT", "60"))
+
+# Conversion metrics: JSON-lines log file (empty disables it), number of recent
+# conversions kept in memory, and whether the download server answers /metrics
+METRICS_LOG = os.environ.get("FLEXIFILE_METRICS_LOG", "")
+METRICS_HISTORY = int(os.environ.get("FLEXIFILE_METRICS_HISTORY", "100"))
+METRICS_ENDPOINT = os.environ.get("FLEXIFILE_METRICS_ENDPOINT", "0") == "1"
+
+# Resource governor: CPU seconds, wall seconds and address space (bytes; 0 shares the
+# host's memory between the JOB_MAX_RUNNING governed children allowed to run at once,
+# each of which runs its helper processes one at a time) for each conversion run in a
+# governed child process, and the modules the child processes are forked with already imported
+GOVERNOR_ENABLED = os.environ.get("FLEXIFILE_GOVERNOR", "1") != "0"
+GOVERN_CPU_SECONDS = float(os.environ.get("FLEXIFILE_GOVERN_CPU_SECONDS", "300"))
+GOVERN_WALL_SECONDS = float(os.environ.get("FLEXIFILE_GOVERN_WALL_SECONDS", "600"))
+GOVERN_MEMORY_BYTES = int(os.environ.get("FLEXIFILE_GOVERN_MEMORY_BYTES", "0"))
+GOVERNOR_PRELOAD = os.environ.get("FLEXIFILE_GOVERNOR_PRELOAD", "pandas,PIL.Image,reportlab.pdfgen.canvas")
+
+# ZIP outputs: deflate level for members that are not already compressed, threads that
+# compress members in parallel (0 means one per core), the largest file compressed whole
+# in memory, and the chunk size larger files are streamed in
+ARCHIVE_DEFLATE_LEVEL = int(os.environ.get("FLEXIFILE_ARCHIVE_DEFLATE_LEVEL", "6"))
+ARCHIVE_WORKERS = int(os.environ.get("FLEXIFILE_ARCHIVE_WORKERS", "0"))
+ARCHIVE_BUFFER_MAX_BYTES = int(os.environ.get("FLEXIFILE_ARCHIVE_BUFFER_MAX_BYTES", str(64 * 1024 * 1024)))
+ARCHIVE_CHUNK_BYTES = int(os.environ.get("FLEXIFILE_ARCHIVE_CHUNK_BYTES", str(1024 * 1024)))
+
+# Bytes read from the start of an input to detect its real format
+SNIFF_BYTES = int(os.environ.get("FLEXIFILE_SNIFF_BYTES", "8192"))
+
+# Pre-flight limits checked from headers before an input is decoded: input bytes, image
+# pixels, unpacked bytes and compression ratio of ZIP-based formats, spreadsheet cells,
+# and SVG element nesting depth and count
+MAX_INPUT_BYTES = int(os.environ.get("FLEXIFILE_MAX_INPUT_BYTES", str(2 * 1024 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.environ.get("FLEXIFILE_MAX_IMAGE_PIXELS", str(178_956_970)))
+MAX_UNPACKED_BYTES = int(os.environ.get("FLEXIFILE_MAX_UNPACKED_BYTES", str(4 * 1024 * 1024 * 1024)))
+MAX_COMPRESSION_RATIO = float(os.environ.get("FLEXIFILE_MAX_COMPRESSION_RATIO", "200"))
+MAX_SHEET_CELLS = int(os.environ.get("FLEXIFILE_MAX_SHEET_CELLS", str(50_000_000)))
+SVG_MAX_DEPTH = int(os.environ.get("FLEXIFILE_SVG_MAX_DEPTH", "256"))
+SVG_MAX_ELEMENTS = int(os.environ.get("FLEXIFILE_SVG_MAX_ELEMENTS", "1000000"))
+
+# Background jobs: threads for I/O-bound conversions, processes for CPU-bound ones
+# (0 means one per core), jobs running at once overall and per user session, and
+# seconds a finished result is kept for download
+JOB_THREAD_WORKERS = int(os.environ.get("FLEXIFILE_JOB_THREADS", "4"))
+JOB_PROCESS_WORKERS = int(os.environ.get("FLEXIFILE_JOB_PROCESSES", "0"))
+JOB_MAX_RUNNING = int(os.environ.get("FLEXIFILE_JOB_MAX_RUNNING", "4"))
+JOB_PER_USER = int(os.environ.get("FLEXIFILE_JOB_PER_USER", "2"))
+JOB_RESULT_TTL = int(os.environ.get("FLEXIFILE_JOB_RESULT_TTL", "3600"))
+
+# pandas engine for Excel/ODS input; empty picks calamine when installed, otherwise
+# openpyxl, xlrd or odf depending on the workbook type
+EXCEL_ENGINE = os.environ.get("FLEXIFILE_EXCEL_ENGINE", "")
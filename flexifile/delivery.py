@@ -0,0 +1,154 @@
+# Download server that streams converted files from disk
+import mimetypes
+import os
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+from flexifile import config
+from flexifile.metrics import prometheus_text
+from flexifile.registry import logger
+from flexifile.scratch import release_workspace
+
+# token -> (file path, download filename, expiry time, ZipStreamWriter still building the file or None)
+served_files = {}
+_lock = threading.Lock()
+_server = None
+
+class DownloadHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics" and config.METRICS_ENDPOINT:
+            self.send_metrics()
+            return
+        self.send_file(include_body=True)
+
+    def do_HEAD(self):
+        self.send_file(include_body=False)
+
+    def send_file(self, include_body):
+        token = self.path.lstrip("/").split("/", 1)[0]
+        entry = lookup(token)
+        if entry is None:
+            self.send_error(404, "Download not found or expired")
+            return
+
+        file_path, filename, archive = entry
+        try:
+            f = open(file_path, "rb")
+        except OSError:
+            self.send_error(404, "Download not found or expired")
+            return
+
+        with f:
+            # An archive still being built has no length yet; the response ends when the connection closes
+            growing = archive is not None and not archive.finished.is_set()
+            size = os.fstat(f.fileno()).st_size
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            if not growing:
+                self.send_header("Content-Length", str(size))
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(filename)}")
+            self.end_headers()
+            if include_body and growing:
+                try:
+                    self.follow_archive(f, archive)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+            elif include_body:
+                try:
+                    # socket.sendfile uses os.sendfile where available, so the
+                    # kernel copies straight from the page cache to the socket
+                    self.wfile.flush()
+                    self.connection.sendfile(f)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+    # Function to send an archive as its writer appends to it, until the writer finishes
+    def follow_archive(self, f, archive):
+        while True:
+            # Checked before reading, so the last read after it is set gets everything
+            done = archive.finished.is_set()
+            chunk = f.read(config.ARCHIVE_CHUNK_BYTES)
+            if chunk:
+                self.wfile.write(chunk)
+            elif done:
+                break
+            else:
+                archive.finished.wait(0.05)
+        if archive.failed:
+            # Closing without the rest tells the client the download is incomplete
+            logger.warning("streamed archive %s was abandoned", f.name)
+        self.close_connection = True
+
+    def send_metrics(self):
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("download server: " + format, *args)
+
+# Function to find a live served file by token
+def lookup(token):
+    with _lock:
+        entry = served_files.get(token)
+        if entry is None:
+            return None
+        file_path, filename, expires, archive = entry
+        if expires < time.time():
+            del served_files[token]
+            release_workspace(file_path)
+            return None
+        return file_path, filename, archive
+
+# Function to drop expired links and the workspaces behind them
+def expire_served_files():
+    now = time.time()
+    with _lock:
+        for token in [t for t, (_, _, expires, _) in served_files.items() if expires < now]:
+            file_path = served_files.pop(token)[0]
+            release_workspace(file_path)
+
+# Function to start the download server once per process
+def start_download_server():
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((config.DOWNLOAD_HOST, config.DOWNLOAD_PORT), DownloadHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="flexifile-downloads", daemon=True).start()
+    return _server
+
+# Function to register a file for download and return its URL path; archive is the
+# ZipStreamWriter of an archive still being built, which is sent as it grows
+def serve_file(file_path, filename, archive=None):
+    start_download_server()
+    expire_served_files()
+    token = secrets.token_urlsafe(16)
+    with _lock:
+        served_files[token] = (file_path, filename, time.time() + config.DOWNLOAD_TTL, archive)
+    return f"/{token}/{quote(filename)}"
+
+# Function to release a delivered output unless the download server still needs it
+def release_delivered(file_path):
+    with _lock:
+        if any(entry[0] == file_path for entry in served_files.values()):
+            return
+    release_workspace(file_path)
+
+# Function to build the public URL for a served file
+def download_url(url_path, request_host=None):
+    if config.DOWNLOAD_BASE_URL:
+        return config.DOWNLOAD_BASE_URL.rstrip("/") + url_path
+    host = (request_host or "localhost").rsplit(":", 1)[0]
+    return f"http://{host}:{config.DOWNLOAD_PORT}{url_path}"
+
+# Function to decide whether a file should be streamed instead of embedded
+def should_stream(size):
+    return size > config.STREAM_THRESHOLD
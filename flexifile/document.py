@@ -0,0 +1,108 @@
+# Document format conversions
+import os
+
+from flexifile.cache import cached_conversion
+from flexifile.office import convert_with_office, office_available, office_conversions
+from flexifile.pdftext import iter_page_texts
+from flexifile.registry import register_converter, send_notice
+from flexifile.scratch import new_workspace, release_workspace
+from flexifile.textstream import iter_paragraphs, write_docx, write_pdf
+from flexifile.utils import save_input
+
+# Conversion functions
+@cached_conversion
+def convert_document(input_file, input_format, output_format, input_filename, options=None, notify=None):
+    # Create a managed workspace for file operations
+    temp_dir = new_workspace()
+    
+    # Get base filename without extension
+    base_filename = os.path.splitext(input_filename)[0]
+    options = options or {}
+    
+    try:
+        # Office formats go through the LibreOffice worker pool when soffice is installed
+        if (input_format, output_format) in office_conversions and office_available():
+            input_path = save_input(input_file, temp_dir, input_filename)
+            return convert_with_office(input_path, temp_dir, base_filename, input_format, output_format)
+        
+        # Document conversions
+        if input_format == "Microsoft Word (.docx, .doc)" and output_format == "PDF (.pdf)":
+            # Word to PDF conversion
+            from docx2pdf import convert
+            # docx2pdf only works on paths, so this branch saves the upload to disk
+            input_path = save_input(input_file, temp_dir, input_filename)
+            output_path = os.path.join(temp_dir, f"{base_filename}.pdf")
+            convert(input_path, output_path)
+            return output_path, f"{base_filename}.pdf"
+        
+        elif input_format == "PDF (.pdf)" and output_format == "Microsoft Word (.docx, .doc)":
+            # PDF to Word conversion (simplified)
+            output_path = os.path.join(temp_dir, f"{base_filename}.docx")
+            from docx import Document
+            doc = Document()
+            
+            # Extract text from PDF, one paragraph per page, in parallel page chunks
+            input_path = save_input(input_file, temp_dir, input_filename)
+            for text in iter_page_texts(input_path, options.get("page_range")):
+                doc.add_paragraph(text)
+            
+            doc.save(output_path)
+            return output_path, f"{base_filename}.docx"
+        
+        elif input_format == "PDF (.pdf)" and output_format == "Plain Text (.txt)":
+            # PDF to plain text conversion
+            output_path = os.path.join(temp_dir, f"{base_filename}.txt")
+            
+            # Worker processes open the PDF by path, so it is saved to disk once
+            input_path = save_input(input_file, temp_dir, input_filename)
+            with open(output_path, "w", encoding="utf-8") as txt_file:
+                for page_number, text in enumerate(iter_page_texts(input_path, options.get("page_range"))):
+                    if page_number:
+                        txt_file.write("\n\n")
+                    txt_file.write(text)
+            return output_path, f"{base_filename}.txt"
+        
+        elif input_format == "Plain Text (.txt)" and output_format == "Microsoft Word (.docx, .doc)":
+            # TXT to Word conversion (streamed line by line, one paragraph per line or block)
+            output_path = os.path.join(temp_dir, f"{base_filename}.docx")
+            write_docx(iter_paragraphs(input_file, options.get("paragraphs", "line")), output_path)
+            return output_path, f"{base_filename}.docx"
+        
+        elif input_format == "Plain Text (.txt)" and output_format == "PDF (.pdf)":
+            # TXT to PDF conversion (streamed straight into reportlab, one page at a time)
+            output_path = os.path.join(temp_dir, f"{base_filename}.pdf")
+            mode = options.get("paragraphs", "line")
+            missing = write_pdf(iter_paragraphs(input_file, mode), output_path, gap=1 if mode == "block" else 0)
+            if missing:
+                send_notice(notify, f"Warning: {len(missing)} distinct character{'s' if len(missing) != 1 else ''} "
+                                    f"({''.join(missing[:10])}{'...' if len(missing) > 10 else ''}) could not be drawn with the "
+                                    f"PDF font and will show as blanks or boxes. Set FLEXIFILE_TEXT_PDF_FONT to a font that covers them.")
+            return output_path, f"{base_filename}.pdf"
+        
+        # Add more document conversions as needed
+    except BaseException:
+        # A failed conversion leaves nothing behind in scratch space
+        release_workspace(temp_dir)
+        raise
+    
+    # Default case - return error
+    release_workspace(temp_dir)
+    if (input_format, output_format) in office_conversions:
+        return None, "This conversion requires LibreOffice (soffice) on the server"
+    return None, "Conversion not supported"
+
+register_converter(convert_document, [
+    ("Microsoft Word (.docx, .doc)", "PDF (.pdf)"),
+    ("PDF (.pdf)", "Microsoft Word (.docx, .doc)"),
+    ("PDF (.pdf)", "Plain Text (.txt)"),
+    ("Plain Text (.txt)", "Microsoft Word (.docx, .doc)"),
+    ("Plain Text (.txt)", "PDF (.pdf)"),
+    ("Microsoft Word (.docx, .doc)", "Rich Text Format (.rtf)"),
+    ("Microsoft Word (.docx, .doc)", "Plain Text (.txt)"),
+    ("OpenDocument (.odt)", "PDF (.pdf)"),
+    ("OpenDocument (.odt)", "Microsoft Word (.docx, .doc)"),
+    ("Rich Text Format (.rtf)", "Microsoft Word (.docx, .doc)"),
+    ("Rich Text Format (.rtf)", "PDF (.pdf)"),
+    ("HTML (.html, .htm)", "Microsoft Word (.docx, .doc)"),
+    ("HTML (.html, .htm)", "PDF (.pdf)")
+])
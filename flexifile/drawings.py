@@ -0,0 +1,201 @@
+# Vector rendering: SVG drawings parsed once and cached, EPS through Ghostscript,
+# each rendered to several formats and sizes in one request
+import collections
+import os
+import re
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flexifile import config
+from flexifile.archive import ZipStreamWriter
+from flexifile.cache import hash_input
+from flexifile.governor import process_count
+from flexifile.metrics import stage
+from flexifile.utils import input_source, input_stream, save_input
+
+# Output format label -> (renderer format, file extension)
+vector_targets = {
+    "PNG (.png)": ("png", "png"),
+    "JPEG (.jpg, .jpeg)": ("jpeg", "jpg"),
+    "PDF (.pdf)": ("pdf", "pdf")
+}
+
+# Ghostscript output device for each renderer format
+ghostscript_devices = {"png": "png16m", "jpeg": "jpeg", "pdf": "pdfwrite"}
+
+# Recently parsed SVG drawings, keyed by the input's content hash
+_drawings = collections.OrderedDict()
+_drawings_lock = threading.Lock()
+
+# Function to parse a size list like "1x, 2x, 300dpi, 64w, 128h" into (label, unit, value)
+# entries; a blank list means the drawing's own size
+def parse_sizes(spec):
+    sizes = []
+    for part in str(spec or "").split(","):
+        part = part.strip().lower().replace(" ", "")
+        if not part:
+            continue
+        match = re.fullmatch(r"(\d+(?:\.\d+)?)(x|dpi|w|h|px)", part)
+        if not match or float(match.group(1)) <= 0:
+            raise ValueError(f"Invalid size {part!r} (use a scale like 2x, a resolution like 300dpi, or a width or height like 64w or 64h)")
+        unit = "w" if match.group(2) == "px" else match.group(2)
+        if part not in [label for label, _, _ in sizes]:
+            sizes.append((part, unit, float(match.group(1))))
+    return sizes or [("1x", "x", 1.0)]
+
+# Function to turn a size into a scale factor for a drawing of width x height points
+def size_scale(size, width, height):
+    _, unit, value = size
+    if unit == "x":
+        return value
+    if unit == "dpi":
+        return value / 72
+    return value / width if unit == "w" else value / height
+
+# Function to check a render will not allocate an unreasonable bitmap
+def check_pixels(width, height, scale):
+    pixels = width * scale * height * scale
+    if pixels > config.VECTOR_MAX_PIXELS:
+        raise ValueError(f"Rendering at this size needs {pixels / 1e6:.0f} megapixels (the limit is {config.VECTOR_MAX_PIXELS / 1e6:.0f})")
+
+# Function to choose how SVGs are rasterized: renderPM directly, or a vector PDF rasterized
+# by poppler's pdftoppm, which is much faster at high resolutions
+def vector_rasterizer():
+    if config.VECTOR_RASTERIZER != "auto":
+        return config.VECTOR_RASTERIZER
+    return "poppler" if shutil.which("pdftoppm") else "renderpm"
+
+# Function to get the parsed drawing of an SVG, parsing each distinct file once
+def load_drawing(input_file):
+    from svglib.svglib import svg2rlg
+
+    key = hash_input(input_file)
+    with _drawings_lock:
+        if key in _drawings:
+            _drawings.move_to_end(key)
+            return _drawings[key]
+    with stage("decode"):
+        drawing = svg2rlg(input_source(input_file))
+    if drawing is None:
+        raise ValueError("The SVG file could not be parsed")
+    with _drawings_lock:
+        _drawings[key] = drawing
+        while len(_drawings) > config.VECTOR_DRAWING_CACHE:
+            _drawings.popitem(last=False)
+    return drawing
+
+# Function to check whether Ghostscript is installed
+def ghostscript_available():
+    return shutil.which(config.GHOSTSCRIPT_BINARY) is not None
+
+# Function to read an EPS file's size in points from its bounding-box comment
+def eps_size(input_file):
+    with input_stream(input_file) as f:
+        header = f.read(64 * 1024).decode("latin-1")
+    match = (re.search(r"%%HiResBoundingBox:\s*([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)", header)
+             or re.search(r"%%BoundingBox:\s*([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)", header))
+    if not match:
+        raise ValueError("The EPS file has no %%BoundingBox comment")
+    left, bottom, right, top = (float(value) for value in match.groups())
+    return right - left, top - bottom
+
+# Function to run Ghostscript on an EPS file
+def run_ghostscript(input_path, output_path, fmt, dpi=None):
+    # -dSAFER keeps the PostScript program from touching files outside its input and output
+    command = [config.GHOSTSCRIPT_BINARY, "-dSAFER", "-dBATCH", "-dNOPAUSE", "-dQUIET", "-dEPSCrop",
+               f"-sDEVICE={ghostscript_devices[fmt]}", f"-sOutputFile={output_path}"]
+    if dpi:
+        command += [f"-r{dpi:g}", "-dTextAlphaBits=4", "-dGraphicsAlphaBits=4"]
+    if fmt == "jpeg":
+        command.append("-dJPEGQ=90")
+    command.append(input_path)
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=config.GHOSTSCRIPT_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"Ghostscript did not finish within {config.GHOSTSCRIPT_TIMEOUT:g}s")
+    if result.returncode != 0:
+        raise RuntimeError(f"Ghostscript failed: {result.stderr.decode(errors='replace').strip()}")
+
+# Function to rasterize a single-page PDF with pdftoppm
+def rasterize_with_poppler(pdf_path, output_path, fmt, dpi):
+    from pdf2image import convert_from_path
+
+    work_dir = output_path + ".render"
+    os.makedirs(work_dir)
+    paths = convert_from_path(pdf_path, dpi=dpi, fmt=fmt, single_file=True, output_folder=work_dir, paths_only=True)
+    shutil.move(paths[0], output_path)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+# Function to plan the files of a render: (output path, renderer format, size), one PDF
+# (vector output has no pixel size) and one image per raster format and size
+def plan_targets(temp_dir, base_filename, formats, sizes):
+    rasters = [fmt for fmt in formats if vector_targets[fmt][0] != "pdf"]
+    single = len(formats) == 1 and (not rasters or len(sizes) == 1)
+    plans = []
+    for output_format in formats:
+        fmt, ext = vector_targets[output_format]
+        for label, unit, value in (sizes if fmt != "pdf" else [("1x", "x", 1.0)]):
+            name = f"{base_filename}.{ext}" if single or fmt == "pdf" else f"{base_filename}_{label}.{ext}"
+            plans.append((os.path.join(temp_dir, name), fmt, (label, unit, value)))
+    return plans
+
+# Function to render an SVG or EPS input to every requested format and size, giving one
+# file, or a ZIP when several are produced
+def render_vector(input_file, input_format, input_filename, temp_dir, base_filename, formats, sizes):
+    plans = plan_targets(temp_dir, base_filename, formats, sizes)
+    # Intermediate files to drop once every target is rendered
+    scratch_files = []
+    if input_format == "EPS (.eps)":
+        # Ghostscript reads from a path, so the upload is saved to disk
+        input_path = save_input(input_file, temp_dir, input_filename)
+        if not isinstance(input_file, (str, os.PathLike)):
+            # Files already on disk are read in place and left alone
+            scratch_files.append(input_path)
+        width, height = eps_size(input_path)
+
+        def render(output_path, fmt, scale):
+            run_ghostscript(input_path, output_path, fmt, None if fmt == "pdf" else 72 * scale)
+    else:
+        from reportlab.graphics import renderPDF, renderPM
+
+        drawing = load_drawing(input_file)
+        width, height = drawing.width, drawing.height
+        rasterizer = vector_rasterizer()
+        if rasterizer == "poppler" and any(fmt != "pdf" for _, fmt, _ in plans):
+            # Every raster size is cut from the same vector PDF
+            vector_pdf = os.path.join(temp_dir, f"{base_filename}.vector.pdf")
+            scratch_files.append(vector_pdf)
+            with stage("encode"):
+                renderPDF.drawToFile(drawing, vector_pdf)
+
+        def render(output_path, fmt, scale):
+            if fmt == "pdf":
+                renderPDF.drawToFile(drawing, output_path)
+            elif rasterizer == "poppler":
+                rasterize_with_poppler(vector_pdf, output_path, fmt, 72 * scale)
+            else:
+                # renderPM scales the drawing itself from the dpi argument
+                renderPM.drawToFile(drawing, output_path, fmt=fmt.upper(), dpi=72 * scale)
+
+    scales = [size_scale(size, width, height) for _, _, size in plans]
+    for scale in scales:
+        check_pixels(width, height, scale)
+
+    # Ghostscript and pdftoppm run as separate processes, so sizes render concurrently
+    with stage("encode"), ThreadPoolExecutor(max_workers=process_count()) as pool:
+        list(pool.map(lambda plan, scale: render(plan[0], plan[1], scale), plans, scales))
+    for path in scratch_files:
+        os.remove(path)
+
+    if len(plans) == 1:
+        output_path = plans[0][0]
+        return output_path, os.path.basename(output_path)
+
+    zip_path = os.path.join(temp_dir, f"{base_filename}_renders.zip")
+    with stage("persist"), ZipStreamWriter(zip_path) as archive:
+        for output_path, _, _ in plans:
+            # PNG and JPEG are stored as-is; PDF streams may still deflate
+            archive.add_file(output_path, done=os.remove)
+    return zip_path, os.path.basename(zip_path)
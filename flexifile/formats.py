@@ -0,0 +1,144 @@
+# Format registry shared by the Streamlit UI and the headless conversion core
+import os
+
+# Define the format domains and their conversions
+format_domains = {
+    "Document Formats": {
+        "Input Formats": [
+            "Microsoft Word (.docx, .doc)",
+            "OpenDocument (.odt)",
+            "Rich Text Format (.rtf)",
+            "Plain Text (.txt)",
+            "PDF (.pdf)",
+            "HTML (.html, .htm)"
+        ],
+        "Conversions": {
+            "Microsoft Word (.docx, .doc)": ["PDF (.pdf)", "Rich Text Format (.rtf)", "Plain Text (.txt)"],
+            "OpenDocument (.odt)": ["PDF (.pdf)", "Microsoft Word (.docx, .doc)"],
+            "Rich Text Format (.rtf)": ["Microsoft Word (.docx, .doc)", "PDF (.pdf)"],
+            "Plain Text (.txt)": ["Microsoft Word (.docx, .doc)", "PDF (.pdf)"],
+            "PDF (.pdf)": ["Microsoft Word (.docx, .doc)", "Plain Text (.txt)"],
+            "HTML (.html, .htm)": ["Microsoft Word (.docx, .doc)", "PDF (.pdf)"]
+        }
+    },
+    "Presentation Formats": {
+        "Input Formats": [
+            "Microsoft PowerPoint (.pptx, .ppt)",
+            "OpenDocument Presentation (.odp)",
+            "PDF (.pdf)"
+        ],
+        "Conversions": {
+            "Microsoft PowerPoint (.pptx, .ppt)": ["PDF (.pdf)", "PNG/JPEG Images (.png, .jpg)"],
+            "OpenDocument Presentation (.odp)": ["Microsoft PowerPoint (.pptx, .ppt)", "PDF (.pdf)"],
+            "PDF (.pdf)": ["Microsoft PowerPoint (.pptx, .ppt)", "PNG/JPEG Images (.png, .jpg)"]
+        }
+    },
+    "Spreadsheet Formats": {
+        "Input Formats": [
+            "Microsoft Excel (.xlsx, .xls)",
+            "OpenDocument Spreadsheet (.ods)",
+            "CSV (.csv)",
+            "TSV (.tsv)",
+            "Apache Parquet (.parquet)",
+            "Apache Arrow/Feather (.feather, .arrow)"
+        ],
+        "Conversions": {
+            "Microsoft Excel (.xlsx, .xls)": ["CSV (.csv)", "TSV (.tsv)", "PDF (.pdf)", "Apache Parquet (.parquet)", "Apache Arrow/Feather (.feather, .arrow)"],
+            "OpenDocument Spreadsheet (.ods)": ["Microsoft Excel (.xlsx, .xls)", "CSV (.csv)", "TSV (.tsv)", "Apache Parquet (.parquet)", "Apache Arrow/Feather (.feather, .arrow)"],
+            "CSV (.csv)": ["Microsoft Excel (.xlsx, .xls)", "TSV (.tsv)", "Apache Parquet (.parquet)", "Apache Arrow/Feather (.feather, .arrow)"],
+            "TSV (.tsv)": ["Microsoft Excel (.xlsx, .xls)", "CSV (.csv)", "Apache Parquet (.parquet)", "Apache Arrow/Feather (.feather, .arrow)"],
+            "Apache Parquet (.parquet)": ["CSV (.csv)", "TSV (.tsv)", "Microsoft Excel (.xlsx, .xls)", "Apache Arrow/Feather (.feather, .arrow)"],
+            "Apache Arrow/Feather (.feather, .arrow)": ["CSV (.csv)", "TSV (.tsv)", "Microsoft Excel (.xlsx, .xls)", "Apache Parquet (.parquet)"]
+        }
+    },
+    "Image Formats": {
+        "Input Formats": [
+            "PNG (.png)",
+            "JPEG (.jpg, .jpeg)",
+            "BMP (.bmp)",
+            "TIFF (.tiff, .tif)",
+            "GIF (.gif)",
+            "WebP (.webp)",
+            "PNG Image Sequence (.zip)"
+        ],
+        "Conversions": {
+            "PNG (.png)": ["JPEG (.jpg, .jpeg)", "BMP (.bmp)", "TIFF (.tiff, .tif)", "WebP (.webp)"],
+            "JPEG (.jpg, .jpeg)": ["PNG (.png)", "BMP (.bmp)", "TIFF (.tiff, .tif)", "WebP (.webp)"],
+            "BMP (.bmp)": ["PNG (.png)", "JPEG (.jpg, .jpeg)", "TIFF (.tiff, .tif)"],
+            "TIFF (.tiff, .tif)": ["PNG (.png)", "JPEG (.jpg, .jpeg)", "BMP (.bmp)", "PNG Image Sequence (.zip)"],
+            "GIF (.gif)": ["PNG (.png)", "JPEG (.jpg, .jpeg)", "WebP (.webp)", "PNG Image Sequence (.zip)"],
+            "WebP (.webp)": ["PNG (.png)", "JPEG (.jpg, .jpeg)", "GIF (.gif)", "PNG Image Sequence (.zip)"],
+            "PNG Image Sequence (.zip)": ["TIFF (.tiff, .tif)"]
+        }
+    },
+    "Vector Graphics": {
+        "Input Formats": [
+            "SVG (.svg)",
+            "EPS (.eps)",
+            "PDF (.pdf)"
+        ],
+        "Conversions": {
+            "SVG (.svg)": ["PNG (.png)", "JPEG (.jpg, .jpeg)", "PDF (.pdf)"],
+            "EPS (.eps)": ["PDF (.pdf)", "PNG (.png)"],
+            "PDF (.pdf)": ["PNG (.png)", "JPEG (.jpg, .jpeg)"]
+        }
+    }
+}
+
+# File extension mappings
+extension_map = {
+    "Microsoft Word (.docx, .doc)": ".docx",
+    "OpenDocument (.odt)": ".odt",
+    "Rich Text Format (.rtf)": ".rtf",
+    "Plain Text (.txt)": ".txt",
+    "PDF (.pdf)": ".pdf",
+    "HTML (.html, .htm)": ".html",
+    "Microsoft PowerPoint (.pptx, .ppt)": ".pptx",
+    "OpenDocument Presentation (.odp)": ".odp",
+    "PNG/JPEG Images (.png, .jpg)": ".png",
+    "Microsoft Excel (.xlsx, .xls)": ".xlsx",
+    "OpenDocument Spreadsheet (.ods)": ".ods",
+    "CSV (.csv)": ".csv",
+    "TSV (.tsv)": ".tsv",
+    "Apache Parquet (.parquet)": ".parquet",
+    "Apache Arrow/Feather (.feather, .arrow)": ".feather",
+    "PNG (.png)": ".png",
+    "JPEG (.jpg, .jpeg)": ".jpg",
+    "BMP (.bmp)": ".bmp",
+    "TIFF (.tiff, .tif)": ".tiff",
+    "GIF (.gif)": ".gif",
+    "WebP (.webp)": ".webp",
+    "PNG Image Sequence (.zip)": ".zip",
+    "SVG (.svg)": ".svg",
+    "EPS (.eps)": ".eps"
+}
+
+# Extra extensions accepted on input for each format
+extension_aliases = {
+    ".doc": "Microsoft Word (.docx, .doc)",
+    ".htm": "HTML (.html, .htm)",
+    ".ppt": "Microsoft PowerPoint (.pptx, .ppt)",
+    ".xls": "Microsoft Excel (.xlsx, .xls)",
+    ".arrow": "Apache Arrow/Feather (.feather, .arrow)",
+    ".jpeg": "JPEG (.jpg, .jpeg)",
+    ".tif": "TIFF (.tiff, .tif)"
+}
+
+# Function to get file extension from filename
+def get_file_extension(filename):
+    return os.path.splitext(filename)[1].lower()
+
+# Function to find the domains that accept a given input format
+def domains_for_input(input_format):
+    return [name for name, domain in format_domains.items() if input_format in domain["Input Formats"]]
+
+# Function to guess the input format of a file from its extension
+def input_format_for_filename(filename):
+    ext = get_file_extension(filename)
+    if ext in extension_aliases:
+        return extension_aliases[ext]
+    for domain in format_domains.values():
+        for input_format in domain["Input Formats"]:
+            if extension_map.get(input_format) == ext:
+                return input_format
+    return None
@@ -0,0 +1,164 @@
+# Resource governor: runs conversions in child processes under CPU-time, wall-time and memory limits
+import multiprocessing
+import os
+import signal
+import threading
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; conversions run ungoverned there
+    resource = None
+
+from flexifile import config
+from flexifile.registry import logger
+from flexifile.scratch import adopt_owner, workspace_owner
+
+class ResourceLimitExceeded(Exception):
+    pass
+
+_context = None
+_context_lock = threading.Lock()
+# Governed children running at once, across jobs and batches; created on first use
+_slots = None
+# Set inside a governed child, whose helper processes would each inherit its whole memory limit
+_governed = False
+
+# Function to check whether conversions should run in governed child processes
+def governor_enabled():
+    return config.GOVERNOR_ENABLED and resource is not None
+
+# Function to get how many helper processes (pool workers, pdftoppm, gs) a conversion may run at
+# once: one inside a governed child, so the child and its helpers stay within the child's budget
+def process_count(requested=None):
+    return 1 if _governed else config.worker_count(requested)
+
+# Function to resolve the address-space limit for one conversion in bytes
+def memory_limit():
+    if config.GOVERN_MEMORY_BYTES:
+        return config.GOVERN_MEMORY_BYTES
+    # By default the host's memory is shared between the jobs that may run at once
+    try:
+        physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return 0
+    return max(512 * 1024 * 1024, physical // max(1, config.JOB_MAX_RUNNING))
+
+# Function to get the semaphore that keeps at most JOB_MAX_RUNNING governed children alive,
+# which is what memory_limit divides the host's memory by
+def child_slots():
+    global _slots
+    with _context_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(max(1, config.JOB_MAX_RUNNING))
+    return _slots
+
+# Function to get the multiprocessing context governed children start from
+def governor_context():
+    global _context
+    with _context_lock:
+        if _context is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                # Children fork from a server that has already imported the heavy backends,
+                # so each conversion starts in milliseconds and none inherits server threads
+                _context = multiprocessing.get_context("forkserver")
+                _context.set_forkserver_preload(["flexifile"] + [name for name in config.GOVERNOR_PRELOAD.split(",") if name])
+            else:
+                _context = multiprocessing.get_context("spawn")
+    return _context
+
+# Function to lower a limit without exceeding the hard limit already in place
+def set_limit(kind, soft, hard):
+    _, current_hard = resource.getrlimit(kind)
+    if current_hard != resource.RLIM_INFINITY:
+        soft, hard = min(soft, current_hard), min(hard, current_hard)
+    resource.setrlimit(kind, (soft, hard))
+
+# Function to apply the limits inside the child before the conversion starts
+def apply_limits(cpu_seconds, memory_bytes):
+    # A process group of its own, so a kill also stops any helper processes it started
+    os.setpgrp()
+    if memory_bytes:
+        set_limit(resource.RLIMIT_AS, memory_bytes, memory_bytes)
+    if cpu_seconds:
+        # SIGXCPU arrives when the soft limit is used up
+        def cpu_exceeded(signum, frame):
+            raise ResourceLimitExceeded(f"The conversion used more than {cpu_seconds:g}s of CPU time and was stopped")
+
+        signal.signal(signal.SIGXCPU, cpu_exceeded)
+        # The kernel kills the process at the hard limit if the signal is not handled in time
+        set_limit(resource.RLIMIT_CPU, int(cpu_seconds), int(cpu_seconds) + 5)
+
+# Function run in the governed child: applies the limits, runs the conversion and sends back
+# ("ok", result), ("limit", message) or ("error", exception)
+def governed_child(conn, owner, limits, func, args):
+    global _governed
+    _governed = True
+    adopt_owner(owner)
+    try:
+        apply_limits(*limits)
+        reply = ("ok", func(*args))
+    except MemoryError:
+        if limits[1]:
+            reply = ("limit", f"The conversion needed more than {limits[1] / 1024 ** 2:,.0f} MB of memory and was stopped")
+        else:
+            reply = ("limit", "The conversion ran out of memory and was stopped")
+    except ResourceLimitExceeded as e:
+        reply = ("limit", str(e))
+    except Exception as e:
+        reply = ("error", e)
+    try:
+        conn.send(reply)
+    except Exception as e:
+        # Exceptions that cannot be pickled are sent as text
+        conn.send(("error", RuntimeError(str(reply[1]) if reply[0] != "ok" else f"Could not return the result: {e}")))
+    conn.close()
+
+# Function to stop a governed child and everything in its process group
+def kill_child(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        process.kill()
+    process.join()
+
+# Function to run func(*args) in a governed child process and return its result; raises
+# ResourceLimitExceeded when the child runs out of time or memory or is killed
+def run_governed(func, *args):
+    if not governor_enabled():
+        return func(*args)
+
+    with child_slots():
+        return run_child(func, args)
+
+# Function to start one governed child and wait for its reply
+def run_child(func, args):
+    context = governor_context()
+    receiver, sender = context.Pipe(duplex=False)
+    limits = (config.GOVERN_CPU_SECONDS, memory_limit())
+    process = context.Process(target=governed_child, args=(sender, workspace_owner(), limits, func, args))
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(config.GOVERN_WALL_SECONDS):
+            kill_child(process)
+            raise ResourceLimitExceeded(f"The conversion took longer than {config.GOVERN_WALL_SECONDS:g}s and was stopped")
+        try:
+            status, value = receiver.recv()
+        except EOFError:
+            # The child died without replying: the kernel's CPU hard limit or the OOM killer
+            process.join()
+            logger.warning("governed conversion exited with code %s", process.exitcode)
+            raise ResourceLimitExceeded(f"The conversion process was killed (exit code {process.exitcode}); "
+                                        "it most likely ran out of memory or CPU time")
+    finally:
+        receiver.close()
+        process.join(timeout=5)
+        if process.is_alive():
+            kill_child(process)
+
+    if status == "ok":
+        return value
+    if status == "limit":
+        raise ResourceLimitExceeded(value)
+    raise value
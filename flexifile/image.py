@@ -0,0 +1,260 @@
+# Image format conversions
+import collections
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageSequence, TiffImagePlugin
+
+from flexifile import config
+from flexifile.archive import ZipStreamWriter
+from flexifile.cache import cached_conversion
+from flexifile.metrics import stage
+from flexifile.registry import logger, register_converter, send_notice
+from flexifile.scratch import new_workspace, release_workspace
+from flexifile.utils import input_source
+
+# Pillow refuses images past twice this many pixels, including frames inside PNG sequences
+Image.MAX_IMAGE_PIXELS = config.MAX_IMAGE_PIXELS
+
+# Pillow save format and file extension for each output format
+image_targets = {
+    "PNG (.png)": ("PNG", ".png"),
+    "JPEG (.jpg, .jpeg)": ("JPEG", ".jpg"),
+    "BMP (.bmp)": ("BMP", ".bmp"),
+    "TIFF (.tiff, .tif)": ("TIFF", ".tiff"),
+    "WebP (.webp)": ("WEBP", ".webp"),
+    "GIF (.gif)": ("GIF", ".gif"),
+    "PNG Image Sequence (.zip)": ("PNG", ".zip")
+}
+
+# Image modes each format can store as-is, so no conversion copy is needed
+writable_modes = {
+    "PNG": {"1", "L", "LA", "I", "I;16", "P", "RGB", "RGBA"},
+    "JPEG": {"L", "RGB", "CMYK"},
+    "BMP": {"1", "L", "P", "RGB", "RGBA"},
+    "TIFF": {"1", "L", "LA", "I", "I;16", "F", "P", "RGB", "RGBA", "CMYK", "YCbCr"},
+    "WEBP": {"RGB", "RGBA"},
+    "GIF": {"1", "L", "P", "RGB", "RGBA"}
+}
+
+# Encoder settings per speed/size preset ("balanced" matches the original settings)
+encoder_presets = {
+    "fast": {
+        "PNG": {"compress_level": 1},
+        "JPEG": {"quality": 90},
+        "WEBP": {"quality": 90, "method": 0}
+    },
+    "balanced": {
+        "PNG": {"compress_level": 6},
+        "JPEG": {"quality": 95},
+        "WEBP": {"quality": 95, "method": 4}
+    },
+    "small": {
+        "PNG": {"compress_level": 9, "optimize": True},
+        "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+        "WEBP": {"quality": 80, "method": 6},
+        "TIFF": {"compression": "tiff_adobe_deflate"}
+    }
+}
+
+# Function to pick the mode an image must be converted to before saving (None if it can be saved as-is)
+def target_mode(img, save_format):
+    modes = writable_modes[save_format]
+    if img.mode in modes:
+        return None
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+    if has_alpha and "RGBA" in modes:
+        return "RGBA"
+    if img.mode in ("1", "L", "LA") and "L" in modes:
+        return "L"
+    return "RGB"
+
+# Function to import pyvips if it is installed (it needs the libvips shared library)
+def load_pyvips():
+    try:
+        import pyvips
+    except (ImportError, OSError):
+        return None
+    return pyvips
+
+# Function to translate Pillow encoder settings into libvips saver options
+def vips_save_options(save_format, settings):
+    if save_format == "PNG":
+        return {"compression": settings.get("compress_level", 6)}
+    if save_format == "JPEG":
+        return {"Q": settings.get("quality", 95), "optimize_coding": settings.get("optimize", False),
+                "interlace": settings.get("progressive", False)}
+    if save_format == "WEBP":
+        return {"Q": settings.get("quality", 95), "effort": settings.get("method", 4)}
+    return {"compression": "deflate" if settings.get("compression") else "none"}
+
+# Function to convert a very large image with libvips, which streams it through
+# in strips instead of decoding the whole bitmap into memory
+def convert_large_image(pyvips, input_file, output_path, save_format, settings, max_dimension):
+    source = input_source(input_file)
+    if max_dimension:
+        # Shrink-on-load decodes JPEGs at reduced scale, like Pillow's draft mode
+        if isinstance(source, str):
+            image = pyvips.Image.thumbnail(source, max_dimension, height=max_dimension, size="down")
+        else:
+            image = pyvips.Image.thumbnail_buffer(source.getbuffer(), max_dimension, height=max_dimension, size="down")
+    elif isinstance(source, str):
+        image = pyvips.Image.new_from_file(source, access="sequential")
+    else:
+        image = pyvips.Image.new_from_buffer(source.getbuffer(), "", access="sequential")
+
+    if save_format == "JPEG" and image.hasalpha():
+        image = image.extract_band(0, n=image.bands - 1)
+    image.write_to_file(output_path, **vips_save_options(save_format, settings))
+
+# Function to save every frame of an animated image, iterating frames lazily
+def save_animation(img, output_path, save_format, settings):
+    # Per-frame durations have to be known before the encoder starts; WebP only
+    # reports a frame's duration once it is loaded, so this decodes one frame at a time
+    durations = []
+    for frame in ImageSequence.Iterator(img):
+        frame.load()
+        durations.append(frame.info.get("duration", 100))
+    img.seek(0)
+    # Passing the source itself lets Pillow seek and convert one frame at a time
+    img.save(output_path, save_format, save_all=True, duration=durations, loop=img.info.get("loop", 0), **settings)
+
+# Function to encode one frame to PNG bytes (Pillow releases the GIL while encoding)
+def encode_png(frame, settings):
+    buffer = io.BytesIO()
+    frame.save(buffer, "PNG", **settings)
+    return buffer.getvalue()
+
+# Function to write every frame or page of an image into a ZIP of PNGs
+def frames_to_png_zip(img, zip_path, base_filename, settings):
+    workers = config.worker_count()
+    pending = collections.deque()
+    with ZipStreamWriter(zip_path) as archive, ThreadPoolExecutor(max_workers=workers) as pool:
+        def write_oldest():
+            member_name, future = pending.popleft()
+            # PNG data is already compressed, so the archive stores members as-is
+            archive.add_bytes(member_name, future.result())
+        
+        for index, frame in enumerate(ImageSequence.Iterator(img), start=1):
+            # Copy the frame out of the sequence before the iterator seeks to the next one
+            page = frame.copy()
+            mode = target_mode(page, "PNG")
+            if mode:
+                page = page.convert(mode)
+            pending.append((f"{base_filename}_{index:04d}.png", pool.submit(encode_png, page, settings)))
+            # At most one frame per worker is held in memory at a time
+            if len(pending) >= workers:
+                write_oldest()
+        while pending:
+            write_oldest()
+
+# Function to combine the PNGs in a ZIP into one multi-page TIFF, one page at a time
+def png_zip_to_tiff(input_file, output_path, settings):
+    with zipfile.ZipFile(input_source(input_file)) as zipf:
+        names = sorted(name for name in zipf.namelist() if name.lower().endswith(".png"))
+        if not names:
+            raise ValueError("The ZIP file does not contain any PNG images")
+        with TiffImagePlugin.AppendingTiffWriter(output_path, True) as tiff:
+            for name in names:
+                with zipf.open(name) as member, Image.open(member) as page:
+                    page.save(tiff, "TIFF", **settings)
+                    tiff.newFrame()
+
+@cached_conversion
+def convert_image(input_file, input_format, output_format, input_filename, options=None, notify=None):
+    # Create a managed workspace for file operations
+    temp_dir = new_workspace()
+    
+    # Get base filename without extension
+    base_filename = os.path.splitext(input_filename)[0]
+    
+    if output_format not in image_targets:
+        # Default case - return error
+        release_workspace(temp_dir)
+        return None, "Conversion not supported"
+    
+    options = options or {}
+    save_format, output_ext = image_targets[output_format]
+    settings = encoder_presets[options.get("preset", "balanced")].get(save_format, {})
+    max_dimension = options.get("max_dimension")
+    output_path = os.path.join(temp_dir, f"{base_filename}{output_ext}")
+    
+    # Image conversions
+    try:
+        if input_format == "PNG Image Sequence (.zip)":
+            # PNG sequence to multi-page TIFF conversion
+            png_zip_to_tiff(input_file, output_path, settings)
+            return output_path, f"{base_filename}{output_ext}"
+        
+        # Opening only reads the header, so the size is known before anything is decoded
+        img = Image.open(input_source(input_file))
+        frame_count = getattr(img, "n_frames", 1)
+        
+        if output_format == "PNG Image Sequence (.zip)":
+            # Multi-frame/multi-page image to a ZIP of per-frame PNGs
+            frames_to_png_zip(img, output_path, base_filename, settings)
+            return output_path, f"{base_filename}{output_ext}"
+        
+        if frame_count > 1 and save_format in ("WEBP", "GIF"):
+            # Animated GIF <-> animated WebP conversion
+            save_animation(img, output_path, save_format, settings)
+            return output_path, f"{base_filename}{output_ext}"
+        
+        if frame_count > 1:
+            send_notice(notify, f"Note: Only the first of {frame_count} frames was converted. Choose PNG Image Sequence (.zip) as the output to keep every frame.")
+        
+        pyvips = load_pyvips() if img.width * img.height > config.IMAGE_LARGE_PIXELS else None
+        if pyvips and save_format != "BMP":
+            img.close()
+            convert_large_image(pyvips, input_file, output_path, save_format, settings, max_dimension)
+            return output_path, f"{base_filename}{output_ext}"
+        
+        with stage("decode"):
+            if max_dimension and max(img.size) > max_dimension:
+                # thumbnail() asks the JPEG decoder for a 1/2, 1/4 or 1/8 scale draft and
+                # uses reduce() before resampling, so the full-size bitmap is never built
+                img.thumbnail((max_dimension, max_dimension), reducing_gap=2.0)
+            img.load()
+        
+        # Only convert when the target format cannot store the source mode
+        with stage("transform"):
+            mode = target_mode(img, save_format)
+            if mode:
+                img = img.convert(mode)
+        
+        with stage("encode"):
+            img.save(output_path, save_format, **settings)
+        return output_path, f"{base_filename}{output_ext}"
+    
+    except Exception as e:
+        logger.exception("Error converting image")
+        release_workspace(temp_dir)
+        return None, f"Error: {str(e)}"
+
+register_converter(convert_image, [
+    ("PNG (.png)", "JPEG (.jpg, .jpeg)"),
+    ("PNG (.png)", "BMP (.bmp)"),
+    ("PNG (.png)", "TIFF (.tiff, .tif)"),
+    ("PNG (.png)", "WebP (.webp)"),
+    ("JPEG (.jpg, .jpeg)", "PNG (.png)"),
+    ("JPEG (.jpg, .jpeg)", "BMP (.bmp)"),
+    ("JPEG (.jpg, .jpeg)", "TIFF (.tiff, .tif)"),
+    ("JPEG (.jpg, .jpeg)", "WebP (.webp)"),
+    ("BMP (.bmp)", "PNG (.png)"),
+    ("BMP (.bmp)", "JPEG (.jpg, .jpeg)"),
+    ("BMP (.bmp)", "TIFF (.tiff, .tif)"),
+    ("TIFF (.tiff, .tif)", "PNG (.png)"),
+    ("TIFF (.tiff, .tif)", "JPEG (.jpg, .jpeg)"),
+    ("TIFF (.tiff, .tif)", "BMP (.bmp)"),
+    ("GIF (.gif)", "PNG (.png)"),
+    ("GIF (.gif)", "JPEG (.jpg, .jpeg)"),
+    ("WebP (.webp)", "PNG (.png)"),
+    ("WebP (.webp)", "JPEG (.jpg, .jpeg)"),
+    ("GIF (.gif)", "WebP (.webp)"),
+    ("WebP (.webp)", "GIF (.gif)"),
+    ("TIFF (.tiff, .tif)", "PNG Image Sequence (.zip)"),
+    ("GIF (.gif)", "PNG Image Sequence (.zip)"),
+    ("WebP (.webp)", "PNG Image Sequence (.zip)"),
+    ("PNG Image Sequence (.zip)", "TIFF (.tiff, .tif)")
+])
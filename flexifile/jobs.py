@@ -0,0 +1,275 @@
+# Background conversion jobs: a shared queue served by thread and process pools
+import collections
+import io
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flexifile import config
+from flexifile.archive import ZipStreamWriter
+from flexifile.batch import adopt_measurements, convert_batch, convert_staged, run_measured
+from flexifile.delivery import release_delivered
+from flexifile.governor import ResourceLimitExceeded, governor_enabled, run_governed
+from flexifile.metrics import track_conversion
+from flexifile.office import office_conversions
+from flexifile.registry import convert, logger
+from flexifile.scratch import adopt_owner, new_workspace, release_workspace
+from flexifile.spreadsheet import delimiter_map
+from flexifile.utils import save_input
+
+class Job:
+    def __init__(self, owner, label, func, args, cpu_bound):
+        self.id = uuid.uuid4().hex[:8]
+        self.owner = owner
+        self.label = label
+        self.func = func
+        self.args = args
+        self.cpu_bound = cpu_bound
+        self.status = "queued"
+        self.progress = 0.0
+        self.notices = []
+        self.output_path = None
+        self.output_filename = None
+        self.message = None
+        self.metrics = None
+        # ZipStreamWriter of a batch ZIP still being built, which can be downloaded as it grows
+        self.archive = None
+        # Staged inputs to drop once the job ends, however it ends (a governed child that is
+        # killed never reaches its own cleanup)
+        self.staged_paths = []
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    def add_notice(self, message):
+        self.notices.append(message)
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+class JobManager:
+    def __init__(self):
+        # Re-entrant because a future that is already done runs its callback immediately
+        self.lock = threading.RLock()
+        self.jobs = {}
+        # owner -> queued jobs; owners are served round-robin in this order
+        self.pending = collections.OrderedDict()
+        self.running = collections.Counter()
+        self.threads = ThreadPoolExecutor(max_workers=config.JOB_THREAD_WORKERS, thread_name_prefix="flexifile-job")
+        self.processes = None
+
+    def process_pool(self):
+        if self.processes is None:
+            # Spawned workers do not inherit the threads and locks of a running Streamlit server
+            self.processes = ProcessPoolExecutor(max_workers=config.worker_count(config.JOB_PROCESS_WORKERS),
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=adopt_owner, initargs=(os.getpid(),))
+        return self.processes
+
+    def submit(self, owner, label, func, args=(), cpu_bound=False, staged_paths=()):
+        job = Job(owner, label, func, args, cpu_bound)
+        job.staged_paths.extend(staged_paths)
+        with self.lock:
+            self.jobs[job.id] = job
+            self.pending.setdefault(owner, collections.deque()).append(job)
+            self.dispatch()
+        return job
+
+    def dispatch(self):
+        # Called with the lock held, whenever a job is queued or finishes
+        while sum(self.running.values()) < config.JOB_MAX_RUNNING:
+            for owner, queue in self.pending.items():
+                if self.running[owner] < config.JOB_PER_USER:
+                    break
+            else:
+                return
+            job = queue.popleft()
+            # Each start sends the owner to the back, so one user's backlog cannot starve the others
+            self.pending.move_to_end(owner)
+            if not queue:
+                del self.pending[owner]
+            self.running[owner] += 1
+            job.status, job.started = "running", time.time()
+            if job.cpu_bound and governor_enabled():
+                # Each governed conversion gets a child process of its own, watched from a thread
+                future = self.threads.submit(run_governed, run_measured, job.func, *job.args)
+            elif job.cpu_bound:
+                future = self.process_pool().submit(run_measured, job.func, *job.args)
+            else:
+                future = self.threads.submit(job.func, job, *job.args)
+            future.add_done_callback(lambda future, job=job: self.finish(job, future))
+
+    def finish(self, job, future):
+        try:
+            if job.cpu_bound:
+                # The worker's measurement and notices come back so the UI can show them and the
+                # totals and cache counters here include it
+                pid, (output_path, message), metrics, cache_delta, notices = future.result()
+                adopt_measurements(pid, metrics, cache_delta)
+                for notice in notices:
+                    job.add_notice(notice)
+            else:
+                output_path, message, metrics = future.result()
+        except BrokenProcessPool:
+            # A worker died (out of memory, crash); the next CPU-bound job gets a fresh pool
+            logger.exception("job %s lost its worker process", job.id)
+            with self.lock:
+                self.processes = None
+            output_path, message, metrics = None, "Error: the conversion worker crashed", None
+        except ResourceLimitExceeded as e:
+            logger.warning("job %s stopped: %s", job.id, e)
+            output_path, message, metrics = None, f"Error: {str(e)}", None
+        except Exception as e:
+            logger.exception("job %s failed", job.id)
+            output_path, message, metrics = None, f"Error: {str(e)}", None
+
+        for path in job.staged_paths:
+            release_workspace(path)
+        with self.lock:
+            job.finished = time.time()
+            job.metrics = metrics
+            if output_path:
+                job.status, job.progress = "done", 1.0
+                job.output_path, job.output_filename = output_path, message
+            else:
+                job.status, job.message = "failed", message
+            self.running[job.owner] -= 1
+            self.dispatch()
+
+    def queue_position(self, job):
+        with self.lock:
+            queue = self.pending.get(job.owner, ())
+            return list(queue).index(job) + 1 if job in queue else 0
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != "queued":
+                return False
+            self.pending[job.owner].remove(job)
+            if not self.pending[job.owner]:
+                del self.pending[job.owner]
+            job.status, job.finished, job.message = "cancelled", time.time(), "Cancelled"
+        for path in job.staged_paths:
+            release_workspace(path)
+        return True
+
+    def discard(self, job_id):
+        # Queued jobs are cancelled; running ones cannot be interrupted and are left alone
+        self.cancel(job_id)
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.active:
+                return
+            del self.jobs[job_id]
+        if job.output_path:
+            # A streamed download may still be reading the file; the server frees it once its link expires
+            release_delivered(job.output_path)
+
+    def expire(self):
+        now = time.time()
+        with self.lock:
+            expired = [job for job in self.jobs.values() if not job.active and now - job.finished > config.JOB_RESULT_TTL]
+        for job in expired:
+            self.discard(job.id)
+
+    def jobs_for(self, owner):
+        self.expire()
+        with self.lock:
+            return sorted((job for job in self.jobs.values() if job.owner == owner), key=lambda job: job.submitted)
+
+_manager = None
+_manager_lock = threading.Lock()
+
+# Function to get the process-wide job manager, so jobs outlive the script run that queued them
+def get_job_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+    return _manager
+
+# Function to decide whether a conversion mostly waits on I/O or another process
+def io_bound(input_format, output_format):
+    # LibreOffice does its work in soffice, Ghostscript in gs, and CSV <-> TSV is a streaming copy
+    return ((input_format, output_format) in office_conversions or input_format == "EPS (.eps)"
+            or (input_format in delimiter_map and output_format in delimiter_map))
+
+# Function to run a conversion on a job thread
+def convert_in_thread(job, input_file, input_format, output_format, input_filename, options=None):
+    with track_conversion(input_file, input_format, output_format, input_filename) as metrics:
+        output_path, message = convert(input_file, input_format, output_format, input_filename, options=options, notify=job.add_notice)
+    return output_path, message, metrics.as_dict()
+
+# Function to run a staged conversion and drop its staging workspace (runs in a worker process)
+def convert_staged_job(input_path, input_format, output_format, input_filename, options=None, release_input=True, notify=None):
+    try:
+        _, output_path, message = convert_staged(input_path, input_format, output_format, input_filename, options, notify=notify)
+    finally:
+        if release_input:
+            release_workspace(input_path)
+    return output_path, message
+
+# Function to convert a batch into one ZIP on a job thread, updating the job's progress
+def convert_batch_job(job, input_files, input_format, output_format, options=None):
+    zip_path = os.path.join(new_workspace(), "flexifile_converted.zip")
+    converted = 0
+    try:
+        with ZipStreamWriter(zip_path, workers=config.ARCHIVE_WORKERS) as archive:
+            # Outputs go into the ZIP as they finish, and the UI can send it while it grows
+            job.archive = archive
+            results = convert_batch(input_files, input_format, output_format, options=options, notify=job.add_notice)
+            for done, (input_filename, output_path, message) in enumerate(results, start=1):
+                job.progress = done / len(input_files)
+                if output_path:
+                    converted += 1
+                    # Each output's workspace goes once it has been read into the ZIP
+                    archive.add_file(output_path, done=release_workspace)
+                else:
+                    job.add_notice(f"Conversion failed for {input_filename}: {message}")
+    except BaseException:
+        release_workspace(zip_path)
+        raise
+    if not converted:
+        release_workspace(zip_path)
+        return None, "None of the files could be converted", None
+    job.add_notice(f"{converted} of {len(input_files)} files were converted.")
+    return zip_path, os.path.basename(zip_path), None
+
+# Function to queue a single conversion, on a process for CPU-bound pairs and a thread otherwise
+def submit_conversion(owner, input_file, input_format, output_format, input_filename, options=None):
+    manager = get_job_manager()
+    label = f"{input_filename}: {input_format} → {output_format}"
+    if io_bound(input_format, output_format):
+        if not isinstance(input_file, (str, os.PathLike)):
+            # The job gets a buffer of its own: the upload is shared with later reruns and jobs,
+            # and their seeks and reads would interleave with this job's
+            input_file = io.BytesIO(input_file.getvalue())
+        return manager.submit(owner, label, convert_in_thread, (input_file, input_format, output_format, input_filename, options))
+
+    if isinstance(input_file, (str, os.PathLike)):
+        # Files already on disk are read in place and left alone
+        return manager.submit(owner, label, convert_staged_job,
+                              (os.fspath(input_file), input_format, output_format, input_filename, options, False), cpu_bound=True)
+
+    # Worker processes read the input from disk, so uploads are staged once here
+    staging_dir = new_workspace()
+    input_path = save_input(input_file, staging_dir, input_filename)
+    return manager.submit(owner, label, convert_staged_job, (input_path, input_format, output_format, input_filename, options),
+                          cpu_bound=True, staged_paths=[staging_dir])
+
+# Function to queue a batch conversion that produces one ZIP
+def submit_batch(owner, input_files, input_format, output_format, options=None):
+    label = f"{len(input_files)} files: {input_format} → {output_format}"
+    return get_job_manager().submit(owner, label, convert_batch_job, (input_files, input_format, output_format, options))
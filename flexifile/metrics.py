@@ -0,0 +1,190 @@
+# Per-conversion metrics: stage timings, bytes in/out and peak memory
+import collections
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak memory is reported as 0 there
+    resource = None
+
+from flexifile import config
+
+# The conversion being measured in the current thread (None outside a conversion)
+_current = contextvars.ContextVar("flexifile_metrics", default=None)
+_lock = threading.Lock()
+
+# Most recent conversions, newest last
+recent_metrics = collections.deque(maxlen=config.METRICS_HISTORY)
+# (input format, output format) -> running totals for the Prometheus export
+metric_totals = {}
+
+class ConversionMetrics:
+    def __init__(self, input_format, output_format, input_filename):
+        self.input_format = input_format
+        self.output_format = output_format
+        self.input_filename = input_filename
+        self.started = time.time()
+        self.seconds = 0.0
+        self.stages = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.peak_rss = 0
+        self.rss_growth = 0
+        self.ok = False
+
+    def add_stage(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def note_output(self, output_path):
+        if output_path and os.path.exists(output_path):
+            self.bytes_out = os.path.getsize(output_path)
+            self.ok = True
+
+    def as_dict(self):
+        return {
+            "started": self.started,
+            "input_format": self.input_format,
+            "output_format": self.output_format,
+            "input_filename": self.input_filename,
+            "ok": self.ok,
+            "seconds": round(self.seconds, 6),
+            # Time not covered by a named stage (backends that decode and encode in one call)
+            "stages": {**{name: round(seconds, 6) for name, seconds in self.stages.items()},
+                       "other": round(max(0.0, self.seconds - sum(self.stages.values())), 6)},
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "peak_rss_bytes": self.peak_rss,
+            "rss_growth_bytes": self.rss_growth
+        }
+
+# Function to read the process's peak resident set size in bytes
+def peak_rss():
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+# Function to measure the size of an upload or a file on disk
+def input_size(input_file):
+    if isinstance(input_file, (str, os.PathLike)):
+        try:
+            return os.path.getsize(input_file)
+        except OSError:
+            return 0
+    if hasattr(input_file, "getbuffer"):
+        return input_file.getbuffer().nbytes
+    return 0
+
+# Context manager that measures one conversion; nested uses share the outer measurement,
+# so the UI can wrap convert() and delivery together
+@contextlib.contextmanager
+def track_conversion(input_file, input_format, output_format, input_filename):
+    metrics = _current.get()
+    if metrics is not None:
+        yield metrics
+        return
+
+    metrics = ConversionMetrics(input_format, output_format, input_filename)
+    metrics.bytes_in = input_size(input_file)
+    rss_before = peak_rss()
+    token = _current.set(metrics)
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.seconds = time.perf_counter() - start
+        # The peak is process-wide, so growth is what this conversion added to the high-water mark
+        metrics.peak_rss = peak_rss()
+        metrics.rss_growth = max(0, metrics.peak_rss - rss_before)
+        _current.reset(token)
+        record(metrics)
+
+# Context manager that adds the time spent inside it to a stage of the current conversion
+@contextlib.contextmanager
+def stage(name):
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_stage(name, time.perf_counter() - start)
+
+# Function to keep a finished measurement and append it to the JSON-lines log
+def record(metrics, log=True):
+    with _lock:
+        recent_metrics.append(metrics)
+        totals = metric_totals.setdefault((metrics.input_format, metrics.output_format), collections.Counter())
+        totals["conversions"] += 1
+        totals["failures"] += not metrics.ok
+        totals["seconds"] += metrics.seconds
+        totals["bytes_in"] += metrics.bytes_in
+        totals["bytes_out"] += metrics.bytes_out
+        for name, seconds in metrics.stages.items():
+            totals[f"stage:{name}"] += seconds
+
+    if log and config.METRICS_LOG:
+        # One short append per conversion, so batch worker processes can share the file
+        with open(config.METRICS_LOG, "a", encoding="utf-8") as log:
+            log.write(json.dumps(metrics.as_dict()) + "\n")
+
+# Function to keep a measurement made in a worker process, from its as_dict() form; the
+# worker has already written it to the JSON-lines log
+def record_remote(data):
+    metrics = ConversionMetrics(data["input_format"], data["output_format"], data["input_filename"])
+    metrics.started = data["started"]
+    metrics.ok = data["ok"]
+    metrics.seconds = data["seconds"]
+    metrics.stages = {name: seconds for name, seconds in data["stages"].items() if name != "other"}
+    metrics.bytes_in, metrics.bytes_out = data["bytes_in"], data["bytes_out"]
+    metrics.peak_rss, metrics.rss_growth = data["peak_rss_bytes"], data["rss_growth_bytes"]
+    record(metrics, log=False)
+
+# Function to render the recent conversions as JSON lines
+def json_lines():
+    with _lock:
+        return "".join(json.dumps(metrics.as_dict()) + "\n" for metrics in recent_metrics)
+
+# Function to escape a Prometheus label value
+def label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Function to render the running totals in the Prometheus text exposition format
+def prometheus_text():
+    counters = [
+        ("flexifile_conversions_total", "conversions", "Conversions run"),
+        ("flexifile_conversion_failures_total", "failures", "Conversions that produced no output"),
+        ("flexifile_conversion_seconds_total", "seconds", "Wall time spent converting"),
+        ("flexifile_input_bytes_total", "bytes_in", "Bytes read from inputs"),
+        ("flexifile_output_bytes_total", "bytes_out", "Bytes written to outputs")
+    ]
+    with _lock:
+        totals = {pair: dict(counter) for pair, counter in metric_totals.items()}
+
+    lines = []
+    for metric, key, help_text in counters:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for (input_format, output_format), values in totals.items():
+            lines.append(f'{metric}{{input="{label(input_format)}",output="{label(output_format)}"}} {values.get(key, 0):g}')
+
+    lines += ["# HELP flexifile_stage_seconds_total Wall time spent in each conversion stage",
+              "# TYPE flexifile_stage_seconds_total counter"]
+    for (input_format, output_format), values in totals.items():
+        for key, seconds in values.items():
+            if key.startswith("stage:"):
+                lines.append(f'flexifile_stage_seconds_total{{input="{label(input_format)}",output="{label(output_format)}",stage="{label(key[6:])}"}} {seconds:g}')
+
+    lines += ["# HELP flexifile_peak_rss_bytes Peak resident set size of this process",
+              "# TYPE flexifile_peak_rss_bytes gauge",
+              f"flexifile_peak_rss_bytes {peak_rss()}"]
+    return "\n".join(lines) + "\n"
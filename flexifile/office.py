@@ -0,0 +1,221 @@
+# LibreOffice backend: a fixed pool of warm headless soffice processes driven over UNO
+import atexit
+import importlib.util
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+from flexifile import config
+from flexifile.formats import extension_map
+from flexifile.metrics import stage
+from flexifile.registry import logger
+
+# (input format, output format) -> (export filter, filter options, import filter)
+office_conversions = {
+    ("Microsoft Word (.docx, .doc)", "PDF (.pdf)"): ("writer_pdf_Export", None, None),
+    ("Microsoft Word (.docx, .doc)", "Rich Text Format (.rtf)"): ("Rich Text Format", None, None),
+    ("Microsoft Word (.docx, .doc)", "Plain Text (.txt)"): ("Text (encoded)", "UTF8", None),
+    ("OpenDocument (.odt)", "PDF (.pdf)"): ("writer_pdf_Export", None, None),
+    ("OpenDocument (.odt)", "Microsoft Word (.docx, .doc)"): ("MS Word 2007 XML", None, None),
+    ("Rich Text Format (.rtf)", "Microsoft Word (.docx, .doc)"): ("MS Word 2007 XML", None, None),
+    ("Rich Text Format (.rtf)", "PDF (.pdf)"): ("writer_pdf_Export", None, None),
+    ("HTML (.html, .htm)", "Microsoft Word (.docx, .doc)"): ("MS Word 2007 XML", None, "HTML (StarWriter)"),
+    ("HTML (.html, .htm)", "PDF (.pdf)"): ("writer_pdf_Export", None, "HTML (StarWriter)"),
+    ("Microsoft PowerPoint (.pptx, .ppt)", "PDF (.pdf)"): ("impress_pdf_Export", None, None),
+    ("OpenDocument Presentation (.odp)", "Microsoft PowerPoint (.pptx, .ppt)"): ("Impress MS PowerPoint 2007 XML", None, None),
+    ("OpenDocument Presentation (.odp)", "PDF (.pdf)"): ("impress_pdf_Export", None, None),
+    ("PDF (.pdf)", "Microsoft PowerPoint (.pptx, .ppt)"): ("Impress MS PowerPoint 2007 XML", None, "impress_pdf_import"),
+    ("Microsoft Excel (.xlsx, .xls)", "PDF (.pdf)"): ("calc_pdf_Export", None, None),
+    ("OpenDocument Spreadsheet (.ods)", "Microsoft Excel (.xlsx, .xls)"): ("Calc MS Excel 2007 XML", None, None),
+    ("OpenDocument Spreadsheet (.ods)", "CSV (.csv)"): ("Text - txt - csv (StarCalc)", "44,34,76,1", None)
+}
+
+# Function to check whether LibreOffice is installed
+def office_available():
+    return shutil.which(config.SOFFICE_BINARY) is not None
+
+# Function to check whether the UNO bridge (LibreOffice's Python bindings) can be imported
+def uno_available():
+    return importlib.util.find_spec("uno") is not None
+
+# Function to build a UNO PropertyValue tuple from keyword arguments
+def uno_properties(**values):
+    import uno
+
+    properties = []
+    for name, value in values.items():
+        prop = uno.createUnoStruct("com.sun.star.beans.PropertyValue")
+        prop.Name, prop.Value = name, value
+        properties.append(prop)
+    return tuple(properties)
+
+class OfficeWorker:
+    def __init__(self, index):
+        self.index = index
+        # A named pipe per process and worker avoids port clashes between app instances
+        self.pipe_name = f"flexifile-{os.getpid()}-{index}"
+        # Each soffice needs its own user profile or the instances lock each other out
+        self.profile_dir = tempfile.mkdtemp(prefix=f"flexifile-soffice-{index}-")
+        self.process = None
+        self.desktop = None
+        self.timed_out = False
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self.stop()
+        self.process = subprocess.Popen(
+            [config.SOFFICE_BINARY, "--headless", "--invisible", "--nologo", "--nodefault",
+             "--norestore", "--nolockcheck", f"-env:UserInstallation=file://{self.profile_dir}",
+             f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.desktop = self.connect()
+
+    def connect(self):
+        import uno
+
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + config.OFFICE_START_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext")
+                return context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+            except Exception:
+                # soffice takes a few seconds to open its pipe on a cold start
+                if not self.alive() or time.monotonic() > deadline:
+                    raise RuntimeError("LibreOffice did not start")
+                time.sleep(0.25)
+
+    def kill(self):
+        self.timed_out = True
+        if self.process is not None:
+            self.process.kill()
+
+    def stop(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        self.desktop = None
+
+    def convert(self, input_path, output_path, export_filter, filter_options=None, import_filter=None):
+        import uno
+
+        load_options = {"Hidden": True}
+        if import_filter:
+            load_options["FilterName"] = import_filter
+        doc = self.desktop.loadComponentFromURL(uno.systemPathToFileUrl(input_path), "_blank", 0, uno_properties(**load_options))
+        try:
+            store_options = {"FilterName": export_filter}
+            if filter_options:
+                store_options["FilterOptions"] = filter_options
+            doc.storeToURL(uno.systemPathToFileUrl(output_path), uno_properties(**store_options))
+        finally:
+            doc.close(True)
+
+class OfficePool:
+    def __init__(self, size):
+        self.jobs = queue.Queue()
+        self.workers = [OfficeWorker(index) for index in range(size)]
+        for worker in self.workers:
+            threading.Thread(target=self.run_worker, args=(worker,), name=f"flexifile-office-{worker.index}", daemon=True).start()
+
+    def submit(self, input_path, output_path, export_filter, filter_options=None, import_filter=None, timeout=None):
+        future = Future()
+        self.jobs.put((future, (input_path, output_path, export_filter, filter_options, import_filter), timeout or config.OFFICE_TIMEOUT))
+        return future
+
+    def run_worker(self, worker):
+        # Start soffice straight away so the first job finds a warm process
+        try:
+            worker.start()
+        except Exception:
+            logger.exception("LibreOffice worker %d failed to start", worker.index)
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                worker.stop()
+                return
+            future, args, timeout = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if not worker.alive():
+                    # Restart workers that crashed or were killed by a previous job
+                    worker.start()
+                worker.timed_out = False
+                watchdog = threading.Timer(timeout, worker.kill)
+                watchdog.start()
+                try:
+                    worker.convert(*args)
+                finally:
+                    watchdog.cancel()
+                future.set_result(args[1])
+            except Exception as e:
+                # A failed or hung job can leave soffice unusable, so the next job gets a fresh one
+                worker.stop()
+                if worker.timed_out:
+                    e = TimeoutError(f"LibreOffice conversion timed out after {timeout:g}s")
+                future.set_exception(e)
+
+    def shutdown(self):
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.stop()
+            shutil.rmtree(worker.profile_dir, ignore_errors=True)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Function to get the process-wide LibreOffice pool, starting it on first use
+def get_office_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OfficePool(config.OFFICE_POOL_SIZE)
+            atexit.register(_pool.shutdown)
+    return _pool
+
+# Function to convert with a one-off soffice process (used when the UNO bridge is not importable)
+def convert_with_soffice_cli(input_path, output_path, export_filter, filter_options=None, import_filter=None):
+    work_dir = tempfile.mkdtemp(dir=os.path.dirname(output_path))
+    ext = os.path.splitext(output_path)[1].lstrip(".")
+    target = f"{ext}:{export_filter}" + (f":{filter_options}" if filter_options else "")
+    command = [config.SOFFICE_BINARY, "--headless", "--norestore", f"-env:UserInstallation=file://{work_dir}/profile",
+               "--convert-to", target, "--outdir", work_dir, input_path]
+    if import_filter:
+        command.insert(-1, f"--infilter={import_filter}")
+    try:
+        result = subprocess.run(command, timeout=config.OFFICE_TIMEOUT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode:
+            raise RuntimeError(f"LibreOffice failed: {result.stderr.decode(errors='replace').strip()}")
+        converted = os.path.join(work_dir, f"{os.path.splitext(os.path.basename(input_path))[0]}.{ext}")
+        if not os.path.exists(converted):
+            raise RuntimeError("LibreOffice did not produce an output file")
+        shutil.move(converted, output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+# Function to run an office conversion, returning (output path, output filename)
+def convert_with_office(input_path, temp_dir, base_filename, input_format, output_format):
+    export_filter, filter_options, import_filter = office_conversions[(input_format, output_format)]
+    output_filename = f"{base_filename}{extension_map[output_format]}"
+    output_path = os.path.join(temp_dir, output_filename)
+
+    # LibreOffice loads, converts and saves in one call, so it is timed as a single stage
+    with stage("transform"):
+        if uno_available():
+            future = get_office_pool().submit(os.path.abspath(input_path), output_path, export_filter, filter_options, import_filter)
+            future.result()
+        else:
+            convert_with_soffice_cli(os.path.abspath(input_path), output_path, export_filter, filter_options, import_filter)
+    return output_path, output_filename
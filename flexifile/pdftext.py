@@ -0,0 +1,47 @@
+# Parallel PDF text extraction with page-range selection
+from flexifile import config
+from flexifile.batch import run_in_pool
+
+# Function to turn a page range like "1-5, 8, 10-" into sorted 0-based page indices
+def parse_page_range(spec, page_count):
+    if not spec or not str(spec).strip():
+        return list(range(page_count))
+
+    pages = set()
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, dash, end = part.partition("-")
+        try:
+            first = int(start) if start.strip() else 1
+            last = (int(end) if end.strip() else page_count) if dash else first
+        except ValueError:
+            raise ValueError(f"Invalid page range: {part!r}")
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: {part!r}")
+        pages.update(range(first - 1, min(last, page_count)))
+    if not pages:
+        raise ValueError(f"Page range {spec!r} selects no pages (the document has {page_count})")
+    return sorted(pages)
+
+# Function to extract the text of a run of pages (runs inside a worker process)
+def extract_pages(input_path, page_indices):
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(input_path)
+    return [pdf_reader.pages[i].extract_text() or "" for i in page_indices]
+
+# Function to yield the text of the selected pages in page order, extracting
+# chunks of pages in parallel worker processes
+def iter_page_texts(input_path, page_spec=None, workers=None):
+    import PyPDF2
+
+    page_count = len(PyPDF2.PdfReader(input_path).pages)
+    pages = parse_page_range(page_spec, page_count)
+
+    chunk = config.PDF_TEXT_CHUNK_PAGES
+    jobs = [(input_path, pages[i:i + chunk]) for i in range(0, len(pages), chunk)]
+    # Results come back in submission order, so writers can stream them straight out
+    for texts in run_in_pool(extract_pages, jobs, workers, ordered=True):
+        yield from texts
@@ -0,0 +1,138 @@
+# Pre-flight checks: reject oversized inputs and decompression bombs from their headers,
+# before a backend decodes them
+import re
+import zipfile
+from xml.etree import ElementTree
+
+from flexifile import config
+from flexifile.metrics import input_size
+from flexifile.sniff import check_format
+from flexifile.utils import input_source, input_stream
+
+# Input formats stored as ZIP containers
+zip_formats = (
+    "Microsoft Word (.docx, .doc)",
+    "OpenDocument (.odt)",
+    "Microsoft PowerPoint (.pptx, .ppt)",
+    "OpenDocument Presentation (.odp)",
+    "Microsoft Excel (.xlsx, .xls)",
+    "OpenDocument Spreadsheet (.ods)",
+    "PNG Image Sequence (.zip)"
+)
+
+# Input formats decoded by Pillow
+image_formats = (
+    "PNG (.png)",
+    "JPEG (.jpg, .jpeg)",
+    "BMP (.bmp)",
+    "TIFF (.tiff, .tif)",
+    "GIF (.gif)",
+    "WebP (.webp)"
+)
+
+# Function to format a byte count for messages
+def size_text(size):
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "bytes" else f"{size:.1f} {unit}"
+        size /= 1024
+
+# Function to check an image's pixel count from its header
+def check_image(input_file):
+    from PIL import Image
+
+    try:
+        with Image.open(input_source(input_file)) as img:
+            width, height = img.size
+    except Image.DecompressionBombError:
+        # Pillow itself refuses images past twice the limit
+        return f"The image is larger than the {config.MAX_IMAGE_PIXELS / 1e6:.0f}-megapixel limit"
+    except Exception:
+        # Unreadable headers are left for the converter to report
+        return None
+    if width * height > config.MAX_IMAGE_PIXELS:
+        return (f"The image is {width}x{height} ({width * height / 1e6:.0f} megapixels); "
+                f"the limit is {config.MAX_IMAGE_PIXELS / 1e6:.0f} megapixels")
+    return None
+
+# Function to check a worksheet's declared size from the <dimension> element at its start
+def check_sheet_dimension(archive, member):
+    with archive.open(member) as f:
+        head = f.read(4096).decode("utf-8", errors="replace")
+    match = re.search(r'<dimension ref="[A-Z]+(\d+):([A-Z]+)(\d+)"', head)
+    if not match:
+        return None
+    columns = 0
+    for letter in match.group(2):
+        columns = columns * 26 + ord(letter) - 64
+    rows = int(match.group(3)) - int(match.group(1)) + 1
+    if rows * columns > config.MAX_SHEET_CELLS:
+        return (f"Sheet {member.rsplit('/', 1)[-1]} spans {rows} rows x {columns} columns; "
+                f"the limit is {config.MAX_SHEET_CELLS:,} cells")
+    return None
+
+# Function to check a ZIP container's unpacked size and compression ratio from its directory
+def check_zip(input_file, input_format):
+    with input_stream(input_file) as f:
+        if not zipfile.is_zipfile(f):
+            # Legacy .doc/.xls/.ppt files are not ZIPs
+            return None
+        f.seek(0)
+        with zipfile.ZipFile(f) as archive:
+            members = archive.infolist()
+            unpacked = sum(member.file_size for member in members)
+            packed = sum(member.compress_size for member in members)
+            if unpacked > config.MAX_UNPACKED_BYTES:
+                return f"The file unpacks to {size_text(unpacked)}; the limit is {size_text(config.MAX_UNPACKED_BYTES)}"
+            # Small archives are exempt, since tiny inputs can compress extremely well
+            if unpacked > 16 * 1024 * 1024 and unpacked > packed * config.MAX_COMPRESSION_RATIO:
+                return f"The file unpacks to {unpacked / max(packed, 1):.0f} times its size, which looks like a decompression bomb"
+            if input_format == "Microsoft Excel (.xlsx, .xls)":
+                for member in members:
+                    if member.filename.startswith("xl/worksheets/") and member.filename.endswith(".xml"):
+                        problem = check_sheet_dimension(archive, member.filename)
+                        if problem:
+                            return problem
+    return None
+
+# Function to check an SVG's nesting depth and element count with a streaming parse
+def check_svg(input_file):
+    with input_stream(input_file) as f:
+        head = f.read(64 * 1024)
+        # Entity declarations are how "billion laughs" documents expand; SVGs do not need them
+        if b"<!ENTITY" in head:
+            return "SVG files with entity declarations are not accepted"
+        f.seek(0)
+        depth = elements = 0
+        try:
+            for event, _ in ElementTree.iterparse(f, events=("start", "end")):
+                if event == "end":
+                    depth -= 1
+                    continue
+                depth += 1
+                elements += 1
+                if depth > config.SVG_MAX_DEPTH:
+                    return f"The SVG nests elements more than {config.SVG_MAX_DEPTH} levels deep"
+                if elements > config.SVG_MAX_ELEMENTS:
+                    return f"The SVG has more than {config.SVG_MAX_ELEMENTS:,} elements"
+        except ElementTree.ParseError:
+            # Malformed files are left for svglib to report
+            return None
+    return None
+
+# Function to run the cheap checks for an input; returns a message when it must be rejected
+def preflight(input_file, input_format):
+    size = input_size(input_file)
+    if size > config.MAX_INPUT_BYTES:
+        return f"The file is {size_text(size)}; the limit is {size_text(config.MAX_INPUT_BYTES)}"
+    # A file that is not what it claims to be would only fail later, after a full decode
+    problem = check_format(input_file, input_format)
+    if problem:
+        return problem
+    if input_format in image_formats:
+        return check_image(input_file)
+    if input_format in zip_formats:
+        return check_zip(input_file, input_format)
+    if input_format == "SVG (.svg)":
+        return check_svg(input_file)
+    return None
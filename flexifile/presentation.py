@@ -0,0 +1,68 @@
+# Presentation format conversions
+import os
+
+from flexifile.cache import cached_conversion
+from flexifile.office import convert_with_office, office_available, office_conversions
+from flexifile.rasterize import rasterize_pdf
+from flexifile.registry import register_converter, send_notice
+from flexifile.scratch import new_workspace, release_workspace
+from flexifile.slides import slides_to_images, slides_to_pdf
+from flexifile.utils import save_input
+
+@cached_conversion
+def convert_presentation(input_file, input_format, output_format, input_filename, options=None, notify=None):
+    # Create a managed workspace for file operations
+    temp_dir = new_workspace()
+    
+    # Get base filename without extension
+    base_filename = os.path.splitext(input_filename)[0]
+    options = options or {}
+    
+    try:
+        # Office formats go through the LibreOffice worker pool when soffice is installed
+        if (input_format, output_format) in office_conversions and office_available():
+            input_path = save_input(input_file, temp_dir, input_filename)
+            return convert_with_office(input_path, temp_dir, base_filename, input_format, output_format)
+        
+        # Presentation conversions
+        if input_format == "Microsoft PowerPoint (.pptx, .ppt)" and output_format == "PDF (.pdf)":
+            # PowerPoint to PDF conversion (one page per slide, drawn from the shared layout model)
+            output_path = os.path.join(temp_dir, f"{base_filename}.pdf")
+            slides_to_pdf(input_file, output_path)
+            send_notice(notify, "Note: Slides are redrawn from their text, pictures, tables and solid fills. For full fidelity, install LibreOffice on the server.")
+            return output_path, f"{base_filename}.pdf"
+        
+        elif input_format == "Microsoft PowerPoint (.pptx, .ppt)" and output_format == "PNG/JPEG Images (.png, .jpg)":
+            # PowerPoint to Images conversion (slides rendered in parallel, streamed into the ZIP)
+            zip_path = os.path.join(temp_dir, f"{base_filename}_slides.zip")
+            slides_to_images(input_file, zip_path, base_filename, options.get("image_format", "png"), options.get("slide_width"))
+            send_notice(notify, "Note: Slides are redrawn from their text, pictures, tables and solid fills. For full fidelity, install LibreOffice on the server.")
+            return zip_path, f"{base_filename}_slides.zip"
+        
+        elif input_format == "PDF (.pdf)" and output_format == "PNG/JPEG Images (.png, .jpg)":
+            # PDF to slide images conversion, one image per page
+            fmt = options.get("image_format", "png")
+            # pdftoppm reads from a path, so the upload is saved to disk
+            input_path = save_input(input_file, temp_dir, input_filename)
+            return rasterize_pdf(input_path, temp_dir, base_filename, fmt, options.get("dpi"), options.get("page_range"), notify)
+        
+        # Add more presentation conversions as needed
+    except BaseException:
+        # A failed conversion leaves nothing behind in scratch space
+        release_workspace(temp_dir)
+        raise
+    
+    # Default case - return error
+    release_workspace(temp_dir)
+    if (input_format, output_format) in office_conversions:
+        return None, "This conversion requires LibreOffice (soffice) on the server"
+    return None, "Conversion not supported"
+
+register_converter(convert_presentation, [
+    ("Microsoft PowerPoint (.pptx, .ppt)", "PDF (.pdf)"),
+    ("Microsoft PowerPoint (.pptx, .ppt)", "PNG/JPEG Images (.png, .jpg)"),
+    ("PDF (.pdf)", "PNG/JPEG Images (.png, .jpg)"),
+    ("OpenDocument Presentation (.odp)", "Microsoft PowerPoint (.pptx, .ppt)"),
+    ("OpenDocument Presentation (.odp)", "PDF (.pdf)"),
+    ("PDF (.pdf)", "Microsoft PowerPoint (.pptx, .ppt)")
+])
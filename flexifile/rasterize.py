@@ -0,0 +1,69 @@
+# PDF page rasterization through pdf2image/poppler
+import os
+import shutil
+import time
+
+from flexifile import config
+from flexifile.archive import ZipStreamWriter
+from flexifile.governor import process_count
+from flexifile.pdftext import parse_page_range
+from flexifile.registry import send_notice
+
+# Function to group sorted 0-based page indices into 1-based (first, last) runs of at most size pages
+def page_chunks(pages, size):
+    chunks = []
+    for page_number in (page + 1 for page in pages):
+        if chunks and page_number == chunks[-1][1] + 1 and page_number - chunks[-1][0] < size:
+            chunks[-1][1] = page_number
+        else:
+            chunks.append([page_number, page_number])
+    return [tuple(chunk) for chunk in chunks]
+
+# Function to render the selected pages of a PDF, yielding (page number, image path) in page order
+def render_pages(input_path, work_dir, fmt="png", dpi=None, page_spec=None, thread_count=None):
+    from pdf2image import convert_from_path, pdfinfo_from_path
+
+    page_count = pdfinfo_from_path(input_path)["Pages"]
+    pages = parse_page_range(page_spec, page_count)
+
+    for first, last in page_chunks(pages, config.RASTER_CHUNK_PAGES):
+        # Each chunk renders into its own folder; pdftoppm writes the pages straight
+        # to disk and paths_only keeps pdf2image from loading the bitmaps
+        chunk_dir = os.path.join(work_dir, f"pages_{first}")
+        os.makedirs(chunk_dir)
+        paths = convert_from_path(input_path, dpi=dpi or config.RASTER_DPI, fmt=fmt,
+                                  first_page=first, last_page=last, output_folder=chunk_dir,
+                                  paths_only=True, thread_count=thread_count or process_count())
+        yield from zip(range(first, last + 1), paths)
+
+# Function to rasterize a PDF into a single image (one page) or a ZIP of page images
+def rasterize_pdf(input_path, temp_dir, base_filename, fmt="png", dpi=None, page_spec=None, notify=None):
+    ext = "jpg" if fmt == "jpeg" else fmt
+    work_dir = os.path.join(temp_dir, "render")
+    os.makedirs(work_dir)
+
+    start = time.perf_counter()
+    rendered = 0
+    first_page_path = None
+    zip_path = os.path.join(temp_dir, f"{base_filename}_pages.zip")
+    with ZipStreamWriter(zip_path) as archive:
+        for page_number, page_path in render_pages(input_path, work_dir, fmt, dpi, page_spec):
+            rendered += 1
+            # The first page is kept in case the PDF has a single page, which is returned as-is;
+            # later pages leave the disk as soon as they are in the ZIP
+            archive.add_file(page_path, f"{base_filename}_page_{page_number:04d}.{ext}", done=None if rendered == 1 else os.remove)
+            if rendered == 1:
+                first_page_path = page_path
+    elapsed = time.perf_counter() - start
+    send_notice(notify, f"Rendered {rendered} page{'s' if rendered != 1 else ''} at {dpi or config.RASTER_DPI} DPI in {elapsed:.2f}s ({rendered / elapsed:.1f} pages/s).")
+
+    if rendered == 1:
+        # A single page is returned as the image itself rather than a one-member ZIP
+        output_path = os.path.join(temp_dir, f"{base_filename}.{ext}")
+        shutil.move(first_page_path, output_path)
+        os.remove(zip_path)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return output_path, f"{base_filename}.{ext}"
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return zip_path, f"{base_filename}_pages.zip"
@@ -0,0 +1,42 @@
+# Registry of converters keyed by (input format, output format)
+import logging
+
+from flexifile.metrics import track_conversion
+from flexifile.preflight import preflight
+
+logger = logging.getLogger("flexifile")
+
+converter_registry = {}
+
+# Function to register a converter for a list of (input format, output format) pairs
+def register_converter(converter, pairs):
+    for input_format, output_format in pairs:
+        converter_registry[(input_format, output_format)] = converter
+    return converter
+
+# Function to look up the converter for a conversion pair
+def get_converter(input_format, output_format):
+    return converter_registry.get((input_format, output_format))
+
+# Function to list the registered conversion pairs, optionally for one input format
+def supported_conversions(input_format=None):
+    return [pair for pair in converter_registry if input_format is None or pair[0] == input_format]
+
+# Function to run a conversion through the registry
+def convert(input_file, input_format, output_format, input_filename, options=None, notify=None):
+    converter = get_converter(input_format, output_format)
+    if converter is None:
+        return None, "Conversion not supported"
+    with track_conversion(input_file, input_format, output_format, input_filename) as metrics:
+        # Oversized inputs and decompression bombs are turned away before any backend decodes them
+        problem = preflight(input_file, input_format)
+        if problem:
+            logger.warning("rejected %s: %s", input_filename, problem)
+            return None, problem
+        output_path, output_filename = converter(input_file, input_format, output_format, input_filename, options=options, notify=notify)
+        metrics.note_output(output_path)
+    return output_path, output_filename
+
+# Function to report a note about a conversion (the UI passes st.info, everything else logs)
+def send_notice(notify, message):
+    (notify or logger.info)(message)
@@ -0,0 +1,105 @@
+# Managed scratch space: per-job workspaces under one root with a disk quota
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from flexifile import config
+from flexifile.registry import logger
+
+class ScratchSpaceFull(OSError):
+    pass
+
+_swept = False
+_sweep_lock = threading.Lock()
+
+# Workspaces are named after the process that owns them; pool workers adopt their parent
+_owner_pid = os.getpid()
+
+# Function to measure the bytes used under a directory
+def disk_usage(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+# Function to check whether the process that created a workspace is still running
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# Function to remove workspaces left behind by dead processes or older than the max age
+def sweep_orphans():
+    now = time.time()
+    removed = 0
+    for root_dir in (config.SCRATCH_DIR, config.CACHE_DIR):
+        try:
+            names = os.listdir(root_dir)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            path = os.path.join(root_dir, name)
+            if root_dir == config.CACHE_DIR and not name.startswith(".staging-"):
+                continue
+            try:
+                age = now - os.path.getmtime(path)
+            except OSError:
+                continue
+            # Workspace names are job-<pid>-<random>
+            parts = name.split("-")
+            dead_owner = len(parts) > 2 and parts[0] == "job" and parts[1].isdigit() and not pid_alive(int(parts[1]))
+            if dead_owner or age > config.SCRATCH_MAX_AGE:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+    if removed:
+        logger.info("removed %d orphaned scratch directories", removed)
+
+# Function to wait until the scratch space is under quota
+def wait_for_space():
+    deadline = time.monotonic() + config.SCRATCH_WAIT
+    while disk_usage(config.SCRATCH_DIR) >= config.SCRATCH_QUOTA:
+        # Expired download links are the main thing still holding finished outputs
+        from flexifile.delivery import expire_served_files
+        expire_served_files()
+        if time.monotonic() >= deadline:
+            raise ScratchSpaceFull(f"Scratch space quota of {config.SCRATCH_QUOTA} bytes is exhausted, try again later")
+        time.sleep(0.5)
+
+# Function to create a fresh workspace directory for one job
+def new_workspace():
+    global _swept
+    os.makedirs(config.SCRATCH_DIR, exist_ok=True)
+    with _sweep_lock:
+        if not _swept:
+            _swept = True
+            sweep_orphans()
+    wait_for_space()
+    return tempfile.mkdtemp(dir=config.SCRATCH_DIR, prefix=f"job-{_owner_pid}-")
+
+# Function run in pool workers so their outputs outlive them and they skip the startup sweep
+def adopt_owner(pid):
+    global _owner_pid, _swept
+    _owner_pid = pid
+    _swept = True
+
+# Function to get the pid new workspaces are named after, for handing to child processes
+def workspace_owner():
+    return _owner_pid
+
+# Function to delete the workspace that contains a path (paths outside the scratch root are left alone)
+def release_workspace(path):
+    root = os.path.abspath(config.SCRATCH_DIR)
+    rel = os.path.relpath(os.path.abspath(path), root)
+    if rel == "." or rel.startswith(".."):
+        return
+    shutil.rmtree(os.path.join(root, rel.split(os.sep)[0]), ignore_errors=True)
@@ -0,0 +1,360 @@
+# PPTX slide rendering: one walk of each slide's shapes into a layout model, drawn to images or PDF
+import collections
+import functools
+import io
+import os
+import threading
+
+from flexifile import config
+from flexifile.archive import ZipStreamWriter
+from flexifile.batch import run_in_pool
+from flexifile.cache import hash_input
+from flexifile.metrics import stage
+from flexifile.utils import input_source
+
+# PowerPoint stores geometry in EMUs; there are 12700 to a point
+EMU_PER_POINT = 12700
+
+# Font files tried, in order, when FLEXIFILE_SLIDE_FONT / FLEXIFILE_SLIDE_FONT_BOLD are unset
+font_candidates = {
+    False: ["Arial.ttf", "arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"],
+    True: ["Arial Bold.ttf", "arialbd.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"]
+}
+font_dirs = ["/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.fonts"),
+             "/Library/Fonts", "/System/Library/Fonts", "C:/Windows/Fonts"]
+
+# Recently built layout models, keyed by the input's content hash
+_layouts = collections.OrderedDict()
+_layouts_lock = threading.Lock()
+
+# Everything a renderer needs to draw one slide; items are plain tuples so the model
+# pickles cheaply to worker processes:
+#   ("fill", box, color), ("outline", box, color), ("picture", box, image bytes),
+#   ("text", box, paragraphs, anchor) with paragraphs as (text, size, bold, color, align)
+# Boxes are (left, top, width, height) in points from the slide's top-left corner
+class SlideLayout:
+    def __init__(self, number, width, height, background=(255, 255, 255)):
+        self.number = number
+        self.width = width
+        self.height = height
+        self.background = background
+        self.items = []
+
+# Function to read a solid RGB color, or None for theme colors, gradients and no fill
+def solid_color(fill):
+    from pptx.enum.dml import MSO_FILL
+
+    try:
+        if fill.type == MSO_FILL.SOLID:
+            return tuple(fill.fore_color.rgb)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return None
+
+# Function to read a font's RGB color, defaulting to black
+def font_color(font):
+    try:
+        return tuple(font.color.rgb) if font.color and font.color.rgb is not None else (0, 0, 0)
+    except AttributeError:
+        return (0, 0, 0)
+
+# Function to describe the paragraphs of a text frame
+def text_paragraphs(text_frame, default_size, bold=False, bullets=False, align=None):
+    from pptx.enum.text import PP_ALIGN
+
+    paragraphs = []
+    for paragraph in text_frame.paragraphs:
+        # Line breaks inside a paragraph come back as vertical tabs
+        text = paragraph.text.replace("\v", "\n")
+        run = paragraph.runs[0] if paragraph.runs else None
+        fonts = [run.font, paragraph.font] if run else [paragraph.font]
+        size = next((font.size.pt for font in fonts if font.size is not None), default_size)
+        is_bold = next((font.bold for font in fonts if font.bold is not None), bold)
+        alignment = {PP_ALIGN.CENTER: "center", PP_ALIGN.RIGHT: "right"}.get(paragraph.alignment, align or "left")
+        if bullets and text.strip():
+            # Em spaces, because wrapping drops ordinary leading spaces
+            text = "\u2003\u2003" * paragraph.level + "• " + text
+        paragraphs.append((text, size, is_bold, font_color(fonts[0]), alignment))
+    return paragraphs
+
+# Function to add a table's cells as outlined boxes with their text
+def add_table(layout, table, box):
+    left, top, _, _ = box
+    scale = 1 / EMU_PER_POINT
+    widths = [column.width * scale for column in table.columns]
+    heights = [row.height * scale for row in table.rows]
+    y = top
+    for row, height in zip(table.rows, heights):
+        x = left
+        for cell, width in zip(row.cells, widths):
+            cell_box = (x, y, width, height)
+            color = solid_color(cell.fill)
+            if color:
+                layout.items.append(("fill", cell_box, color))
+            layout.items.append(("outline", cell_box, (0, 0, 0)))
+            if cell.text.strip():
+                inset = (x + cell.margin_left * scale, y + cell.margin_top * scale,
+                         width - (cell.margin_left + cell.margin_right) * scale,
+                         height - (cell.margin_top + cell.margin_bottom) * scale)
+                layout.items.append(("text", inset, text_paragraphs(cell.text_frame, 12), "top"))
+            x += width
+        y += height
+
+# Function to walk a shape tree once, adding each shape's drawable parts to the layout;
+# transform maps EMUs to points as (x scale, y scale, x offset, y offset)
+def walk_shapes(layout, shapes, transform):
+    from pptx.enum.shapes import MSO_SHAPE_TYPE, PP_PLACEHOLDER
+
+    sx, sy, dx, dy = transform
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            # Children are placed in the group's own coordinate space, scaled onto the slide
+            xfrm = shape._element.grpSpPr.xfrm
+            kx = xfrm.ext.cx / xfrm.chExt.cx if xfrm.chExt.cx else 1
+            ky = xfrm.ext.cy / xfrm.chExt.cy if xfrm.chExt.cy else 1
+            walk_shapes(layout, shape.shapes, (sx * kx, sy * ky,
+                                               dx + (xfrm.off.x - xfrm.chOff.x * kx) * sx,
+                                               dy + (xfrm.off.y - xfrm.chOff.y * ky) * sy))
+            continue
+        if shape.left is None or shape.width is None:
+            continue
+        box = (shape.left * sx + dx, shape.top * sy + dy, shape.width * sx, shape.height * sy)
+
+        if hasattr(shape, "fill"):
+            color = solid_color(shape.fill)
+            if color:
+                layout.items.append(("fill", box, color))
+        if shape.shape_type == MSO_SHAPE_TYPE.PICTURE or hasattr(shape, "image"):
+            try:
+                layout.items.append(("picture", box, shape.image.blob))
+            except (AttributeError, ValueError):
+                # Empty picture placeholders and linked images have no embedded blob
+                pass
+        if getattr(shape, "has_table", False):
+            add_table(layout, shape.table, box)
+        if shape.has_text_frame and shape.text_frame.text.strip():
+            placeholder = shape.placeholder_format.type if shape.is_placeholder else None
+            if placeholder in (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE):
+                paragraphs, anchor = text_paragraphs(shape.text_frame, 40, bold=True, align="center"), "middle"
+            elif placeholder == PP_PLACEHOLDER.SUBTITLE:
+                paragraphs, anchor = text_paragraphs(shape.text_frame, 24, align="center"), "top"
+            else:
+                # Body placeholders show bullets unless the slide turns them off
+                bullets = placeholder in (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.OBJECT)
+                paragraphs, anchor = text_paragraphs(shape.text_frame, 18, bullets=bullets), "top"
+            frame = shape.text_frame
+            inset = (box[0] + frame.margin_left * sx, box[1] + frame.margin_top * sy,
+                     box[2] - (frame.margin_left + frame.margin_right) * sx,
+                     box[3] - (frame.margin_top + frame.margin_bottom) * sy)
+            layout.items.append(("text", inset, paragraphs, anchor))
+
+# Function to build the layout model of every slide in a presentation
+def build_layouts(input_file):
+    from pptx import Presentation
+
+    prs = Presentation(input_source(input_file))
+    width, height = prs.slide_width / EMU_PER_POINT, prs.slide_height / EMU_PER_POINT
+    layouts = []
+    for number, slide in enumerate(prs.slides, start=1):
+        background = solid_color(slide.background.fill) if slide.follow_master_background is False else None
+        layout = SlideLayout(number, width, height, background or (255, 255, 255))
+        walk_shapes(layout, slide.shapes, (1 / EMU_PER_POINT, 1 / EMU_PER_POINT, 0, 0))
+        layouts.append(layout)
+    return layouts
+
+# Function to get the layout model of a presentation, reusing it while the same file
+# is converted to several outputs
+def slide_layouts(input_file):
+    key = hash_input(input_file)
+    with _layouts_lock:
+        if key in _layouts:
+            _layouts.move_to_end(key)
+            return _layouts[key]
+    with stage("decode"):
+        layouts = build_layouts(input_file)
+    with _layouts_lock:
+        _layouts[key] = layouts
+        while len(_layouts) > config.SLIDE_LAYOUT_CACHE:
+            _layouts.popitem(last=False)
+    return layouts
+
+# Function to break text into lines no wider than width, given measure(text) in points
+def wrap_text(text, width, measure):
+    lines = []
+    for raw in text.split("\n"):
+        line = ""
+        for word in raw.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if line and measure(candidate) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+# Function to place a text item's lines; measure(text, size, bold) gives widths in points.
+# Yields (left, top, text, size, bold, color) in points
+def place_text(item, measure):
+    _, (left, top, width, height), paragraphs, anchor = item
+    lines = []
+    for text, size, bold, color, align in paragraphs:
+        for line in wrap_text(text, width, lambda text: measure(text, size, bold)):
+            lines.append((line, size, bold, color, align))
+    total = sum(size * 1.2 for _, size, _, _, _ in lines)
+    y = top + {"middle": (height - total) / 2, "bottom": height - total}.get(anchor, 0)
+    for line, size, bold, color, align in lines:
+        offset = {"center": (width - measure(line, size, bold)) / 2, "right": width - measure(line, size, bold)}.get(align, 0)
+        yield left + offset, y, line, size, bold, color
+        y += size * 1.2
+
+# Function to find a font file by name in the usual system font folders (once per process)
+@functools.lru_cache(maxsize=None)
+def find_font(bold):
+    configured = config.SLIDE_FONT_BOLD if bold else config.SLIDE_FONT
+    if configured:
+        return configured
+    for directory in font_dirs:
+        for root, _, files in os.walk(directory):
+            for name in font_candidates[bold]:
+                if name in files:
+                    return os.path.join(root, name)
+    return None
+
+# Function to load a Pillow font at a pixel size; each size is loaded once per process
+@functools.lru_cache(maxsize=None)
+def pil_font(size, bold):
+    from PIL import ImageFont
+
+    path = find_font(bold)
+    if path is None:
+        return ImageFont.load_default(size)
+    return ImageFont.truetype(path, size)
+
+# Function to draw one slide as PNG or JPEG bytes, width_px pixels wide
+def render_slide_image(layout, width_px, fmt="png"):
+    from PIL import Image, ImageDraw
+
+    scale = width_px / layout.width
+    img = Image.new("RGB", (width_px, round(layout.height * scale)), layout.background)
+    draw = ImageDraw.Draw(img)
+
+    def pixels(box):
+        left, top, width, height = box
+        return [round(left * scale), round(top * scale), round((left + width) * scale), round((top + height) * scale)]
+
+    def measure(text, size, bold):
+        return pil_font(max(1, round(size * scale)), bold).getlength(text) / scale
+
+    for item in layout.items:
+        kind = item[0]
+        if kind == "fill":
+            draw.rectangle(pixels(item[1]), fill=item[2])
+        elif kind == "outline":
+            draw.rectangle(pixels(item[1]), outline=item[2])
+        elif kind == "picture":
+            x0, y0, x1, y1 = pixels(item[1])
+            if x1 <= x0 or y1 <= y0:
+                continue
+            try:
+                picture = Image.open(io.BytesIO(item[2])).convert("RGBA")
+            except Exception:
+                # EMF/WMF and other formats Pillow cannot decode are left out
+                continue
+            picture = picture.resize((x1 - x0, y1 - y0))
+            img.paste(picture, (x0, y0), picture)
+        elif kind == "text":
+            for left, top, text, size, bold, color in place_text(item, measure):
+                draw.text((left * scale, top * scale), text, fill=color, font=pil_font(max(1, round(size * scale)), bold))
+
+    buffer = io.BytesIO()
+    if fmt == "jpeg":
+        img.save(buffer, "JPEG", quality=90)
+    else:
+        img.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+# Function to draw a run of slides (runs inside a worker process)
+def render_slide_images(layouts, width_px, fmt):
+    return [render_slide_image(layout, width_px, fmt) for layout in layouts]
+
+# Function to render every slide into a ZIP of images, chunks of slides in parallel
+# worker processes, writing each image straight into the archive
+def slides_to_images(input_file, zip_path, base_filename, fmt="png", width_px=None):
+    layouts = slide_layouts(input_file)
+    width_px = width_px or config.SLIDE_IMAGE_WIDTH
+    ext = "jpg" if fmt == "jpeg" else "png"
+
+    chunk = config.SLIDE_RENDER_CHUNK
+    jobs = [(layouts[i:i + chunk], width_px, fmt) for i in range(0, len(layouts), chunk)]
+    number = 0
+    with stage("encode"), ZipStreamWriter(zip_path) as archive:
+        for images in run_in_pool(render_slide_images, jobs, ordered=True):
+            for data in images:
+                number += 1
+                # Images are already compressed, so the archive stores them as-is
+                archive.add_bytes(f"slide_{number}.{ext}", data)
+    return number
+
+# Function to register the slide fonts with reportlab once per process
+@functools.lru_cache(maxsize=None)
+def pdf_fonts():
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    fonts = {}
+    for bold, fallback in ((False, "Helvetica"), (True, "Helvetica-Bold")):
+        path = find_font(bold)
+        if path is None:
+            fonts[bold] = fallback
+            continue
+        name = "SlideSans-Bold" if bold else "SlideSans"
+        pdfmetrics.registerFont(TTFont(name, path))
+        fonts[bold] = name
+    return fonts
+
+# Function to draw every slide as a page of a PDF the size of the slides
+def slides_to_pdf(input_file, output_path):
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas
+
+    layouts = slide_layouts(input_file)
+    fonts = pdf_fonts()
+
+    def measure(text, size, bold):
+        return stringWidth(text, fonts[bold], size)
+
+    with stage("encode"):
+        c = canvas.Canvas(output_path, pagesize=(layouts[0].width, layouts[0].height) if layouts else (720, 540))
+        for layout in layouts:
+            c.setPageSize((layout.width, layout.height))
+            c.setFillColorRGB(*(channel / 255 for channel in layout.background))
+            c.rect(0, 0, layout.width, layout.height, stroke=0, fill=1)
+            for item in layout.items:
+                kind = item[0]
+                left, top, width, height = item[1]
+                # PDF coordinates start at the bottom-left corner
+                bottom = layout.height - top - height
+                if kind == "fill":
+                    c.setFillColorRGB(*(channel / 255 for channel in item[2]))
+                    c.rect(left, bottom, width, height, stroke=0, fill=1)
+                elif kind == "outline":
+                    c.setStrokeColorRGB(*(channel / 255 for channel in item[2]))
+                    c.rect(left, bottom, width, height, stroke=1, fill=0)
+                elif kind == "picture":
+                    try:
+                        picture = ImageReader(Image.open(io.BytesIO(item[2])))
+                    except Exception:
+                        continue
+                    c.drawImage(picture, left, bottom, width, height, mask="auto")
+                elif kind == "text":
+                    for x, y, text, size, bold, color in place_text(item, measure):
+                        c.setFillColorRGB(*(channel / 255 for channel in color))
+                        c.setFont(fonts[bold], size)
+                        # drawString places the baseline, about 0.8 of the size below the line top
+                        c.drawString(x, layout.height - y - size * 0.8, text)
+            c.showPage()
+        c.save()
+    return len(layouts)
@@ -0,0 +1,154 @@
+# Content sniffing: the real format of an input from its first few KB (magic bytes, the
+# ZIP central directory for OOXML/ODF, the PDF header), so uploads can be routed and
+# mismatches rejected before anything is copied or decoded
+import zipfile
+
+from flexifile import config
+from flexifile.formats import input_format_for_filename
+from flexifile.utils import input_stream
+
+# Leading bytes and the formats they identify, checked in order
+magic_numbers = [
+    (b"\x89PNG\r\n\x1a\n", "PNG (.png)"),
+    (b"\xff\xd8\xff", "JPEG (.jpg, .jpeg)"),
+    (b"GIF87a", "GIF (.gif)"),
+    (b"GIF89a", "GIF (.gif)"),
+    (b"II*\x00", "TIFF (.tiff, .tif)"),
+    (b"MM\x00*", "TIFF (.tiff, .tif)"),
+    (b"II+\x00", "TIFF (.tiff, .tif)"),
+    (b"MM\x00+", "TIFF (.tiff, .tif)"),
+    (b"BM", "BMP (.bmp)"),
+    (b"PAR1", "Apache Parquet (.parquet)"),
+    (b"ARROW1", "Apache Arrow/Feather (.feather, .arrow)"),
+    (b"FEA1", "Apache Arrow/Feather (.feather, .arrow)"),
+    (b"{\\rtf", "Rich Text Format (.rtf)"),
+    (b"%!PS-Adobe", "EPS (.eps)"),
+    # DOS EPS files wrap the PostScript in a binary header
+    (b"\xc5\xd0\xd3\xc6", "EPS (.eps)")
+]
+
+# Legacy Office files are all OLE2 compound files; their streams are too deep to read cheaply
+ole_magic = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ole_formats = ("Microsoft Word (.docx, .doc)", "Microsoft Excel (.xlsx, .xls)", "Microsoft PowerPoint (.pptx, .ppt)")
+
+# OOXML part that identifies each format inside its ZIP package
+ooxml_parts = {
+    "word/document.xml": "Microsoft Word (.docx, .doc)",
+    "xl/workbook.xml": "Microsoft Excel (.xlsx, .xls)",
+    "ppt/presentation.xml": "Microsoft PowerPoint (.pptx, .ppt)"
+}
+
+# ODF mimetype member contents and their formats
+odf_mimetypes = {
+    "application/vnd.oasis.opendocument.text": "OpenDocument (.odt)",
+    "application/vnd.oasis.opendocument.spreadsheet": "OpenDocument Spreadsheet (.ods)",
+    "application/vnd.oasis.opendocument.presentation": "OpenDocument Presentation (.odp)"
+}
+
+# Text formats any plain-text file can be read as
+text_formats = ("Plain Text (.txt)", "CSV (.csv)", "TSV (.tsv)", "HTML (.html, .htm)")
+
+# Function to find the formats a ZIP container can be, from its central directory only
+def zip_formats(f):
+    try:
+        with zipfile.ZipFile(f) as archive:
+            names = archive.namelist()
+            if "mimetype" in names:
+                mimetype = archive.read("mimetype")[:100].decode("ascii", errors="replace").strip()
+                if mimetype in odf_mimetypes:
+                    return [odf_mimetypes[mimetype]]
+    except zipfile.BadZipFile:
+        return []
+    for part, input_format in ooxml_parts.items():
+        if part in names:
+            return [input_format]
+    if names and all(name.endswith("/") or name.lower().endswith(".png") for name in names):
+        return ["PNG Image Sequence (.zip)"]
+    return []
+
+# Function to guess how a plain-text sample is laid out: tab- or comma-separated columns
+# (the same count on each of the first lines), or free text
+def text_layout(sample):
+    lines = [line for line in sample.splitlines()[:20] if line.strip()]
+    # The last line of the sample may be cut short
+    if len(lines) > 1:
+        lines = lines[:-1]
+    for delimiter, input_format in (("\t", "TSV (.tsv)"), (",", "CSV (.csv)")):
+        counts = {line.count(delimiter) for line in lines}
+        if lines and len(counts) == 1 and counts.pop() > 0:
+            return input_format
+    return "Plain Text (.txt)"
+
+# Function to list the formats a sample of text can be, most likely first
+def text_formats_for(sample):
+    text = sample.lstrip("\ufeff \t\r\n").lower()
+    if text.startswith("<") and "<svg" in text:
+        first = "SVG (.svg)"
+    elif text.startswith("<!doctype html") or (text.startswith("<") and "<html" in text[:1024]):
+        first = "HTML (.html, .htm)"
+    else:
+        first = text_layout(sample)
+    return [first] + [input_format for input_format in text_formats if input_format != first]
+
+# Function to decode a sample when it looks like text, or return None for binary data
+def decode_text(head):
+    if head.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return head.decode("utf-16", errors="replace")
+    if b"\x00" in head:
+        # UTF-16 without a BOM has NUL bytes in most odd (or even) positions
+        if head[1::2].count(0) > len(head) // 4:
+            return head.decode("utf-16-le", errors="replace")
+        if head[0::2].count(0) > len(head) // 4:
+            return head.decode("utf-16-be", errors="replace")
+        return None
+    try:
+        # The sample may end part-way through a multi-byte character
+        return head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start >= len(head) - 3:
+            return head[:e.start].decode("utf-8")
+    # Legacy single-byte text still has few control characters
+    controls = sum(1 for byte in head if byte < 32 and byte not in b"\t\r\n\f")
+    return head.decode("cp1252", errors="replace") if controls < len(head) // 100 + 1 else None
+
+# Function to list the formats an input's content can be, most likely first; an empty list
+# means the content matches none of the supported formats
+def sniff_formats(input_file):
+    with input_stream(input_file) as f:
+        head = f.read(config.SNIFF_BYTES)
+        if head.startswith(b"PK\x03\x04"):
+            f.seek(0)
+            return zip_formats(f)
+    # PDF allows a little junk before the header
+    if b"%PDF-" in head[:1024]:
+        return ["PDF (.pdf)"]
+    if head.startswith(ole_magic):
+        return list(ole_formats)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ["WebP (.webp)"]
+    for magic, input_format in magic_numbers:
+        if head.startswith(magic):
+            return [input_format]
+    text = decode_text(head)
+    if text is None:
+        return []
+    return text_formats_for(text)
+
+# Function to detect an input's format, using the filename to settle content that fits
+# several formats (legacy Office files, plain text)
+def detect_format(input_file, input_filename=None):
+    candidates = sniff_formats(input_file)
+    named = input_format_for_filename(input_filename) if input_filename else None
+    if named in candidates:
+        return named
+    return candidates[0] if candidates else None
+
+# Function to check an input's content against the format it is declared as; returns a
+# message when the conversion cannot work
+def check_format(input_file, input_format):
+    candidates = sniff_formats(input_file)
+    if input_format in candidates:
+        return None
+    if not candidates:
+        return f"The file does not look like {input_format}"
+    return f"The file looks like {candidates[0]}, not {input_format}"
@@ -0,0 +1,264 @@
+# Spreadsheet format conversions
+import os
+import csv
+import re
+
+from flexifile import config
+from flexifile.formats import extension_map
+from flexifile.archive import ZipStreamWriter, unique_member_name
+from flexifile.cache import cached_conversion
+from flexifile.columnar import ColumnarWriter, columnar_formats, compression_codec, copy_columnar, iter_batches, write_frame
+from flexifile.metrics import stage
+from flexifile.office import convert_with_office, office_available, office_conversions
+from flexifile.registry import register_converter
+from flexifile.scratch import new_workspace, release_workspace
+from flexifile.utils import input_source, input_text_stream, save_input
+from flexifile.workbook import open_workbook, parse_options, select_sheets
+
+# Delimiters for the text-based spreadsheet formats
+delimiter_map = {
+    "CSV (.csv)": ",",
+    "TSV (.tsv)": "\t"
+}
+
+# Workbook formats read through flexifile.workbook
+workbook_formats = ("Microsoft Excel (.xlsx, .xls)", "OpenDocument Spreadsheet (.ods)")
+
+# Function to re-delimit a CSV/TSV file row by row without loading it into memory
+def stream_redelimit(input_file, output_path, in_sep, out_sep):
+    with input_text_stream(input_file, newline="") as src, \
+            open(output_path, "w", encoding="utf-8", newline="") as dst:
+        reader = csv.reader(src, delimiter=in_sep)
+        writer = csv.writer(dst, delimiter=out_sep, lineterminator="\n")
+        # writerows consumes the reader lazily, so only one row is held at a time
+        writer.writerows(reader)
+
+# Function to write a CSV/TSV file to XLSX in chunks through a write-only workbook
+def stream_delimited_to_xlsx(input_file, output_path, sep, chunk_rows=None):
+    import pandas as pd
+    from openpyxl import Workbook
+
+    # Write-only workbooks flush each row to disk as it is appended
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+
+    header_written = False
+    for chunk in pd.read_csv(input_source(input_file), sep=sep, chunksize=chunk_rows or config.SPREADSHEET_CHUNK_ROWS):
+        append_frame(ws, chunk, header=not header_written)
+        header_written = True
+
+    wb.save(output_path)
+
+# Function to append a DataFrame's rows to a write-only worksheet
+def append_frame(ws, df, header=True):
+    if header:
+        ws.append([str(column) for column in df.columns])
+    # Empty cells come back as NaN, which openpyxl cannot write
+    df = df.astype(object).where(df.notna(), None)
+    for row in df.itertuples(index=False, name=None):
+        ws.append(row)
+
+# Function to write a CSV/TSV file to Parquet/Feather, one row group per chunk
+def stream_delimited_to_columnar(input_file, output_path, sep, kind, codec, as_text=False):
+    import pandas as pd
+
+    # Chunks match the row-group size, so each read becomes one row group
+    chunks = pd.read_csv(input_source(input_file), sep=sep, chunksize=config.COLUMNAR_ROW_GROUP_ROWS,
+                         dtype=str if as_text else None)
+    with ColumnarWriter(output_path, kind, codec) as writer:
+        for chunk in chunks:
+            writer.write_frame(chunk)
+
+# Function to turn a record batch into a DataFrame whose dtypes do not depend on whether this
+# batch has nulls: integer columns with nulls hold Python ints and None instead of floats
+def batch_frame(batch):
+    return batch.to_pandas(integer_object_nulls=True)
+
+# Function to write a Parquet/Feather file to CSV/TSV one record batch at a time
+def stream_columnar_to_delimited(input_file, kind, output_path, sep):
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        header = True
+        for batch in iter_batches(input_file, kind):
+            batch_frame(batch).to_csv(f, sep=sep, index=False, header=header)
+            header = False
+
+# Function to write a Parquet/Feather file to XLSX one record batch at a time
+def stream_columnar_to_xlsx(input_file, kind, output_path):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    header = True
+    for batch in iter_batches(input_file, kind):
+        append_frame(ws, batch_frame(batch), header=header)
+        header = False
+    wb.save(output_path)
+
+# Function to write the selected sheets of a workbook with write_sheet(df, path), as one
+# file or as a ZIP with one file per sheet when several are selected
+def workbook_to_files(input_file, input_filename, temp_dir, base_filename, ext, write_sheet, options):
+    read_options = parse_options(options)
+    with open_workbook(input_file, input_filename) as workbook:
+        sheets = select_sheets(options.get("sheets"), workbook.sheet_names)
+
+        if len(sheets) == 1:
+            output_path = os.path.join(temp_dir, f"{base_filename}{ext}")
+            with stage("decode"):
+                df = workbook.parse(sheets[0], **read_options)
+            with stage("encode"):
+                write_sheet(df, output_path)
+            return output_path, f"{base_filename}{ext}"
+
+        zip_path = os.path.join(temp_dir, f"{base_filename}_sheets.zip")
+        used_names = set()
+        # CSV/TSV members are deflated on the archive's threads while the next sheet is parsed;
+        # Parquet/Feather members are already compressed and stored as-is
+        with ZipStreamWriter(zip_path, workers=config.ARCHIVE_WORKERS) as archive:
+            for sheet in sheets:
+                # Sheets are parsed one at a time, so only one DataFrame is alive
+                with stage("decode"):
+                    df = workbook.parse(sheet, **read_options)
+                safe_sheet = re.sub(r"[^\w.-]+", "_", sheet)
+                member = unique_member_name(f"{base_filename}_{safe_sheet}{ext}", used_names)
+                sheet_path = os.path.join(temp_dir, member)
+                with stage("encode"):
+                    write_sheet(df, sheet_path)
+                with stage("persist"):
+                    archive.add_file(sheet_path, member, done=os.remove)
+                del df
+        return zip_path, f"{base_filename}_sheets.zip"
+
+# Function to copy the selected sheets (all of them by default) of a workbook into an XLSX file
+def workbook_to_xlsx(input_file, input_filename, output_path, options):
+    from openpyxl import Workbook
+
+    read_options = parse_options(options)
+    wb = Workbook(write_only=True)
+    with open_workbook(input_file, input_filename) as workbook:
+        for sheet in select_sheets(options.get("sheets"), workbook.sheet_names, default_all=True):
+            with stage("decode"):
+                df = workbook.parse(sheet, **read_options)
+            with stage("encode"):
+                append_frame(wb.create_sheet(sheet[:31]), df)
+            del df
+    with stage("encode"):
+        wb.save(output_path)
+
+@cached_conversion
+def convert_spreadsheet(input_file, input_format, output_format, input_filename, options=None, notify=None):
+    # Create a managed workspace for file operations
+    temp_dir = new_workspace()
+    
+    # Get base filename without extension
+    base_filename = os.path.splitext(input_filename)[0]
+    options = options or {}
+    
+    try:
+        # Office formats go through the LibreOffice worker pool when soffice is installed
+        if (input_format, output_format) in office_conversions and office_available():
+            input_path = save_input(input_file, temp_dir, input_filename)
+            return convert_with_office(input_path, temp_dir, base_filename, input_format, output_format)
+        
+        # Spreadsheet conversions
+        if input_format in workbook_formats and output_format in delimiter_map:
+            # Excel/ODS to CSV/TSV conversion (selected sheets, one workbook parse)
+            sep = delimiter_map[output_format]
+            return workbook_to_files(input_file, input_filename, temp_dir, base_filename, extension_map[output_format],
+                                     lambda df, path: df.to_csv(path, sep=sep, index=False), options)
+        
+        elif input_format in workbook_formats and output_format in columnar_formats:
+            # Excel/ODS to Parquet/Feather conversion (selected sheets; members are already compressed)
+            kind = columnar_formats[output_format]
+            codec = compression_codec(kind, options)
+            return workbook_to_files(input_file, input_filename, temp_dir, base_filename, extension_map[output_format],
+                                     lambda df, path: write_frame(df, path, kind, codec), options)
+        
+        elif input_format in delimiter_map and output_format in columnar_formats:
+            # CSV/TSV to Parquet/Feather conversion (chunked reads, one row group per chunk)
+            output_ext = extension_map[output_format]
+            output_path = os.path.join(temp_dir, f"{base_filename}{output_ext}")
+            kind = columnar_formats[output_format]
+            stream_delimited_to_columnar(input_file, output_path, delimiter_map[input_format], kind,
+                                         compression_codec(kind, options), as_text=options.get("as_text"))
+            return output_path, f"{base_filename}{output_ext}"
+        
+        elif input_format in columnar_formats and output_format in columnar_formats:
+            # Parquet <-> Feather conversion (record batches copied without pandas)
+            output_ext = extension_map[output_format]
+            output_path = os.path.join(temp_dir, f"{base_filename}{output_ext}")
+            kind = columnar_formats[output_format]
+            copy_columnar(input_file, columnar_formats[input_format], output_path, kind, compression_codec(kind, options))
+            return output_path, f"{base_filename}{output_ext}"
+        
+        elif input_format in columnar_formats and output_format in delimiter_map:
+            # Parquet/Feather to CSV/TSV conversion (one record batch at a time)
+            output_ext = extension_map[output_format]
+            output_path = os.path.join(temp_dir, f"{base_filename}{output_ext}")
+            stream_columnar_to_delimited(input_file, columnar_formats[input_format], output_path, delimiter_map[output_format])
+            return output_path, f"{base_filename}{output_ext}"
+        
+        elif input_format in columnar_formats and output_format == "Microsoft Excel (.xlsx, .xls)":
+            # Parquet/Feather to Excel conversion (one record batch at a time, constant-memory writer)
+            output_path = os.path.join(temp_dir, f"{base_filename}.xlsx")
+            stream_columnar_to_xlsx(input_file, columnar_formats[input_format], output_path)
+            return output_path, f"{base_filename}.xlsx"
+        
+        elif input_format == "OpenDocument Spreadsheet (.ods)" and output_format == "Microsoft Excel (.xlsx, .xls)":
+            # ODS to Excel conversion (cell values only; LibreOffice keeps formatting when installed)
+            output_path = os.path.join(temp_dir, f"{base_filename}.xlsx")
+            workbook_to_xlsx(input_file, input_filename, output_path, options)
+            return output_path, f"{base_filename}.xlsx"
+        
+        elif input_format in delimiter_map and output_format == "Microsoft Excel (.xlsx, .xls)":
+            # CSV/TSV to Excel conversion (chunked reads, constant-memory writer)
+            output_path = os.path.join(temp_dir, f"{base_filename}.xlsx")
+            stream_delimited_to_xlsx(input_file, output_path, delimiter_map[input_format])
+            return output_path, f"{base_filename}.xlsx"
+        
+        elif input_format in delimiter_map and output_format in delimiter_map:
+            # CSV <-> TSV conversion (row-streaming re-delimiter)
+            output_ext = extension_map[output_format]
+            output_path = os.path.join(temp_dir, f"{base_filename}{output_ext}")
+            stream_redelimit(input_file, output_path, delimiter_map[input_format], delimiter_map[output_format])
+            return output_path, f"{base_filename}{output_ext}"
+        
+        # Add more spreadsheet conversions as needed
+    except BaseException:
+        # A failed conversion leaves nothing behind in scratch space
+        release_workspace(temp_dir)
+        raise
+    
+    # Default case - return error
+    release_workspace(temp_dir)
+    if (input_format, output_format) in office_conversions:
+        return None, "This conversion requires LibreOffice (soffice) on the server"
+    return None, "Conversion not supported"
+
+register_converter(convert_spreadsheet, [
+    ("Microsoft Excel (.xlsx, .xls)", "CSV (.csv)"),
+    ("Microsoft Excel (.xlsx, .xls)", "TSV (.tsv)"),
+    ("CSV (.csv)", "Microsoft Excel (.xlsx, .xls)"),
+    ("TSV (.tsv)", "Microsoft Excel (.xlsx, .xls)"),
+    ("CSV (.csv)", "TSV (.tsv)"),
+    ("TSV (.tsv)", "CSV (.csv)"),
+    ("Microsoft Excel (.xlsx, .xls)", "PDF (.pdf)"),
+    ("OpenDocument Spreadsheet (.ods)", "Microsoft Excel (.xlsx, .xls)"),
+    ("OpenDocument Spreadsheet (.ods)", "CSV (.csv)"),
+    ("OpenDocument Spreadsheet (.ods)", "TSV (.tsv)"),
+    ("CSV (.csv)", "Apache Parquet (.parquet)"),
+    ("CSV (.csv)", "Apache Arrow/Feather (.feather, .arrow)"),
+    ("TSV (.tsv)", "Apache Parquet (.parquet)"),
+    ("TSV (.tsv)", "Apache Arrow/Feather (.feather, .arrow)"),
+    ("Microsoft Excel (.xlsx, .xls)", "Apache Parquet (.parquet)"),
+    ("Microsoft Excel (.xlsx, .xls)", "Apache Arrow/Feather (.feather, .arrow)"),
+    ("OpenDocument Spreadsheet (.ods)", "Apache Parquet (.parquet)"),
+    ("OpenDocument Spreadsheet (.ods)", "Apache Arrow/Feather (.feather, .arrow)"),
+    ("Apache Parquet (.parquet)", "CSV (.csv)"),
+    ("Apache Parquet (.parquet)", "TSV (.tsv)"),
+    ("Apache Parquet (.parquet)", "Microsoft Excel (.xlsx, .xls)"),
+    ("Apache Parquet (.parquet)", "Apache Arrow/Feather (.feather, .arrow)"),
+    ("Apache Arrow/Feather (.feather, .arrow)", "CSV (.csv)"),
+    ("Apache Arrow/Feather (.feather, .arrow)", "TSV (.tsv)"),
+    ("Apache Arrow/Feather (.feather, .arrow)", "Microsoft Excel (.xlsx, .xls)"),
+    ("Apache Arrow/Feather (.feather, .arrow)", "Apache Parquet (.parquet)")
+])
@@ -0,0 +1,203 @@
+# Plain-text input: encoding detection and line-by-line DOCX/PDF writers for large files
+import codecs
+import functools
+import io
+import os
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from flexifile import config
+from flexifile.utils import input_stream, input_text_stream
+
+# Byte-order marks and the encodings they announce; UTF-32 LE comes before UTF-16 LE
+# because its BOM starts with the UTF-16 one
+text_boms = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16")
+]
+
+# Control characters that XML (and so DOCX) cannot hold
+invalid_xml_chars = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# Paragraphs written to the DOCX body per write call
+docx_write_batch = 1000
+
+# Function to detect a text file's encoding from a sample at its start
+def sniff_encoding(input_file):
+    with input_stream(input_file) as f:
+        sample = f.read(config.TEXT_SNIFF_BYTES)
+    for bom, encoding in text_boms:
+        if sample.startswith(bom):
+            return encoding
+    # Without a BOM, NUL bytes in most odd (or even) positions mean UTF-16 text
+    if len(sample) >= 4:
+        if sample[1::2].count(0) > len(sample) // 4:
+            return "utf-16-le"
+        if sample[0::2].count(0) > len(sample) // 4:
+            return "utf-16-be"
+    try:
+        # final=False allows a multi-byte character cut off at the end of the sample
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+# Function to yield the paragraphs of a text file: one per line, or one per block of
+# lines separated by blank lines (lines inside a block are joined with "\n")
+def iter_paragraphs(input_file, mode="line"):
+    # Bytes the sample did not cover can still be invalid; they become U+FFFD instead of failing
+    with input_text_stream(input_file, encoding=sniff_encoding(input_file), errors="replace") as text:
+        block = []
+        for line in iter(lambda: text.readline(config.TEXT_MAX_LINE_CHARS), ""):
+            line = invalid_xml_chars.sub("", line.rstrip("\n"))
+            if mode != "block":
+                yield line
+            elif line.strip():
+                block.append(line)
+            elif block:
+                yield "\n".join(block)
+                block = []
+        if block:
+            yield "\n".join(block)
+
+# Function to build the WordprocessingML for one paragraph
+def paragraph_xml(paragraph):
+    if not paragraph:
+        return "<w:p/>"
+    text = "<w:br/>".join(f'<w:t xml:space="preserve">{escape(line)}</w:t>' for line in paragraph.split("\n"))
+    return "<w:p><w:r>" + text.replace("\t", '</w:t><w:tab/><w:t xml:space="preserve">') + "</w:r></w:p>"
+
+# Function to get python-docx's blank document as (package members, body start, body end)
+@functools.lru_cache(maxsize=None)
+def docx_template():
+    from docx import Document
+
+    buffer = io.BytesIO()
+    Document().save(buffer)
+    with zipfile.ZipFile(buffer) as template:
+        members = [(item, template.read(item)) for item in template.infolist() if item.filename != "word/document.xml"]
+        document = template.read("word/document.xml").decode("utf-8")
+    # Paragraphs go between <w:body> and the section properties that close it
+    split = document.index("<w:sectPr", document.index("<w:body>"))
+    return members, document[:split], document[split:]
+
+# Function to write paragraphs to a DOCX file, streaming the document body into the package
+def write_docx(paragraphs, output_path):
+    members, head, tail = docx_template()
+    with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as docx:
+        for item, data in members:
+            docx.writestr(item, data)
+        # force_zip64 because the body's final size is not known up front
+        with docx.open("word/document.xml", "w", force_zip64=True) as body:
+            body.write(head.encode("utf-8"))
+            batch = []
+            for paragraph in paragraphs:
+                batch.append(paragraph_xml(paragraph))
+                if len(batch) == docx_write_batch:
+                    body.write("".join(batch).encode("utf-8"))
+                    batch = []
+            body.write(("".join(batch) + tail).encode("utf-8"))
+
+# Monospaced Unicode font files tried, in order, when FLEXIFILE_TEXT_PDF_FONT is unset
+text_font_candidates = ["DejaVuSansMono.ttf", "LiberationMono-Regular.ttf", "NotoSansMono-Regular.ttf",
+                        "consola.ttf", "Menlo.ttc"]
+
+# Function to find the TrueType font for TXT -> PDF: the configured one, else the first
+# system font found, else None (Courier)
+def find_text_font():
+    if config.TEXT_PDF_FONT:
+        return config.TEXT_PDF_FONT
+    from flexifile.slides import font_dirs
+
+    for directory in font_dirs:
+        for root, _, files in os.walk(directory):
+            for name in text_font_candidates:
+                if name in files:
+                    return os.path.join(root, name)
+    return None
+
+# Function to register the TrueType font once and return the font name to draw with
+@functools.lru_cache(maxsize=None)
+def pdf_text_font():
+    path = find_text_font()
+    if not path:
+        return "Courier"
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(TTFont("FlexifileText", path))
+    return "FlexifileText"
+
+# Function to get a test for whether the font has a glyph for a character
+@functools.lru_cache(maxsize=None)
+def font_covers(font):
+    if font == "Courier":
+        # The standard PDF fonts only draw WinAnsi (cp1252) characters
+        def covers(char):
+            try:
+                char.encode("cp1252")
+                return True
+            except UnicodeEncodeError:
+                return False
+        return covers
+    from reportlab.pdfbase import pdfmetrics
+
+    glyphs = pdfmetrics.getFont(font).face.charToGlyph
+    return lambda char: ord(char) in glyphs
+
+# Function to write paragraphs to a PDF with reportlab, one page of wrapped lines at a time;
+# gap is the number of blank lines left between paragraphs. Returns the characters the font
+# has no glyph for (drawn as blanks or boxes), in the order first seen
+def write_pdf(paragraphs, output_path, gap=0):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas
+
+    font, size = pdf_text_font(), config.TEXT_PDF_FONT_SIZE
+    leading = size * 1.2
+    width, height = letter
+    margin = 54
+    # The font is monospaced, so wrapping is a fixed number of characters per line
+    columns = max(1, int((width - 2 * margin) // stringWidth("M", font, size)))
+    rows = max(1, int((height - 2 * margin) // leading))
+
+    # pageCompression keeps each finished page's content stream compressed in memory
+    c = canvas.Canvas(output_path, pagesize=letter, pageCompression=1)
+    page = []
+    covers, checked, missing = font_covers(font), set(), {}
+
+    def flush_page():
+        text = c.beginText(margin, height - margin - size)
+        text.setFont(font, size, leading)
+        for line in page:
+            text.textLine(line)
+        c.drawText(text)
+        c.showPage()
+        page.clear()
+
+    for number, paragraph in enumerate(paragraphs):
+        # No gap at the top of a page
+        lines = [""] * gap if number and page else []
+        for line in paragraph.split("\n"):
+            line = line.expandtabs(8)
+            if not line.isascii():
+                for char in line:
+                    if char not in checked:
+                        checked.add(char)
+                        if not covers(char):
+                            missing[char] = None
+            lines.extend(line[start:start + columns] for start in range(0, max(len(line), 1), columns))
+        for line in lines:
+            page.append(line)
+            if len(page) == rows:
+                flush_page()
+
+    # An empty input still gives a one-page PDF
+    if page or c.getPageNumber() == 1:
+        flush_page()
+    c.save()
+    return list(missing)
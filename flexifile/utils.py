@@ -0,0 +1,45 @@
+# Helpers shared by the converters
+import contextlib
+import io
+import os
+
+from flexifile.metrics import stage
+
+# Function to make an upload available on disk for backends that need a file path
+def save_input(input_file, temp_dir, input_filename):
+    # Files already on disk (CLI and batch jobs) are used in place
+    if isinstance(input_file, (str, os.PathLike)):
+        return os.fspath(input_file)
+
+    input_path = os.path.join(temp_dir, input_filename)
+    with stage("persist"), open(input_path, "wb") as f:
+        f.write(input_file.getbuffer())
+    return input_path
+
+# Function to get something a backend can read from: the path for files on disk,
+# or the rewound upload itself, which is an in-memory BytesIO read in place
+def input_source(input_file):
+    if isinstance(input_file, (str, os.PathLike)):
+        return os.fspath(input_file)
+    input_file.seek(0)
+    return input_file
+
+# Context manager giving a binary stream over an upload or a file on disk
+@contextlib.contextmanager
+def input_stream(input_file):
+    if isinstance(input_file, (str, os.PathLike)):
+        with open(input_file, "rb") as f:
+            yield f
+    else:
+        yield input_source(input_file)
+
+# Context manager giving a text stream over an upload or a file on disk
+@contextlib.contextmanager
+def input_text_stream(input_file, encoding="utf-8", newline=None, errors="strict"):
+    with input_stream(input_file) as binary:
+        text = io.TextIOWrapper(binary, encoding=encoding, newline=newline, errors=errors)
+        try:
+            yield text
+        finally:
+            # Detach so closing the wrapper does not close the upload buffer
+            text.detach()
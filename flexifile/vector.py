@@ -0,0 +1,56 @@
+# Vector graphics conversions
+import os
+
+from flexifile.cache import cached_conversion
+from flexifile.drawings import ghostscript_available, parse_sizes, render_vector, vector_targets
+from flexifile.rasterize import rasterize_pdf
+from flexifile.registry import register_converter
+from flexifile.scratch import new_workspace, release_workspace
+from flexifile.utils import save_input
+
+@cached_conversion
+def convert_vector(input_file, input_format, output_format, input_filename, options=None, notify=None):
+    # Create a managed workspace for file operations
+    temp_dir = new_workspace()
+    
+    # Get base filename without extension
+    base_filename = os.path.splitext(input_filename)[0]
+    options = options or {}
+    
+    try:
+        # Vector graphics conversions
+        if input_format in ("SVG (.svg)", "EPS (.eps)") and output_format in vector_targets:
+            # SVG/EPS to PNG/JPEG/PDF conversion, plus any extra formats and sizes in one pass
+            if input_format == "EPS (.eps)" and not ghostscript_available():
+                release_workspace(temp_dir)
+                return None, "This conversion requires Ghostscript (gs) on the server"
+            formats = [output_format] + [fmt for fmt in options.get("extra_formats", []) if fmt in vector_targets and fmt != output_format]
+            return render_vector(input_file, input_format, input_filename, temp_dir, base_filename,
+                                 formats, parse_sizes(options.get("sizes")))
+        
+        elif input_format == "PDF (.pdf)" and output_format in ("PNG (.png)", "JPEG (.jpg, .jpeg)"):
+            # PDF to PNG/JPEG conversion, one image per page
+            fmt = "png" if output_format == "PNG (.png)" else "jpeg"
+            # pdftoppm reads from a path, so the upload is saved to disk
+            input_path = save_input(input_file, temp_dir, input_filename)
+            return rasterize_pdf(input_path, temp_dir, base_filename, fmt, options.get("dpi"), options.get("page_range"), notify)
+        
+        # Add more vector graphics conversions as needed
+    except BaseException:
+        # A failed conversion leaves nothing behind in scratch space
+        release_workspace(temp_dir)
+        raise
+    
+    # Default case - return error
+    release_workspace(temp_dir)
+    return None, "Conversion not supported"
+
+register_converter(convert_vector, [
+    ("SVG (.svg)", "PNG (.png)"),
+    ("SVG (.svg)", "JPEG (.jpg, .jpeg)"),
+    ("SVG (.svg)", "PDF (.pdf)"),
+    ("PDF (.pdf)", "PNG (.png)"),
+    ("PDF (.pdf)", "JPEG (.jpg, .jpeg)"),
+    ("EPS (.eps)", "PDF (.pdf)"),
+    ("EPS (.eps)", "PNG (.png)")
+])
@@ -0,0 +1,77 @@
+# Excel/ODS ingestion: one workbook parse, sheet selection and the fastest installed engine
+import importlib.util
+import os
+import re
+
+from flexifile import config
+from flexifile.utils import input_source, input_stream
+
+# pandas engine for each workbook type when python-calamine is not installed
+fallback_engines = {
+    "xlsx": "openpyxl",
+    "xls": "xlrd",
+    "ods": "odf"
+}
+
+# Function to tell which workbook type a file holds: "xlsx", "xls" or "ods"
+def workbook_kind(input_file, input_filename):
+    ext = os.path.splitext(input_filename)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        return "xlsx"
+    if ext in (".xls", ".ods"):
+        return ext[1:]
+    # Legacy .xls files are OLE2 compound documents; everything else here is a ZIP container
+    with input_stream(input_file) as f:
+        head = f.read(8)
+    return "xls" if head.startswith(b"\xd0\xcf\x11\xe0") else "xlsx"
+
+# Function to pick the pandas engine for a workbook type
+def excel_engine(kind):
+    if config.EXCEL_ENGINE:
+        return config.EXCEL_ENGINE
+    # calamine (Rust) reads xlsx, xls and ods several times faster than the pure-Python readers
+    if importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return fallback_engines[kind]
+
+# Function to open a workbook once; sheets are then parsed from it one at a time
+def open_workbook(input_file, input_filename):
+    import pandas as pd
+
+    return pd.ExcelFile(input_source(input_file), engine=excel_engine(workbook_kind(input_file, input_filename)))
+
+# Function to resolve a sheet selection: "*" for all sheets, or comma-separated names
+# or 1-based numbers; a blank selection means the default
+def select_sheets(spec, sheet_names, default_all=False):
+    if spec is None or not str(spec).strip():
+        return list(sheet_names) if default_all else list(sheet_names[:1])
+    if str(spec).strip() == "*":
+        return list(sheet_names)
+
+    selected = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if part in sheet_names:
+            name = part
+        elif part.isdigit() and 1 <= int(part) <= len(sheet_names):
+            name = sheet_names[int(part) - 1]
+        else:
+            raise ValueError(f"No sheet {part!r} in the workbook (it has: {', '.join(sheet_names)})")
+        if name not in selected:
+            selected.append(name)
+    return selected
+
+# Function to turn a column hint into pandas usecols: Excel letters ("A:C, F") pass
+# through as a range string, anything else is a comma-separated list of header names
+def parse_usecols(spec):
+    if spec is None or not str(spec).strip():
+        return None
+    spec = str(spec).replace(" ", "")
+    if re.fullmatch(r"[A-Z]+(:[A-Z]+)?(,[A-Z]+(:[A-Z]+)?)*", spec):
+        return spec
+    return [name for name in spec.split(",") if name]
+
+# Function to build the read arguments for workbook.parse from the conversion options
+def parse_options(options):
+    # dtype=str keeps every cell as text, which skips pandas' type inference entirely
+    return {"usecols": parse_usecols(options.get("usecols")), "dtype": str if options.get("as_text") else None}
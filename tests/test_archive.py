@@ -0,0 +1,73 @@
+# Streaming ZIP writer: archives read back with zipfile, buffered, streamed and threaded
+import os
+import zipfile
+
+import pytest
+
+from flexifile import archive, config
+from flexifile.archive import ZipStreamWriter
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_members_read_back(tmp_path, workers):
+    source = tmp_path / "notes.txt"
+    source.write_bytes(b"hello " * 1000)
+    path = str(tmp_path / "out.zip")
+    with ZipStreamWriter(path, workers=workers) as writer:
+        writer.add_bytes("a.txt", b"alpha")
+        writer.add_bytes("a.txt", b"second")
+        writer.add_bytes("image.png", b"\x89PNG" + os.urandom(100))
+        writer.add_file(str(source))
+    with zipfile.ZipFile(path) as result:
+        assert result.testzip() is None
+        assert result.namelist() == ["a.txt", "a_2.txt", "image.png", "notes.txt"]
+        assert result.read("a_2.txt") == b"second"
+        assert result.read("notes.txt") == b"hello " * 1000
+        assert result.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert result.getinfo("image.png").compress_type == zipfile.ZIP_STORED
+
+def test_done_callback_runs_after_member_is_read(tmp_path):
+    source = tmp_path / "out.csv"
+    source.write_bytes(b"a,b\n1,2\n")
+    path = str(tmp_path / "out.zip")
+    with ZipStreamWriter(path, workers=2) as writer:
+        writer.add_file(str(source), done=os.remove)
+    assert not source.exists()
+    with zipfile.ZipFile(path) as result:
+        assert result.read("out.csv") == b"a,b\n1,2\n"
+
+def test_streamed_member_uses_zip64_descriptor(tmp_path, monkeypatch):
+    # Files over the buffer limit are compressed chunk by chunk behind a ZIP64 data descriptor
+    monkeypatch.setattr(config, "ARCHIVE_BUFFER_MAX_BYTES", 1024)
+    monkeypatch.setattr(config, "ARCHIVE_CHUNK_BYTES", 4096)
+    data = os.urandom(50_000) + b"x" * 50_000
+    source = tmp_path / "big.bin"
+    source.write_bytes(data)
+    path = str(tmp_path / "out.zip")
+    with ZipStreamWriter(path) as writer:
+        writer.add_bytes("small.txt", b"small")
+        writer.add_file(str(source))
+    with zipfile.ZipFile(path) as result:
+        info = result.getinfo("big.bin")
+        assert info.flag_bits & archive.flag_data_descriptor
+        assert result.read("big.bin") == data
+        assert result.read("small.txt") == b"small"
+
+def test_zip64_end_records(tmp_path, monkeypatch):
+    # More members than the classic end record can count moves the totals into ZIP64 records
+    monkeypatch.setattr(archive, "zip16_limit", 3)
+    path = str(tmp_path / "out.zip")
+    with ZipStreamWriter(path) as writer:
+        for number in range(5):
+            writer.add_bytes(f"{number}.txt", str(number).encode())
+    with open(path, "rb") as f:
+        assert b"PK\x06\x06" in f.read()
+    with zipfile.ZipFile(path) as result:
+        assert [result.read(f"{number}.txt") for number in range(5)] == [b"0", b"1", b"2", b"3", b"4"]
+
+def test_failed_archive_is_marked(tmp_path):
+    path = str(tmp_path / "out.zip")
+    with pytest.raises(RuntimeError):
+        with ZipStreamWriter(path) as writer:
+            writer.add_bytes("a.txt", b"alpha")
+            raise RuntimeError("stop")
+    assert writer.failed and writer.finished.is_set()
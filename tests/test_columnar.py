@@ -0,0 +1,25 @@
+# Parquet/Feather to CSV: values keep one format across record batches
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from flexifile import config
+from flexifile.spreadsheet import stream_columnar_to_delimited
+
+def write_parquet(path, values, row_group_rows):
+    pq.write_table(pa.table({"n": pa.array(values, type=pa.int64())}), path, row_group_size=row_group_rows)
+
+def converted_lines(tmp_path, values, row_group_rows, monkeypatch):
+    monkeypatch.setattr(config, "COLUMNAR_ROW_GROUP_ROWS", row_group_rows)
+    input_path, output_path = tmp_path / "in.parquet", tmp_path / "out.csv"
+    write_parquet(input_path, values, row_group_rows)
+    stream_columnar_to_delimited(str(input_path), "parquet", str(output_path), ",")
+    return output_path.read_text().splitlines()
+
+def test_null_in_later_row_group_keeps_integers(tmp_path, monkeypatch):
+    lines = converted_lines(tmp_path, [1, 2, 3, None, 5, 6], 3, monkeypatch)
+    # A lone empty field is quoted so the row is not read back as a blank line
+    assert lines == ["n", "1", "2", "3", '""', "5", "6"]
+
+def test_null_in_single_batch_keeps_integers(tmp_path, monkeypatch):
+    lines = converted_lines(tmp_path, [1, None, 3], 100, monkeypatch)
+    assert lines == ["n", "1", '""', "3"]
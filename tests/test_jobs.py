@@ -0,0 +1,111 @@
+# Job manager: per-user round robin, running caps, cancel, expiry and notices from workers
+import io
+import os
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from flexifile import config, jobs
+from flexifile.jobs import JobManager
+from flexifile.scratch import new_workspace
+
+# Function to wait until a condition holds, failing the test after a few seconds
+def wait_for(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+# Function to build a thread job that records its start and waits for the gate
+def gated_job(gate, started):
+    def run(job, name):
+        started.append(name)
+        gate.wait(5)
+        return "out", name, None
+    return run
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "SCRATCH_DIR", str(tmp_path / "scratch"))
+    # Worker processes read their settings from the environment
+    monkeypatch.setenv("FLEXIFILE_SCRATCH_DIR", str(tmp_path / "scratch"))
+    manager = JobManager()
+    yield manager
+    manager.threads.shutdown(wait=True)
+    if manager.processes is not None:
+        manager.processes.shutdown(wait=True)
+
+def test_owners_take_turns(manager, monkeypatch):
+    monkeypatch.setattr(config, "JOB_MAX_RUNNING", 1)
+    gate, started = threading.Event(), []
+    func = gated_job(gate, started)
+    submitted = [manager.submit("a", "a1", func, ("a1",)), manager.submit("a", "a2", func, ("a2",)),
+                 manager.submit("a", "a3", func, ("a3",)), manager.submit("b", "b1", func, ("b1",)),
+                 manager.submit("b", "b2", func, ("b2",))]
+    wait_for(lambda: started == ["a1"])
+    assert manager.queue_position(submitted[2]) == 2
+    gate.set()
+    wait_for(lambda: not any(job.active for job in submitted))
+    assert started == ["a1", "a2", "b1", "a3", "b2"]
+    assert all(job.status == "done" for job in submitted)
+
+def test_per_user_limit_leaves_room_for_others(manager, monkeypatch):
+    monkeypatch.setattr(config, "JOB_MAX_RUNNING", 2)
+    monkeypatch.setattr(config, "JOB_PER_USER", 1)
+    gate, started = threading.Event(), []
+    func = gated_job(gate, started)
+    a1, a2 = manager.submit("a", "a1", func, ("a1",)), manager.submit("a", "a2", func, ("a2",))
+    b1 = manager.submit("b", "b1", func, ("b1",))
+    wait_for(lambda: len(started) == 2)
+    assert sorted(started) == ["a1", "b1"]
+    assert a2.status == "queued" and manager.queue_position(a2) == 1
+    gate.set()
+    wait_for(lambda: not any(job.active for job in (a1, a2, b1)))
+
+def test_cancel_queued_job_releases_staged_input(manager, monkeypatch):
+    monkeypatch.setattr(config, "JOB_MAX_RUNNING", 1)
+    gate, started = threading.Event(), []
+    func = gated_job(gate, started)
+    running = manager.submit("a", "a1", func, ("a1",))
+    staged = new_workspace()
+    queued = manager.submit("a", "a2", func, ("a2",), staged_paths=[staged])
+    wait_for(lambda: started == ["a1"])
+    assert not manager.cancel(running.id)
+    assert manager.cancel(queued.id)
+    assert queued.status == "cancelled"
+    assert not os.path.exists(staged)
+    gate.set()
+    wait_for(lambda: not running.active)
+    assert started == ["a1"]
+
+def test_finished_jobs_expire(manager, monkeypatch):
+    monkeypatch.setattr(config, "JOB_RESULT_TTL", 0)
+    job = manager.submit("a", "a1", lambda job: ("out", "done.txt", None))
+    wait_for(lambda: not job.active)
+    time.sleep(0.01)
+    assert manager.jobs_for("a") == []
+
+def test_failed_job_reports_error(manager):
+    def fail(job):
+        raise RuntimeError("boom")
+    job = manager.submit("a", "a1", fail)
+    wait_for(lambda: not job.active)
+    assert job.status == "failed" and job.message == "Error: boom"
+
+@pytest.mark.parametrize("governed", [False, True])
+def test_process_job_notices_reach_the_job(manager, monkeypatch, governed):
+    monkeypatch.setattr(config, "GOVERNOR_ENABLED", governed)
+    monkeypatch.setattr(config, "CACHE_ENABLED", False)
+    monkeypatch.setenv("FLEXIFILE_CACHE", "0")
+    monkeypatch.setattr(jobs, "_manager", manager)
+    buffer = io.BytesIO()
+    frames = [Image.new("RGB", (8, 8), color) for color in ("red", "blue")]
+    frames[0].save(buffer, "GIF", save_all=True, append_images=frames[1:])
+    buffer.seek(0)
+    job = jobs.submit_conversion("a", buffer, "GIF (.gif)", "PNG (.png)", "anim.gif")
+    assert job.cpu_bound
+    wait_for(lambda: not job.active, timeout=120)
+    assert job.status == "done", job.message
+    assert any("first of 2 frames" in notice for notice in job.notices)
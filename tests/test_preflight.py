@@ -0,0 +1,62 @@
+# Pre-flight checks: oversized inputs, pixel and cell bombs, deep SVGs and format mismatches
+import io
+import zipfile
+
+from PIL import Image
+
+from flexifile import config
+from flexifile.preflight import preflight
+
+# Function to encode a blank image in memory
+def image_bytes(width, height, save_format="PNG"):
+    buffer = io.BytesIO()
+    Image.new("L", (width, height)).save(buffer, save_format)
+    buffer.seek(0)
+    return buffer
+
+# Function to build a minimal XLSX-shaped ZIP whose sheet declares the given dimension
+def workbook_bytes(dimension, padding=0):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr("xl/workbook.xml", "<workbook/>")
+        archive.writestr("xl/worksheets/sheet1.xml",
+                         f'<worksheet><dimension ref="{dimension}"/>' + " " * padding + "</worksheet>")
+    buffer.seek(0)
+    return buffer
+
+def test_small_inputs_pass():
+    assert preflight(image_bytes(10, 10), "PNG (.png)") is None
+    assert preflight(workbook_bytes("A1:C10"), "Microsoft Excel (.xlsx, .xls)") is None
+    assert preflight(io.BytesIO(b"<svg><g><rect/></g></svg>"), "SVG (.svg)") is None
+
+def test_oversized_input(monkeypatch):
+    monkeypatch.setattr(config, "MAX_INPUT_BYTES", 100)
+    assert preflight(io.BytesIO(b"x" * 200), "Plain Text (.txt)") == "The file is 200 bytes; the limit is 100 bytes"
+
+def test_format_mismatch():
+    assert preflight(image_bytes(10, 10), "JPEG (.jpg, .jpeg)") == "The file looks like PNG (.png), not JPEG (.jpg, .jpeg)"
+
+def test_image_over_pixel_limit(monkeypatch):
+    monkeypatch.setattr(config, "MAX_IMAGE_PIXELS", 1000)
+    problem = preflight(image_bytes(100, 20), "PNG (.png)")
+    assert problem.startswith("The image is 100x20")
+
+def test_sheet_over_cell_limit(monkeypatch):
+    monkeypatch.setattr(config, "MAX_SHEET_CELLS", 1000)
+    problem = preflight(workbook_bytes("A1:Z100"), "Microsoft Excel (.xlsx, .xls)")
+    assert problem == "Sheet sheet1.xml spans 100 rows x 26 columns; the limit is 1,000 cells"
+
+def test_zip_over_unpacked_limit(monkeypatch):
+    monkeypatch.setattr(config, "MAX_UNPACKED_BYTES", 10_000)
+    problem = preflight(workbook_bytes("A1:A1", padding=20_000), "Microsoft Excel (.xlsx, .xls)")
+    assert problem.startswith("The file unpacks to")
+
+def test_svg_entities_are_rejected():
+    svg = b'<?xml version="1.0"?><!DOCTYPE svg [<!ENTITY a "aaaa">]><svg>&a;</svg>'
+    assert preflight(io.BytesIO(svg), "SVG (.svg)") == "SVG files with entity declarations are not accepted"
+
+def test_svg_nesting_limit(monkeypatch):
+    monkeypatch.setattr(config, "SVG_MAX_DEPTH", 10)
+    svg = b"<svg>" + b"<g>" * 20 + b"</g>" * 20 + b"</svg>"
+    assert preflight(io.BytesIO(svg), "SVG (.svg)") == "The SVG nests elements more than 10 levels deep"
@@ -0,0 +1,80 @@
+# Content sniffing: every magic number, ZIP container and text layout routes to its format
+import io
+import zipfile
+
+import pytest
+
+from flexifile.sniff import check_format, detect_format, ole_magic, sniff_formats
+
+# Function to build an in-memory ZIP with the given members
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("head, expected", [
+    (b"\x89PNG\r\n\x1a\n" + bytes(16), "PNG (.png)"),
+    (b"\xff\xd8\xff\xe0" + bytes(16), "JPEG (.jpg, .jpeg)"),
+    (b"GIF87a" + bytes(16), "GIF (.gif)"),
+    (b"GIF89a" + bytes(16), "GIF (.gif)"),
+    (b"II*\x00" + bytes(16), "TIFF (.tiff, .tif)"),
+    (b"MM\x00*" + bytes(16), "TIFF (.tiff, .tif)"),
+    (b"II+\x00" + bytes(16), "TIFF (.tiff, .tif)"),
+    (b"MM\x00+" + bytes(16), "TIFF (.tiff, .tif)"),
+    (b"BM" + bytes(16), "BMP (.bmp)"),
+    (b"PAR1" + bytes(16), "Apache Parquet (.parquet)"),
+    (b"ARROW1" + bytes(16), "Apache Arrow/Feather (.feather, .arrow)"),
+    (b"FEA1" + bytes(16), "Apache Arrow/Feather (.feather, .arrow)"),
+    (b"{\\rtf1\\ansi hello}", "Rich Text Format (.rtf)"),
+    (b"%!PS-Adobe-3.0 EPSF-3.0\n", "EPS (.eps)"),
+    (b"\xc5\xd0\xd3\xc6" + bytes(16), "EPS (.eps)"),
+    (b"RIFF\x00\x00\x00\x00WEBPVP8 " + bytes(16), "WebP (.webp)"),
+    (b"%PDF-1.7\n" + bytes(16), "PDF (.pdf)"),
+    (b"\r\n%PDF-1.4\n", "PDF (.pdf)")
+])
+def test_magic_numbers(head, expected):
+    assert sniff_formats(io.BytesIO(head))[0] == expected
+
+@pytest.mark.parametrize("members, expected", [
+    ({"[Content_Types].xml": "<Types/>", "word/document.xml": "<w:document/>"}, "Microsoft Word (.docx, .doc)"),
+    ({"[Content_Types].xml": "<Types/>", "xl/workbook.xml": "<workbook/>"}, "Microsoft Excel (.xlsx, .xls)"),
+    ({"[Content_Types].xml": "<Types/>", "ppt/presentation.xml": "<p/>"}, "Microsoft PowerPoint (.pptx, .ppt)"),
+    ({"mimetype": "application/vnd.oasis.opendocument.text"}, "OpenDocument (.odt)"),
+    ({"mimetype": "application/vnd.oasis.opendocument.spreadsheet"}, "OpenDocument Spreadsheet (.ods)"),
+    ({"mimetype": "application/vnd.oasis.opendocument.presentation"}, "OpenDocument Presentation (.odp)"),
+    ({"frames/": "", "frames/1.png": b"\x89PNG", "frames/2.PNG": b"\x89PNG"}, "PNG Image Sequence (.zip)")
+])
+def test_zip_containers(members, expected):
+    assert sniff_formats(io.BytesIO(zip_bytes(members))) == [expected]
+
+def test_unknown_zip_matches_nothing():
+    assert sniff_formats(io.BytesIO(zip_bytes({"readme.txt": "hi"}))) == []
+
+def test_ole_files_are_settled_by_filename():
+    data = ole_magic + bytes(64)
+    assert len(sniff_formats(io.BytesIO(data))) == 3
+    assert detect_format(io.BytesIO(data), "old.xls") == "Microsoft Excel (.xlsx, .xls)"
+    assert detect_format(io.BytesIO(data), "old.ppt") == "Microsoft PowerPoint (.pptx, .ppt)"
+
+@pytest.mark.parametrize("text, expected", [
+    (b"a,b,c\n1,2,3\n4,5,6\n", "CSV (.csv)"),
+    (b"a\tb\n1\t2\n3\t4\n", "TSV (.tsv)"),
+    (b"<!DOCTYPE html><html><body>hi</body></html>", "HTML (.html, .htm)"),
+    (b"<?xml version='1.0'?>\n<svg xmlns='http://www.w3.org/2000/svg'/>", "SVG (.svg)"),
+    (b"Just some prose.\nWith two, commas, here.\nAnd none here.\n", "Plain Text (.txt)"),
+    ("café naïve\n".encode("utf-16"), "Plain Text (.txt)"),
+    ("café naïve\n".encode("cp1252"), "Plain Text (.txt)")
+])
+def test_text_layouts(text, expected):
+    assert sniff_formats(io.BytesIO(text))[0] == expected
+
+def test_binary_junk_matches_nothing():
+    assert sniff_formats(io.BytesIO(bytes(range(32)) * 16)) == []
+
+def test_check_format_messages():
+    png = io.BytesIO(b"\x89PNG\r\n\x1a\n" + bytes(16))
+    assert check_format(png, "PNG (.png)") is None
+    assert check_format(png, "JPEG (.jpg, .jpeg)") == "The file looks like PNG (.png), not JPEG (.jpg, .jpeg)"
+    assert check_format(io.BytesIO(bytes(range(32)) * 16), "PDF (.pdf)") == "The file does not look like PDF (.pdf)"
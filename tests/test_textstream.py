@@ -0,0 +1,12 @@
+# TXT to PDF: characters the font cannot draw are reported instead of silently dropped
+from flexifile import textstream
+from flexifile.textstream import write_pdf
+
+def test_courier_reports_cyrillic(tmp_path, monkeypatch):
+    monkeypatch.setattr(textstream, "pdf_text_font", lambda: "Courier")
+    missing = write_pdf(["Hello", "Ångström – “q”", "Привет"], str(tmp_path / "out.pdf"))
+    assert missing == ["П", "р", "и", "в", "е", "т"]
+
+def test_ascii_text_reports_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(textstream, "pdf_text_font", lambda: "Courier")
+    assert write_pdf(["plain text"], str(tmp_path / "out.pdf")) == []